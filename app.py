@@ -1,55 +1,101 @@
+import importlib
 import logging
 import os
 import tempfile
 
+import click
 from flask import Flask
+from flask.cli import with_appcontext
 from werkzeug.middleware.proxy_fix import ProxyFix
 
 from extensions import db, login_manager  # 👈 Import modifié
+from utils import metrics, profiling
+from utils.db_engine import engine_options, configure_engine
+from utils.user_cache import user_cache
 
-# Création de l'app Flask
-app = Flask(__name__)
-app.secret_key = os.environ.get("SESSION_SECRET", "dev_secret_key")
-app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+# Bibliothèques lourdes importées à la demande par les routes qui en ont besoin
+HEAVY_MODULES = ('pandas', 'folium', 'networkx', 'geopy.distance')
 
-# Configuration de la base de données
-app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///gpspathfinder.db")
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
-# Initialisation des extensions AVANT les imports de blueprints 👇
-db.init_app(app)
-login_manager.init_app(app)
-login_manager.login_view = 'auth.login'
-login_manager.login_message = None
+def preload_heavy_modules():
+    """Importe les bibliothèques lourdes et charge l'index du gazetteer (à appeler dans le maître gunicorn avec --preload)"""
+    for module in HEAVY_MODULES:
+        importlib.import_module(module)
 
-# Configuration des uploads
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
-app.config['UPLOAD_FOLDER'] = tempfile.gettempdir()
+    from utils.geocoder import get_geocoder
+    get_geocoder()
 
-# Import des blueprints APRÈS initialisation des extensions
-from routes.auth import auth_bp  # 👈 Ordre modifié
-from routes.admin import admin_bp
-from routes.main import main_bp
 
-# Enregistrement des blueprints
-app.register_blueprint(auth_bp)
-app.register_blueprint(admin_bp)
-app.register_blueprint(main_bp)
+def create_app():
+    """Crée l'application Flask sans toucher à la base de données"""
+    # Création de l'app Flask
+    app = Flask(__name__)
+    app.secret_key = os.environ.get("SESSION_SECRET", "dev_secret_key")
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 
+    # Configuration de la base de données
+    app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL", "sqlite:///gpspathfinder.db")
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config["SQLALCHEMY_DATABASE_URI"])
 
-# User loader
+    # Initialisation des extensions AVANT les imports de blueprints 👇
+    db.init_app(app)
+    with app.app_context():
+        configure_engine(db.engine)
+    login_manager.init_app(app)
+    login_manager.login_view = 'auth.login'
+    login_manager.login_message = None
+
+    # Configuration des uploads
+    app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024
+    app.config['UPLOAD_FOLDER'] = tempfile.gettempdir()
+
+    # Import des blueprints APRÈS initialisation des extensions
+    from routes.auth import auth_bp  # 👈 Ordre modifié
+    from routes.admin import admin_bp
+    from routes.main import main_bp
+
+    # Enregistrement des blueprints
+    app.register_blueprint(auth_bp)
+    app.register_blueprint(admin_bp)
+    app.register_blueprint(main_bp)
+
+    from models import User
+    user_cache.register_invalidation(User)
+
+    app.cli.add_command(bootstrap_command)
+    app.cli.add_command(build_road_graph_command)
+
+    # Chronométrage des requêtes (en-têtes Server-Timing) et endpoint /metrics
+    metrics.init_app(app)
+
+    # Profilage à la demande (administrateurs) ou par échantillonnage (PROFILE_SAMPLE_RATE)
+    profiling.init_app(app)
+
+    # Préchargement optionnel, partagé entre workers par copie sur écriture
+    if os.environ.get('PRELOAD_HEAVY_MODULES', '').lower() in ('1', 'true', 'yes'):
+        preload_heavy_modules()
+
+    return app
+
+
+# User loader : instantané en cache, invalidé à chaque modification de la ligne
 @login_manager.user_loader
 def load_user(user_id):
     from models import User  # 👈 Import local pour éviter les circulaires
-    return User.query.get(int(user_id))
+    return user_cache.get(int(user_id), lambda uid: db.session.get(User, uid))
 
 
-# Création de l'admin initial
-with app.app_context():
+def bootstrap_database():
+    """Crée le schéma, applique les migrations et crée l'admin initial (contexte d'application requis)"""
     db.create_all()
 
+    from migrations import upgrade_database
+    upgrade_database()
+
     from models import User, UserRole  # 👈 Import local
 
+    # Création de l'admin initial
     if User.query.count() == 0:
         admin = User(
             username='admin',
@@ -62,5 +108,36 @@ with app.app_context():
         db.session.commit()
         logging.info('Admin créé')
 
+    # Construit l'index du gazetteer (GAZETTEER_PATH) pour que la première requête n'ait qu'à le relire
+    from utils.geocoder import get_geocoder
+    get_geocoder()
+
+
+@click.command('bootstrap')
+@with_appcontext
+def bootstrap_command():
+    """Initialise la base de données (à lancer une fois avant de démarrer les workers)."""
+    bootstrap_database()
+    click.echo('Base de données initialisée.')
+
+
+@click.command('build-road-graph')
+@click.argument('source', type=click.Path(exists=True, dir_okay=False))
+@click.argument('destination', type=click.Path(file_okay=False))
+@click.option('--tile-degrees', type=float, default=None, help='Côté des tuiles régionales en degrés.')
+def build_road_graph_command(source, destination, tile_degrees):
+    """Prétraite un extrait OSM .osm.pbf en tuiles de graphe routier projetables en mémoire."""
+    from utils.road_network import RoadNetwork, TILE_DEGREES
+
+    network = RoadNetwork.from_osm(source)
+    network.write_tiles(destination, tile_degrees=tile_degrees or TILE_DEGREES)
+    click.echo(f'Graphe routier écrit dans {destination} ({network.node_count} nœuds). '
+               f'Définir ROAD_GRAPH_PATH={destination} pour l\'utiliser.')
+
+
+app = create_app()
+
 if __name__ == '__main__':
+    with app.app_context():
+        bootstrap_database()
     app.run(host='0.0.0.0', port=5000, debug=False)
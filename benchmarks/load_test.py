@@ -0,0 +1,322 @@
+"""
+Test de charge : simule des utilisateurs concurrents sur les vrais blueprints
+(auth.login, main.upload_excel, main.calculate_route, main.save_route,
+main.my_routes, main.view_route) et mesure débit, latences et erreurs.
+
+Usage :
+    python benchmarks/load_test.py [--users 8] [--iterations 5] [--mix 5:50,20:30,60:15,150:5]
+    python benchmarks/load_test.py --database-url postgresql://localhost/gps_load
+    python benchmarks/load_test.py --base-url http://127.0.0.1:5000 --username demo --password secret
+
+Par défaut, l'application est chargée dans ce processus sur une base SQLite
+temporaire, et chaque utilisateur virtuel (un thread) a son propre compte et
+son propre client de test. Avec --base-url, les requêtes partent en HTTP vers
+un serveur déjà lancé (gunicorn par exemple) avec un compte existant.
+
+--mix décrit la répartition des tailles de problème : "taille:poids,...".
+"""
+import argparse
+import html
+import io
+import json
+import os
+import random
+import re
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from http.cookiejar import CookieJar
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Statut attendu de chaque étape du scénario ; tout autre statut compte comme une erreur,
+# sauf les refus de l'ordonnanceur (REJECTED_STATUS) comptés à part
+EXPECTED_STATUS = {
+    'auth.login': 302,
+    'main.upload_excel': 200,
+    'main.calculate_route': 200,
+    'main.save_route': 302,
+    'main.my_routes': 200,
+    'main.view_route': 200,
+}
+REJECTED_STATUS = (429, 503)
+
+LOAD_TEST_PASSWORD = 'loadtest-password'
+
+# Centre des points générés (Paris) et rayon en degrés
+CENTER = (48.8566, 2.3522)
+SPREAD = 0.15
+
+HIDDEN_JSON_FIELD = re.compile(r'name="(start_point|waypoints|leg_distances)" value=\'([^\']*)\'')
+HIDDEN_TOTAL_FIELD = re.compile(r'name="total_distance" value="([^"]*)"')
+ROUTE_LINK = re.compile(r'/route/(\d+)"')
+
+
+class LocalSession:
+    """Client de test Flask : les requêtes traversent l'application dans ce processus"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, data=None, file=None, headers=None):
+        if file is not None:
+            filename, content = file
+            data = dict(data or {}, file=(io.BytesIO(content), filename))
+        response = self.client.open(path, method=method, data=data, headers=headers or {})
+        return response.status_code, response.get_data(as_text=True)
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpSession:
+    """Session HTTP (cookies conservés, redirections non suivies) vers un serveur lancé"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(CookieJar()), _NoRedirect())
+
+    def request(self, method, path, data=None, file=None, headers=None):
+        headers = dict(headers or {})
+        body = None
+        if file is not None:
+            boundary = uuid.uuid4().hex
+            parts = []
+            for key, value in (data or {}).items():
+                parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{key}"\r\n\r\n{value}\r\n'.encode())
+            filename, content = file
+            parts.append(
+                f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+                f'Content-Type: application/octet-stream\r\n\r\n'.encode() + content + b'\r\n'
+            )
+            parts.append(f'--{boundary}--\r\n'.encode())
+            body = b''.join(parts)
+            headers['Content-Type'] = f'multipart/form-data; boundary={boundary}'
+        elif data is not None:
+            body = urllib.parse.urlencode(data, doseq=True).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+
+        request = urllib.request.Request(self.base_url + path, data=body, headers=headers, method=method)
+        try:
+            with self.opener.open(request) as response:
+                return response.status, response.read().decode('utf-8', 'replace')
+        except urllib.error.HTTPError as error:
+            return error.code, error.read().decode('utf-8', 'replace')
+
+
+class Recorder:
+    """Latences et erreurs par endpoint, partagées entre les threads"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {endpoint: [] for endpoint in EXPECTED_STATUS}
+        self.errors = {endpoint: 0 for endpoint in EXPECTED_STATUS}
+        self.rejected = {endpoint: 0 for endpoint in EXPECTED_STATUS}
+
+    def call(self, endpoint, session, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            status, body = session.request(method, path, **kwargs)
+        except OSError:
+            status, body = None, ''
+        elapsed = time.perf_counter() - started
+        ok = status == EXPECTED_STATUS[endpoint]
+        with self.lock:
+            self.samples[endpoint].append(elapsed)
+            if status in REJECTED_STATUS:
+                self.rejected[endpoint] += 1
+            elif not ok:
+                self.errors[endpoint] += 1
+        return ok, body
+
+
+def parse_mix(value):
+    sizes, weights = [], []
+    for item in value.split(','):
+        size, _, weight = item.partition(':')
+        sizes.append(int(size))
+        weights.append(float(weight or 1))
+    return sizes, weights
+
+
+def random_points(rng, count):
+    return [
+        {
+            'name': f'Point {i + 1}',
+            'lat': round(CENTER[0] + rng.uniform(-SPREAD, SPREAD), 6),
+            'lng': round(CENTER[1] + rng.uniform(-SPREAD, SPREAD), 6),
+        }
+        for i in range(count)
+    ]
+
+
+def waypoints_csv(points):
+    lines = ['name,lat,lng'] + [f"{p['name']},{p['lat']},{p['lng']}" for p in points]
+    return '\n'.join(lines).encode()
+
+
+def run_user(session, recorder, username, password, args, seed, deadline):
+    rng = random.Random(seed)
+    sizes, weights = parse_mix(args.mix)
+
+    ok, _ = recorder.call('auth.login', session, 'POST', '/login', data={'username': username, 'password': password})
+    if not ok:
+        return
+
+    iteration = 0
+    while iteration < args.iterations and (deadline is None or time.monotonic() < deadline):
+        iteration += 1
+        size = rng.choices(sizes, weights)[0]
+        start, *points = random_points(rng, size + 1)
+
+        # Import du fichier de points (comme le fetch de la page d'accueil)
+        ok, body = recorder.call('main.upload_excel', session, 'POST', '/upload_excel',
+                                 file=('points.csv', waypoints_csv(points)),
+                                 headers={'X-Requested-With': 'XMLHttpRequest'})
+        waypoints = json.loads(body).get('waypoints', points) if ok else points
+
+        ok, body = recorder.call('main.calculate_route', session, 'POST', '/calculate_route', data={
+            'start_lat': start['lat'],
+            'start_lng': start['lng'],
+            'waypoint_name[]': [p['name'] for p in waypoints],
+            'waypoint_lat[]': [p['lat'] for p in waypoints],
+            'waypoint_lng[]': [p['lng'] for p in waypoints],
+        })
+        total = HIDDEN_TOTAL_FIELD.search(body) if ok else None
+        if total is None:
+            continue
+
+        form = {key: html.unescape(value) for key, value in HIDDEN_JSON_FIELD.findall(body)}
+        form['total_distance'] = total.group(1)
+        form['route_name'] = f'Charge {username} #{iteration} ({size} points)'
+        recorder.call('main.save_route', session, 'POST', '/save_route', data=form)
+
+        ok, body = recorder.call('main.my_routes', session, 'GET', '/my_routes')
+        route_link = ROUTE_LINK.search(body) if ok else None
+        if route_link:
+            recorder.call('main.view_route', session, 'GET', f'/route/{route_link.group(1)}')
+
+        if args.think_time:
+            time.sleep(rng.uniform(0, 2 * args.think_time))
+
+
+def prepare_local_app(args, workdir):
+    """Charge l'application sur une base dédiée et crée un compte par utilisateur virtuel"""
+    os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(workdir, 'load_test.db')}"
+    os.environ.setdefault('DISTANCE_STORE_PATH', os.path.join(workdir, 'distances.bin'))
+    os.environ.setdefault('METRICS_DIR', os.path.join(workdir, 'metrics'))
+    os.environ.setdefault('PROFILE_DIR', os.path.join(workdir, 'profiles'))
+    sys.path.insert(0, ROOT)
+
+    from app import app, bootstrap_database
+    from extensions import db
+    from models import User, UserRole
+    from utils.user_import import provision_users
+
+    usernames = [f'loadtest_{i}' for i in range(args.users)]
+    with app.app_context():
+        bootstrap_database()
+        provision_users(db.session, User, UserRole, [
+            {'username': name, 'email': f'{name}@loadtest.local', 'password': LOAD_TEST_PASSWORD}
+            for name in usernames
+        ])
+    return app, usernames
+
+
+def percentile(sorted_values, fraction):
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(recorder, wall_time):
+    report = {}
+    for endpoint, samples in recorder.samples.items():
+        if not samples:
+            continue
+        ordered = sorted(samples)
+        report[endpoint] = {
+            'requests': len(samples),
+            'errors': recorder.errors[endpoint],
+            'error_rate': recorder.errors[endpoint] / len(samples),
+            'rejected': recorder.rejected[endpoint],
+            'rejected_rate': recorder.rejected[endpoint] / len(samples),
+            'throughput': len(samples) / wall_time,
+            'mean_ms': statistics.fmean(samples) * 1000,
+            'p50_ms': percentile(ordered, 0.50) * 1000,
+            'p95_ms': percentile(ordered, 0.95) * 1000,
+            'p99_ms': percentile(ordered, 0.99) * 1000,
+        }
+    return report
+
+
+def print_report(report, wall_time, args):
+    print(f"{args.users} utilisateurs, {wall_time:.1f} s, mix {args.mix}")
+    header = f"{'Endpoint':<22}{'Req.':>7}{'Req/s':>9}{'Erreurs':>9}{'Refus':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print('-' * len(header))
+    total_requests = total_errors = 0
+    for endpoint, row in report.items():
+        total_requests += row['requests']
+        total_errors += row['errors']
+        print(f"{endpoint:<22}{row['requests']:>7}{row['throughput']:>9.2f}{row['error_rate']:>8.1%} "
+              f"{row['rejected_rate']:>7.1%} {row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+    print('-' * len(header))
+    print(f"{'Total':<22}{total_requests:>7}{total_requests / wall_time:>9.2f}"
+          f"{(total_errors / total_requests if total_requests else 0):>8.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=8, help='utilisateurs virtuels concurrents')
+    parser.add_argument('--iterations', type=int, default=5, help='scénarios complets par utilisateur')
+    parser.add_argument('--duration', type=float, default=None, help='durée maximale en secondes')
+    parser.add_argument('--mix', default='5:50,20:30,60:15,150:5', help='tailles de problème "taille:poids,..."')
+    parser.add_argument('--think-time', type=float, default=0.0, help='pause moyenne entre deux scénarios (s)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database-url', default=None, help='base locale (SQLite temporaire par défaut)')
+    parser.add_argument('--base-url', default=None, help='serveur déjà lancé à tester en HTTP')
+    parser.add_argument('--username', default=None, help='compte existant (avec --base-url)')
+    parser.add_argument('--password', default=None, help='mot de passe du compte (avec --base-url)')
+    parser.add_argument('--json', default=None, help='écrit aussi le rapport dans ce fichier JSON')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='gpspathfinder-load-') as workdir:
+        if args.base_url:
+            if not args.username or not args.password:
+                parser.error('--base-url nécessite --username et --password')
+            accounts = [(HttpSession(args.base_url), args.username, args.password) for _ in range(args.users)]
+        else:
+            app, usernames = prepare_local_app(args, workdir)
+            accounts = [(LocalSession(app), name, LOAD_TEST_PASSWORD) for name in usernames]
+
+        recorder = Recorder()
+        started = time.monotonic()
+        deadline = started + args.duration if args.duration else None
+        threads = [
+            threading.Thread(target=run_user, args=(session, recorder, username, password, args, args.seed + i, deadline))
+            for i, (session, username, password) in enumerate(accounts)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall_time = time.monotonic() - started
+
+    report = summarize(recorder, wall_time)
+    print_report(report, wall_time, args)
+    if args.json:
+        with open(args.json, 'w') as handle:
+            json.dump({'users': args.users, 'mix': args.mix, 'wall_time': wall_time, 'endpoints': report}, handle, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
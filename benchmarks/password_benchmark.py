@@ -0,0 +1,51 @@
+"""
+Mesure le débit de connexions (vérifications de mot de passe) par seconde et par cœur
+pour plusieurs méthodes de hachage werkzeug.
+
+Usage :
+    python benchmarks/password_benchmark.py [--seconds 2] [méthode ...]
+
+Exemple :
+    python benchmarks/password_benchmark.py scrypt:32768:8:1 scrypt:16384:8:1 pbkdf2:sha256:600000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from utils.password_policy import current_method, verify_password  # noqa: E402
+
+DEFAULT_METHODS = ['scrypt:32768:8:1', 'scrypt:16384:8:1', 'pbkdf2:sha256:1000000', 'pbkdf2:sha256:600000']
+
+
+def logins_per_second(method, seconds):
+    """Nombre de vérifications de mot de passe par seconde sur un seul thread"""
+    password_hash = generate_password_hash('correct horse battery staple', method=method)
+    count = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        verify_password(password_hash, 'correct horse battery staple')
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('methods', nargs='*')
+    parser.add_argument('--seconds', type=float, default=2.0)
+    args = parser.parse_args()
+
+    methods = args.methods or [current_method()] + [m for m in DEFAULT_METHODS if m != current_method()]
+    print(f"{'Méthode':<28} {'connexions/s/cœur':>18} {'ms/connexion':>14}")
+    for method in methods:
+        rate = logins_per_second(method, args.seconds)
+        marker = ' (actuelle)' if method == current_method() else ''
+        print(f"{method:<28} {rate:>18.1f} {1000 / rate:>14.1f}{marker}")
+
+
+if __name__ == '__main__':
+    main()
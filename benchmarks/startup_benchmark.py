@@ -0,0 +1,63 @@
+"""
+Mesure le temps de démarrage d'un worker (import de main:app) dans des processus neufs.
+
+Usage :
+    python benchmarks/startup_benchmark.py [--runs 5] [--max-seconds 1.0]
+
+Avec --max-seconds, le script échoue (code 1) si la médiane dépasse le seuil,
+et signale les bibliothèques lourdes chargées dès l'import.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Affiche la durée d'import et les modules lourds déjà chargés
+PROBE = """
+import sys, time
+started = time.perf_counter()
+import main
+elapsed = time.perf_counter() - started
+heavy = [m for m in ('pandas', 'folium', 'networkx', 'geopy') if m in sys.modules]
+print(elapsed, ','.join(heavy))
+"""
+
+
+def measure_once():
+    env = dict(os.environ, PRELOAD_HEAVY_MODULES='')
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout.strip().splitlines()[-1]
+    elapsed, heavy = output.split(' ', 1) if ' ' in output else (output, '')
+    return float(elapsed), [m for m in heavy.split(',') if m]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-seconds', type=float, default=None)
+    args = parser.parse_args()
+
+    timings = []
+    heavy = []
+    for _ in range(args.runs):
+        elapsed, heavy = measure_once()
+        timings.append(elapsed)
+
+    median = statistics.median(timings)
+    print(f"Import de main:app : médiane {median * 1000:.0f} ms, min {min(timings) * 1000:.0f} ms, "
+          f"max {max(timings) * 1000:.0f} ms sur {args.runs} essais")
+    if heavy:
+        print(f"Modules lourds chargés au démarrage : {', '.join(heavy)}")
+
+    if args.max_seconds is not None and (median > args.max_seconds or heavy):
+        print('ÉCHEC : le démarrage dépasse le budget fixé', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
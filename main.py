@@ -1,4 +1,6 @@
-from app import app
+from app import app, bootstrap_database
 
 if __name__ == "__main__":
+    with app.app_context():
+        bootstrap_database()
     app.run(host="0.0.0.0", port=5000, debug=True)
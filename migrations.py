@@ -0,0 +1,166 @@
+import logging
+
+import sqlalchemy as sa
+
+from extensions import db
+from utils.geo_utils import calculate_distance
+from utils.route_codec import encode_points, pack_floats
+
+# Taille des lots lors de la conversion des lignes existantes
+BATCH_SIZE = 500
+
+
+def _column_names(connection, table_name):
+    inspector = sa.inspect(connection)
+    if not inspector.has_table(table_name):
+        return None
+    return {column['name'] for column in inspector.get_columns(table_name)}
+
+
+def _add_column(connection, table_name, column_name, column_type):
+    type_sql = column_type.compile(dialect=connection.dialect)
+    connection.execute(sa.text(f'ALTER TABLE {table_name} ADD COLUMN {column_name} {type_sql}'))
+
+
+def _set_not_null(connection, table_name, column_name, column_type):
+    """
+    Rend une colonne NOT NULL une fois ses lignes remplies, pour rejoindre le modèle.
+
+    SQLite ne sait pas modifier la contrainte d'une colonne existante : il faudrait
+    reconstruire la table (copie, suppression, renommage, index), ce qui n'est pas fait
+    ici. La colonne y reste nullable ; l'ORM renseigne toujours ces colonnes.
+    """
+    dialect = connection.dialect.name
+    if dialect == 'postgresql':
+        connection.execute(sa.text(f'ALTER TABLE {table_name} ALTER COLUMN {column_name} SET NOT NULL'))
+    elif dialect in ('mysql', 'mariadb'):
+        type_sql = column_type.compile(dialect=connection.dialect)
+        connection.execute(sa.text(f'ALTER TABLE {table_name} MODIFY {column_name} {type_sql} NOT NULL'))
+
+
+def pack_saved_route_geometry(connection):
+    """
+    Convertit les colonnes JSON start_point/waypoints de saved_routes
+    vers le stockage binaire (coordinates, point_names, leg_distances).
+    """
+    columns = _column_names(connection, 'saved_routes')
+    if columns is None or 'coordinates' in columns or 'start_point' not in columns:
+        return
+
+    logging.info('Migration de saved_routes vers le stockage binaire')
+    _add_column(connection, 'saved_routes', 'coordinates', db.LargeBinary())
+    _add_column(connection, 'saved_routes', 'point_names', db.JSON())
+    _add_column(connection, 'saved_routes', 'leg_distances', db.LargeBinary())
+
+    saved_routes = sa.table(
+        'saved_routes',
+        sa.column('id', sa.Integer),
+        sa.column('start_point', sa.JSON),
+        sa.column('waypoints', sa.JSON),
+        sa.column('coordinates', sa.LargeBinary),
+        sa.column('point_names', sa.JSON),
+        sa.column('leg_distances', sa.LargeBinary),
+    )
+    update = (
+        saved_routes.update()
+        .where(saved_routes.c.id == sa.bindparam('route_id'))
+        .values(
+            coordinates=sa.bindparam('coordinates'),
+            point_names=sa.bindparam('point_names'),
+            leg_distances=sa.bindparam('leg_distances'),
+        )
+    )
+
+    while True:
+        rows = connection.execute(
+            sa.select(saved_routes.c.id, saved_routes.c.start_point, saved_routes.c.waypoints)
+            .where(saved_routes.c.coordinates.is_(None))
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+
+        params = []
+        for route_id, start_point, waypoints in rows:
+            points = [start_point] + list(waypoints or [])
+            legs = [
+                calculate_distance((points[i]['lat'], points[i]['lng']), (points[i + 1]['lat'], points[i + 1]['lng']))
+                for i in range(len(points) - 1)
+            ]
+            coordinates, names = encode_points(points)
+            params.append({
+                'route_id': route_id,
+                'coordinates': coordinates,
+                'point_names': names,
+                'leg_distances': pack_floats(legs),
+            })
+        connection.execute(update, params)
+
+    # Colonnes ajoutées nullables puis remplies : la contrainte du modèle ne s'applique qu'après
+    _set_not_null(connection, 'saved_routes', 'coordinates', db.LargeBinary())
+    _set_not_null(connection, 'saved_routes', 'point_names', db.JSON())
+    connection.execute(sa.text('ALTER TABLE saved_routes DROP COLUMN start_point'))
+    connection.execute(sa.text('ALTER TABLE saved_routes DROP COLUMN waypoints'))
+
+
+def add_saved_route_summary(connection):
+    """
+    Ajoute les colonnes de résumé start_name/waypoint_count de saved_routes,
+    les remplit depuis point_names et crée l'index de pagination.
+    """
+    columns = _column_names(connection, 'saved_routes')
+    if columns is None:
+        return
+
+    if 'waypoint_count' not in columns:
+        logging.info('Ajout des colonnes de résumé de saved_routes')
+        _add_column(connection, 'saved_routes', 'start_name', db.String(100))
+        _add_column(connection, 'saved_routes', 'waypoint_count', db.Integer())
+
+        saved_routes = sa.table(
+            'saved_routes',
+            sa.column('id', sa.Integer),
+            sa.column('point_names', sa.JSON),
+            sa.column('start_name', sa.String),
+            sa.column('waypoint_count', sa.Integer),
+        )
+        update = (
+            saved_routes.update()
+            .where(saved_routes.c.id == sa.bindparam('route_id'))
+            .values(start_name=sa.bindparam('start_name'), waypoint_count=sa.bindparam('waypoint_count'))
+        )
+        while True:
+            rows = connection.execute(
+                sa.select(saved_routes.c.id, saved_routes.c.point_names)
+                .where(saved_routes.c.waypoint_count.is_(None))
+                .limit(BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+            connection.execute(update, [
+                {
+                    'route_id': route_id,
+                    'start_name': names[0][:100] if names else None,
+                    'waypoint_count': max(len(names or []) - 1, 0),
+                }
+                for route_id, names in rows
+            ])
+        _set_not_null(connection, 'saved_routes', 'waypoint_count', db.Integer())
+
+    from models import SavedRoute
+    for index in SavedRoute.__table__.indexes:
+        index.create(connection, checkfirst=True)
+
+
+# Migrations appliquées dans l'ordre ; chacune doit être idempotente
+MIGRATIONS = [
+    pack_saved_route_geometry,
+    add_saved_route_summary,
+]
+
+
+def upgrade_database():
+    """Applique les migrations en attente sur la base courante (à appeler dans un contexte d'application)"""
+    with db.engine.begin() as connection:
+        for migration in MIGRATIONS:
+            migration(connection)
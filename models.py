@@ -4,9 +4,12 @@ from datetime import datetime, timedelta
 from enum import Enum
 
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
 
 from extensions import db  # 👈 Modification clé : import depuis extensions
+from utils.password_policy import hash_password, verify_password, needs_rehash
+from utils.route_codec import encode_points, decode_points, decode_waypoint_set, pack_floats, unpack_floats
+from utils.route_editor import edit_route
+from utils.waypoints import WaypointSet
 
 
 class UserRole(Enum):
@@ -57,10 +60,14 @@ class User(UserMixin, db.Model):
             self.is_verified = True
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        """Indique si le hash stocké ne correspond plus à la politique de hachage actuelle"""
+        return needs_rehash(self.password_hash)
 
     def is_admin(self):
         return self._role == UserRole.ADMIN
@@ -72,6 +79,15 @@ class User(UserMixin, db.Model):
                 self.access_until is None or datetime.utcnow() <= self.access_until
         )
 
+    @classmethod
+    def valid_access_filter(cls, now=None):
+        """Condition SQL équivalente à has_valid_access, pour filtrer les utilisateurs en base"""
+        now = now or datetime.utcnow()
+        return (cls._role == UserRole.ADMIN) | (
+                cls.is_active.is_(True) & cls.is_verified.is_(True) &
+                (cls.access_until.is_(None) | (cls.access_until >= now))
+        )
+
     def generate_activation_code(self, expiration_days=7):
         """Génère un code d'activation unique"""
         code_chars = string.ascii_uppercase + string.digits
@@ -101,12 +117,72 @@ class User(UserMixin, db.Model):
 
 class SavedRoute(db.Model):
     __tablename__ = 'saved_routes'
+    __table_args__ = (
+        # Index de la pagination par clé (user_id, created_at, id) de la liste des itinéraires
+        db.Index('ix_saved_routes_user_created', 'user_id', 'created_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    start_point = db.Column(db.JSON, nullable=False)
-    waypoints = db.Column(db.JSON, nullable=False)
+    # Géométrie compacte : paires (lat, lng) en float64, point de départ en premier.
+    # Chargée uniquement à la demande (groupe "geometry") pour que les listes restent légères.
+    coordinates = db.deferred(db.Column(db.LargeBinary, nullable=False), group='geometry')
+    point_names = db.deferred(db.Column(db.JSON, nullable=False), group='geometry')
+    # Distance (km) de chaque tronçon, en float64
+    leg_distances = db.deferred(db.Column(db.LargeBinary, nullable=True), group='geometry')
+    # Résumé stocké pour l'affichage des listes sans décoder la géométrie
+    start_name = db.Column(db.String(100), nullable=True)
+    waypoint_count = db.Column(db.Integer, nullable=False, default=0)
     total_distance = db.Column(db.Float, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    def set_points(self, start_point, waypoints, leg_distances=None):
+        """Enregistre le point de départ, les points de passage et les distances par tronçon"""
+        if isinstance(waypoints, WaypointSet):
+            points = WaypointSet.from_points([start_point]).concat(waypoints)
+        else:
+            points = [start_point] + list(waypoints)
+        self.coordinates, self.point_names = encode_points(points)
+        self.leg_distances = pack_floats(leg_distances) if leg_distances is not None else None
+        self.start_name = self.point_names[0][:100]
+        self.waypoint_count = len(points) - 1
+        self._points = None
+
+    @property
+    def points(self):
+        """Itinéraire complet (départ + points de passage), décodé une seule fois par instance"""
+        if getattr(self, '_points', None) is None:
+            self._points = decode_points(self.coordinates, self.point_names)
+        return self._points
+
+    @property
+    def waypoint_set(self):
+        """Itinéraire complet sous forme de WaypointSet (vues sur les coordonnées stockées, sans copie)"""
+        return decode_waypoint_set(self.coordinates, self.point_names)
+
+    @property
+    def start_point(self):
+        return self.points[0]
+
+    @property
+    def waypoints(self):
+        return self.points[1:]
+
+    @property
+    def legs(self):
+        """Distances par tronçon (km), ou None pour les anciens itinéraires sans détail"""
+        if self.leg_distances is None:
+            return None
+        return list(unpack_floats(self.leg_distances))
+
+    def apply_edits(self, add=(), remove=(), road_network=None):
+        """
+        Ajoute et/ou retire des points de passage sans tout réoptimiser : insertion au moindre coût,
+        suppression par raccordement, puis amélioration locale autour des positions modifiées.
+        Avec un réseau routier, les distances sont routières, comme à la création de l'itinéraire.
+        """
+        points, legs = edit_route(self.points, self.legs, add=add, remove=remove, road_network=road_network)
+        self.set_points(points[0], points[1:], legs)
+        self.total_distance = sum(legs)
@@ -1,11 +1,21 @@
+import logging
 from datetime import datetime, timedelta
 
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, send_file, abort
 from flask_login import login_required, current_user
+from sqlalchemy import func
 
 # from app import db
 from extensions import db  # 👈 Import modifié
-from models import User, UserRole
+from models import User, UserRole, SavedRoute
+from utils.db_engine import pool_status
+from utils.profiling import list_profiles, load_profile, profile_path, sample_rate
+from utils.route_export import EXPORT_FORMATS, export_response, iter_routes
+from utils.tabular_upload import allowed_file, read_uploaded_table
+from utils.user_import import REQUIRED_COLUMNS, provision_users
+
+# Nombre d'utilisateurs par page dans la liste d'administration
+USERS_PER_PAGE = 50
 
 # Créer le blueprint d'administration
 admin_bp = Blueprint('admin', __name__)
@@ -34,9 +44,55 @@ def index():
 @admin_bp.route('/admin/users')
 @admin_required
 def users():
-    # Récupérer tous les utilisateurs
-    users = User.query.order_by(User.username).all()
-    return render_template('admin/users.html', users=users)
+    search = request.args.get('q', '').strip()
+    role = request.args.get('role', '')
+    status = request.args.get('status', '')
+    page = request.args.get('page', 1, type=int)
+
+    query = User.query
+
+    # Recherche par préfixe sous forme d'intervalle pour profiter des index sur username/email
+    if search:
+        upper_bound = search + '\uffff'
+        query = query.filter(
+            ((User.username >= search) & (User.username < upper_bound)) |
+            ((User.email >= search) & (User.email < upper_bound))
+        )
+
+    if role in ('admin', 'user'):
+        query = query.filter(User._role == UserRole(role))
+
+    now = datetime.utcnow()
+    if status == 'active':
+        # Mêmes conditions que User.has_valid_access : comptes qui peuvent réellement se connecter
+        query = query.filter(User.valid_access_filter(now))
+    elif status == 'inactive':
+        query = query.filter(User.is_active.is_(False))
+    elif status == 'expired':
+        query = query.filter(User.access_until < now)
+
+    pagination = query.order_by(User.username).paginate(page=page, per_page=USERS_PER_PAGE, error_out=False)
+
+    # Statistiques d'itinéraires de la page en une seule requête agrégée
+    user_ids = [user.id for user in pagination.items]
+    route_stats = {}
+    if user_ids:
+        rows = db.session.query(
+            SavedRoute.user_id,
+            func.count(SavedRoute.id),
+            func.coalesce(func.sum(SavedRoute.total_distance), 0.0)
+        ).filter(SavedRoute.user_id.in_(user_ids)).group_by(SavedRoute.user_id).all()
+        route_stats = {user_id: (count, distance) for user_id, count, distance in rows}
+
+    return render_template(
+        'admin/users.html',
+        users=pagination.items,
+        pagination=pagination,
+        route_stats=route_stats,
+        search=search,
+        role=role,
+        status=status
+    )
 
 
 @admin_bp.route('/admin/users/add', methods=['GET', 'POST'])
@@ -183,6 +239,51 @@ def add_user():
     return form_html
 
 
+@admin_bp.route('/admin/users/import', methods=['GET', 'POST'])
+@admin_required
+def import_users():
+    if request.method == 'GET':
+        return render_template('admin/import_users.html', report=None)
+
+    is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    file = request.files.get('file')
+
+    if not file or file.filename == '' or not allowed_file(file.filename):
+        error_msg = 'Veuillez sélectionner un fichier .xlsx, .xls ou .csv'
+        if is_ajax:
+            return jsonify({'error': error_msg}), 400
+        flash(error_msg, 'danger')
+        return redirect(url_for('admin.import_users'))
+
+    try:
+        df = read_uploaded_table(file)
+
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+        if missing_columns:
+            error_msg = f'Colonnes manquantes: {", ".join(missing_columns)}. Le fichier doit contenir les colonnes: username, email, password'
+            if is_ajax:
+                return jsonify({'error': error_msg}), 400
+            flash(error_msg, 'danger')
+            return redirect(url_for('admin.import_users'))
+
+        report = provision_users(db.session, User, UserRole, df.to_dict('records'))
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Erreur lors de l'import des utilisateurs: {str(e)}")
+        if is_ajax:
+            return jsonify({'error': f'Erreur lors de l\'import: {str(e)}'}), 500
+        flash(f'Erreur lors de l\'import: {str(e)}', 'danger')
+        return redirect(url_for('admin.import_users'))
+
+    created = sum(1 for entry in report if entry['status'] == 'created')
+    if is_ajax:
+        return jsonify({'created': created, 'skipped': len(report) - created, 'rows': report})
+
+    flash(f'{created} utilisateur(s) créé(s), {len(report) - created} ligne(s) ignorée(s).',
+          'success' if created else 'warning')
+    return render_template('admin/import_users.html', report=report)
+
+
 @admin_bp.route('/admin/users/<int:user_id>/generate-activation', methods=['GET'])
 @admin_required
 def generate_activation_code(user_id):
@@ -380,3 +481,55 @@ def delete_user(user_id):
 
     flash(f'L\'utilisateur {username} a été supprimé avec succès.', 'success')
     return redirect(url_for('admin.users'))
+
+
+@admin_bp.route('/admin/db-stats')
+@admin_required
+def db_stats():
+    # Statistiques du pool de connexions de ce worker (taille, attentes, dépassements)
+    return jsonify(pool_status(db.engine))
+
+
+@admin_bp.route('/admin/routes/export/<export_format>')
+@admin_required
+def export_routes(export_format):
+    # Export en flux des itinéraires des utilisateurs sélectionnés (?user_id=1&user_id=2), ou de tous
+    if export_format not in EXPORT_FORMATS:
+        abort(404)
+    user_ids = request.args.getlist('user_id', type=int)
+    query = SavedRoute.query
+    if user_ids:
+        query = query.filter(SavedRoute.user_id.in_(user_ids))
+    basename = 'itineraires-' + ('-'.join(map(str, user_ids[:5])) if user_ids else 'tous')
+    return export_response(iter_routes(query), export_format, basename, archive=request.args.get('archive') == 'zip')
+
+
+@admin_bp.route('/admin/profiles')
+@admin_required
+def profiles():
+    # Profils enregistrés (à la demande via ?profile=1 / X-Profile: 1, ou par échantillonnage)
+    return render_template('admin/profiles.html', profiles=list_profiles(), sample_rate=sample_rate())
+
+
+@admin_bp.route('/admin/profiles/<name>')
+@admin_required
+def profile_detail(name):
+    sort = 'tottime' if request.args.get('sort') == 'tottime' else 'cumulative'
+    loaded = load_profile(name, sort=sort)
+    if loaded is None:
+        flash('Profil introuvable.', 'danger')
+        return redirect(url_for('admin.profiles'))
+
+    summary, functions = loaded
+    return render_template('admin/profile_detail.html', profile=summary, functions=functions, sort=sort)
+
+
+@admin_bp.route('/admin/profiles/<name>/download')
+@admin_required
+def profile_download(name):
+    # Fichier brut, lisible avec pstats ou snakeviz
+    path = profile_path(name)
+    if path is None:
+        flash('Profil introuvable.', 'danger')
+        return redirect(url_for('admin.profiles'))
+    return send_file(path, as_attachment=True, download_name=f'{name}.prof')
@@ -165,6 +165,11 @@ def login():
 
         # Connexion réussie, mettre à jour last_login
         user.last_login = datetime.utcnow()
+
+        # Mettre à niveau le hash si la politique de hachage a changé
+        if user.password_needs_rehash():
+            user.set_password(password)
+
         db.session.commit()
 
         # Se connecter
@@ -323,8 +328,11 @@ def change_password():
     new_password = request.form.get('new_password')
     confirm_password = request.form.get('confirm_password')
 
+    # current_user est un instantané en lecture seule : charger la ligne à modifier
+    user = db.session.get(User, current_user.id)
+
     # Vérifier si le mot de passe actuel est correct
-    if not current_user.check_password(current_password):
+    if not user.check_password(current_password):
         flash('Le mot de passe actuel est incorrect.', 'danger')
         return redirect(url_for('auth.profile'))
 
@@ -339,7 +347,7 @@ def change_password():
         return redirect(url_for('auth.profile'))
 
     # Mettre à jour le mot de passe
-    current_user.set_password(new_password)
+    user.set_password(new_password)
     db.session.commit()
 
     flash('Votre mot de passe a été mis à jour avec succès.', 'success')
@@ -1,27 +1,205 @@
 import json
 import logging
-import os
-import tempfile
+from datetime import datetime
 
-import folium
-import pandas as pd
-from flask import Blueprint, render_template, request, jsonify, session, flash, redirect, url_for
+import numpy as np
+from flask import Blueprint, render_template, request, jsonify, session, flash, redirect, url_for, make_response, abort
 from flask_login import login_required, current_user
-from werkzeug.utils import secure_filename
 
 # from app import db
 from extensions import db  # 👈 Import modifié
 from models import SavedRoute
-from utils.geo_utils import validate_coordinates, calculate_distance
-from utils.route_optimizer import optimize_route
+from utils.distance_matrix import build_distance_matrix, leg_distances as route_leg_distances
+from utils.geo_utils import validate_coordinates
+from utils.geocoder import get_geocoder
+from utils.metrics import stage, record_problem
+from utils.road_network import get_road_network
+from utils.route_export import EXPORT_FORMATS, export_basename, export_response, iter_routes, slugify
+from utils.route_optimizer import optimize_route, solver_engine
+from utils.route_repair import DEFAULT_PASSES, DEFAULT_TIME_LIMIT, MAX_PASSES, MAX_TIME_LIMIT, repair_order
+from utils.solver_scheduler import SchedulerBusy, solver_slot
+from utils.tabular_upload import allowed_file, read_uploaded_table
+from utils.time_windows import format_clock, has_time_windows, parse_clock
+from utils.travel_profiles import get_speed_profiles
+from utils.tour_split import split_route as split_into_days
+from utils.waypoints import WaypointSet, coordinate_arrays
+
+# Nombre d'itinéraires par page dans "Mes itinéraires"
+ROUTES_PER_PAGE = 25
+
+# Heure de départ par défaut (minutes depuis minuit) pour les fenêtres horaires
+DEFAULT_DEPARTURE = 8 * 60
+
+# Colonnes d'adresse acceptées pour le géocodage hors ligne, et colonnes complémentaires
+ADDRESS_COLUMNS = ('address', 'adresse')
+ADDRESS_DETAIL_COLUMNS = ('postcode', 'code_postal', 'city', 'ville')
+
+
+def format_route_cursor(route):
+    """Construit le curseur de pagination à partir du dernier itinéraire affiché"""
+    return f"{route.created_at.isoformat()}_{route.id}"
+
+
+def parse_route_cursor(cursor):
+    """Décode un curseur de pagination, ou retourne None s'il est absent ou invalide"""
+    if not cursor:
+        return None
+    try:
+        created_at, route_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(created_at), int(route_id)
+    except ValueError:
+        return None
+
+
+def cell_text(value):
+    """Texte d'une cellule importée, ou None si elle est vide (les codes postaux lus comme 75001.0 redeviennent 75001)"""
+    if value is None or value != value or value == '':
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def geocode_frame(df, address_column, geocoder):
+    """
+    Complète en place les coordonnées manquantes du tableau importé à partir de son adresse.
+
+    Les adresses sont résolues en un seul lot par le géocodeur local ; le nom
+    du point reprend l'adresse s'il est absent.
+
+    Returns:
+        list: Adresses non résolues
+    """
+    import pandas as pd  # Import différé, comme pour la lecture du fichier
+
+    columns = [col for col in (address_column,) + ADDRESS_DETAIL_COLUMNS if col in df.columns]
+    parts = zip(*([cell_text(value) for value in df[col].tolist()] for col in columns))
+    addresses = [' '.join(part for part in row if part) for row in parts]
+    has_address = np.array([bool(address) for address in addresses], dtype=bool)
+
+    names = [cell_text(value) for value in df['name'].tolist()] if 'name' in df.columns else [None] * len(df)
+    df['name'] = [address if name is None and address else name for name, address in zip(names, addresses)]
+
+    lat = pd.to_numeric(df['lat'], errors='coerce').to_numpy(dtype=np.float64) if 'lat' in df.columns \
+        else np.full(len(df), np.nan)
+    lng = pd.to_numeric(df['lng'], errors='coerce').to_numpy(dtype=np.float64) if 'lng' in df.columns \
+        else np.full(len(df), np.nan)
+    pending = np.flatnonzero(has_address & (np.isnan(lat) | np.isnan(lng)))
+
+    unresolved = []
+    results = geocoder.geocode_many([addresses[row] for row in pending])
+    for row, result in zip(pending, results):
+        if result is None:
+            unresolved.append(addresses[row])
+        else:
+            lat[row], lng[row] = result['lat'], result['lng']
+    df['lat'], df['lng'] = lat, lng
+    return unresolved
+
+
+def scheduler_busy_message(busy, count):
+    """Message, catégorie et code HTTP d'un calcul refusé par l'ordonnanceur"""
+    if busy.reason == 'too_large':
+        return (f'Itinéraire trop volumineux ({count} points) pour être calculé dans le délai imparti. '
+                'Découpez-le en plusieurs tournées.', 'danger', 413)
+    if busy.reason == 'user':
+        return f'Vous avez déjà des calculs en cours. Réessayez dans {busy.retry_after} s.', 'warning', 429
+    return f'Le serveur est saturé. Réessayez dans {busy.retry_after} s.', 'warning', 503
+
+
+def scheduler_busy_response(busy, waypoints):
+    """Réaffiche le formulaire avec les points saisis lorsque le calcul est refusé par l'ordonnanceur"""
+    message, category, status = scheduler_busy_message(busy, len(waypoints))
+    flash(message, category)
+
+    response = make_response(render_template('index.html', imported_waypoints=waypoints), status)
+    if busy.retry_after:
+        response.headers['Retry-After'] = str(busy.retry_after)
+    return response
+
+
+def scheduler_busy_json(busy, count):
+    """Réponse JSON des endpoints d'API lorsque le calcul est refusé par l'ordonnanceur"""
+    message, _, status = scheduler_busy_message(busy, count)
+    response = make_response(jsonify({'error': message}), status)
+    if busy.retry_after:
+        response.headers['Retry-After'] = str(busy.retry_after)
+    return response
+
+
+def parse_waypoints_form(form):
+    """Extrait les points de passage valides des champs waypoint_name[], waypoint_lat[] et waypoint_lng[] (WaypointSet)"""
+    columns = {key: [] for key in ('name', 'lat', 'lng', 'tw_start', 'tw_end', 'service_min')}
+    waypoint_names = form.getlist('waypoint_name[]')
+    waypoint_lats = form.getlist('waypoint_lat[]')
+    waypoint_lngs = form.getlist('waypoint_lng[]')
+
+    # Fenêtres horaires et durées de service (facultatives)
+    tw_starts = form.getlist('waypoint_tw_start[]')
+    tw_ends = form.getlist('waypoint_tw_end[]')
+    service_mins = form.getlist('waypoint_service_min[]')
+
+    # Traiter chaque point de passage
+    for i in range(len(waypoint_lats)):
+        try:
+            lat = float(waypoint_lats[i])
+            lng = float(waypoint_lngs[i])
+        except (ValueError, IndexError) as e:
+            logging.error(f"Erreur de traitement du point {i}: {e}")
+            continue
+        if validate_coordinates(lat, lng):
+            columns['name'].append(waypoint_names[i] if i < len(waypoint_names) else f"Point {i + 1}")
+            columns['lat'].append(lat)
+            columns['lng'].append(lng)
+            columns['tw_start'].append(tw_starts[i] if i < len(tw_starts) else None)
+            columns['tw_end'].append(tw_ends[i] if i < len(tw_ends) else None)
+            columns['service_min'].append(service_mins[i] if i < len(service_mins) else None)
+    return WaypointSet.from_columns(columns.pop('lat'), columns.pop('lng'), columns.pop('name'), **columns)
+
+
+def build_route_map(route):
+    """Construit la carte folium (HTML) et l'URL Google Maps d'un itinéraire ordonné"""
+    import folium  # Import différé : évite de charger folium au démarrage des workers
 
-# Définir les extensions de fichiers autorisées
-ALLOWED_EXTENSIONS = {'xlsx', 'xls', 'csv'}
+    # Créer la carte
+    route = WaypointSet.from_points(route)
+    m = folium.Map(location=[route.lat[0], route.lng[0]], zoom_start=13)
 
+    # Ajouter des marqueurs et un chemin à la carte
+    coordinates = np.column_stack([route.lat, route.lng]).tolist()
+    last = len(route) - 1
+    for i, location in enumerate(coordinates):
+        tooltip = route.name(i)
+        icon_color = 'green' if i == 0 else 'red' if i == last else 'blue'
+        folium.Marker(
+            location,
+            tooltip=tooltip,
+            popup=tooltip,
+            icon=folium.Icon(color=icon_color)
+        ).add_to(m)
+
+    # Ajouter une ligne pour le trajet
+    folium.PolyLine(
+        coordinates,
+        weight=3,
+        color='blue',
+        opacity=0.7
+    ).add_to(m)
 
-def allowed_file(filename):
-    """Vérifie si l'extension du fichier est autorisée"""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    # Enregistrer la carte en HTML
+    return m._repr_html_(), build_google_maps_url(route)
+
+
+def build_google_maps_url(route):
+    """URL d'itinéraire Google Maps d'une liste ordonnée de points (ou d'un WaypointSet)"""
+    lats, lngs = coordinate_arrays(route)
+    return "https://www.google.com/maps/dir/?api=1&origin={},{}&destination={},{}&waypoints={}".format(
+        lats[0],
+        lngs[0],
+        lats[-1],
+        lngs[-1],
+        "|".join([f"{lat},{lng}" for lat, lng in zip(lats[1:-1].tolist(), lngs[1:-1].tolist())])
+    )
 
 
 # Créer le blueprint principal
@@ -41,37 +219,19 @@ def index():
 def calculate_route():
     try:
         # Récupérer les données du formulaire
-        start_lat = float(request.form.get('start_lat', 0))
-        start_lng = float(request.form.get('start_lng', 0))
+        with stage('parse'):
+            start_lat = float(request.form.get('start_lat', 0))
+            start_lng = float(request.form.get('start_lng', 0))
+            waypoints = parse_waypoints_form(request.form)
+            departure_time = parse_clock(request.form.get('departure_time'))
+            if departure_time is None:
+                departure_time = DEFAULT_DEPARTURE
 
         # Valider le point de départ
         if not validate_coordinates(start_lat, start_lng):
             flash('Coordonnées de départ invalides', 'danger')
             return redirect(url_for('main.index'))
 
-        # Traiter les points de passage du formulaire
-        waypoints = []
-        waypoint_names = request.form.getlist('waypoint_name[]')
-        waypoint_lats = request.form.getlist('waypoint_lat[]')
-        waypoint_lngs = request.form.getlist('waypoint_lng[]')
-
-        # Traiter chaque point de passage
-        for i in range(len(waypoint_lats)):
-            try:
-                name = waypoint_names[i] if i < len(waypoint_names) else f"Point {i + 1}"
-                lat = float(waypoint_lats[i])
-                lng = float(waypoint_lngs[i])
-
-                if validate_coordinates(lat, lng):
-                    waypoints.append({
-                        'name': name,
-                        'lat': lat,
-                        'lng': lng
-                    })
-            except (ValueError, IndexError) as e:
-                logging.error(f"Erreur de traitement du point {i}: {e}")
-                continue
-
         # Vérifier si nous avons assez de points de passage
         if len(waypoints) < 1:
             flash('Veuillez ajouter au moins un point de passage valide', 'warning')
@@ -84,65 +244,56 @@ def calculate_route():
             'lng': start_lng
         }
 
-        # Optimiser l'itinéraire (solution TSP)
-        optimized_route = optimize_route(start_point, waypoints)
-
-        # Créer la carte
-        map_center = [start_lat, start_lng]
-        m = folium.Map(location=map_center, zoom_start=13)
-
-        # Ajouter des marqueurs et un chemin à la carte
-        coordinates = []
-        for i, point in enumerate(optimized_route):
-            tooltip = point['name']
-            icon_color = 'green' if i == 0 else 'red' if i == len(optimized_route) - 1 else 'blue'
-            folium.Marker(
-                [point['lat'], point['lng']],
-                tooltip=tooltip,
-                popup=tooltip,
-                icon=folium.Icon(color=icon_color)
-            ).add_to(m)
-            coordinates.append([point['lat'], point['lng']])
-
-        # Ajouter une ligne pour le trajet
-        folium.PolyLine(
-            coordinates,
-            weight=3,
-            color='blue',
-            opacity=0.7
-        ).add_to(m)
-
-        # Générer l'URL Google Maps
-        google_maps_url = "https://www.google.com/maps/dir/?api=1&origin={},{}&destination={},{}&waypoints={}".format(
-            start_lat,
-            start_lng,
-            optimized_route[-1]['lat'],
-            optimized_route[-1]['lng'],
-            "|".join([f"{p['lat']},{p['lng']}" for p in optimized_route[1:-1]])
-        )
-
-        # Calculer la distance totale
-        total_distance = 0
-        for i in range(len(optimized_route) - 1):
-            point1 = (optimized_route[i]['lat'], optimized_route[i]['lng'])
-            point2 = (optimized_route[i + 1]['lat'], optimized_route[i + 1]['lng'])
-            total_distance += calculate_distance(point1, point2)
-
-        # Enregistrer la carte en HTML
-        map_html = m._repr_html_()
+        # Optimiser l'itinéraire (solution TSP) ; les étapes matrix/solve sont chronométrées par l'optimiseur
+        # Distances routières si un graphe routier est configuré (ROAD_GRAPH_PATH), sinon à vol d'oiseau
+        road_network = get_road_network()
+        solver_stats = {}
+        engine = solver_engine(len(waypoints) + 1, has_time_windows(waypoints))
+        try:
+            # Admission par l'ordonnanceur : voie rapide pour les petits itinéraires, limite par utilisateur
+            with solver_slot(current_user.id, len(waypoints) + 1, engine, road_network is not None):
+                optimized_route = optimize_route(
+                    start_point, waypoints, stats=solver_stats,
+                    matrix_provider=road_network.distance_matrix if road_network else None,
+                    time_matrix_provider=road_network.travel_time_matrix if road_network else None,
+                    departure=departure_time,
+                    # Profils de vitesse horaires (SPEED_PROFILES_PATH) : durée minimisée pour l'heure de départ
+                    speed_profiles=get_speed_profiles()
+                )
+        except SchedulerBusy as busy:
+            return scheduler_busy_response(busy, waypoints.to_points())
+        if solver_stats.get('late_stops'):
+            flash(f"{solver_stats['late_stops']} point(s) ne peuvent pas être servis dans leur fenêtre horaire", 'warning')
+        record_problem(size=len(waypoints) + 1, engine=solver_stats.get('engine'))
+
+        # Créer la carte et l'URL Google Maps
+        with stage('map'):
+            map_html, google_maps_url = build_route_map(optimized_route)
+
+        # Calculer la distance de chaque tronçon et la distance totale
+        with stage('legs'):
+            if road_network:
+                leg_distances = road_network.leg_distances(optimized_route)
+            else:
+                leg_distances = route_leg_distances(optimized_route)
+            total_distance = sum(leg_distances)
 
         # On peut sauvegarder la route si l'utilisateur est connecté
         can_save = current_user.is_authenticated
 
-        return render_template(
-            'map.html',
-            map_html=map_html,
-            route=optimized_route,
-            google_maps_url=google_maps_url,
-            total_distance=total_distance,
-            can_save=can_save,
-            saved_route=False
-        )
+        with stage('render'):
+            return render_template(
+                'map.html',
+                map_html=map_html,
+                route=optimized_route.to_points(),
+                google_maps_url=google_maps_url,
+                total_distance=total_distance,
+                total_duration=solver_stats.get('duration_min'),
+                departure_time=format_clock(departure_time),
+                leg_distances=leg_distances,
+                can_save=can_save,
+                saved_route=False
+            )
 
     except Exception as e:
         logging.error(f"Erreur lors du calcul de l'itinéraire: {str(e)}")
@@ -150,6 +301,64 @@ def calculate_route():
         return redirect(url_for('main.index'))
 
 
+@main_bp.route('/evaluate_route', methods=['POST'])
+@login_required
+def evaluate_route():
+    # Évalue l'ordre imposé par l'utilisateur sans le réoptimiser, puis l'améliore localement si demandé :
+    # {"start_point": {"name", "lat", "lng"}, "waypoints": [...], "improve": true, "max_passes": 3, "time_limit": 2}
+    data = request.get_json(silent=True) or {}
+    try:
+        with stage('parse'):
+            points = [
+                {'name': str(point.get('name') or f"Point {i}"), 'lat': float(point['lat']), 'lng': float(point['lng'])}
+                for i, point in enumerate([data['start_point']] + list(data.get('waypoints', [])))
+            ]
+            improve = bool(data.get('improve'))
+            max_passes = max(1, min(int(data.get('max_passes', DEFAULT_PASSES)), MAX_PASSES))
+            time_limit = max(0.0, min(float(data.get('time_limit', DEFAULT_TIME_LIMIT)), MAX_TIME_LIMIT))
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return jsonify({'error': 'Itinéraire invalide'}), 400
+
+    if any(not validate_coordinates(point['lat'], point['lng']) for point in points):
+        return jsonify({'error': 'Coordonnées invalides'}), 400
+    if len(points) < 2:
+        return jsonify({'error': 'Veuillez ajouter au moins un point de passage valide'}), 400
+    record_problem(size=len(points))
+
+    # Distances routières si un graphe routier est configuré, sinon à vol d'oiseau (cache partagé des distances)
+    road_network = get_road_network()
+    with stage('legs'):
+        leg_distances = (road_network.leg_distances if road_network else route_leg_distances)(points)
+    result = {'total_distance': sum(leg_distances), 'leg_distances': leg_distances}
+
+    if improve:
+        try:
+            # Même admission que le calcul d'itinéraire : la matrice et la recherche coûtent O(n²)
+            with solver_slot(current_user.id, len(points), 'repair', road_network is not None):
+                with stage('matrix'):
+                    # Sans graphe routier, les grandes matrices sont découpées en tuiles sur disque
+                    matrix = (road_network.distance_matrix if road_network else build_distance_matrix)(points)
+                with stage('solve'):
+                    repaired = repair_order(points, matrix, max_passes=max_passes, time_limit=time_limit)
+        except SchedulerBusy as busy:
+            return scheduler_busy_json(busy, len(points))
+        if road_network is None:
+            # La recherche utilise une distance approchée : les totaux sont recalculés sur l'ellipsoïde
+            with stage('legs'):
+                repaired['leg_distances'] = route_leg_distances([points[index] for index in repaired['order']])
+            repaired['total_distance'] = sum(repaired['leg_distances'])
+            repaired['gain'] = result['total_distance'] - repaired['total_distance']
+        result['improved'] = {
+            'waypoints': [points[index] for index in repaired['order'][1:]],
+            'leg_distances': repaired['leg_distances'],
+            'total_distance': repaired['total_distance'],
+            'gain': repaired['gain'],
+            'moved': repaired['moved'],
+        }
+
+    return jsonify(result)
+
+
 @main_bp.route('/upload_excel', methods=['POST'])
 @login_required
 def upload_excel():
@@ -173,51 +382,51 @@ def upload_excel():
 
     if file and allowed_file(file.filename):
         try:
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(tempfile.gettempdir(), filename)
-            file.save(filepath)
+            # Lire le fichier Excel ou CSV
+            with stage('read'):
+                df = read_uploaded_table(file)
 
-            # Lire le fichier Excel
-            if filename.endswith('.csv'):
-                df = pd.read_csv(filepath)
-            else:
-                df = pd.read_excel(filepath)
+            # Les coordonnées peuvent être remplacées par une colonne d'adresse si un gazetteer est configuré
+            address_column = next((col for col in ADDRESS_COLUMNS if col in df.columns), None)
+            geocoder = get_geocoder() if address_column else None
 
             # Valider les colonnes requises
-            required_columns = ['name', 'lat', 'lng']
+            required_columns = ['name', 'lat', 'lng'] if geocoder is None else [address_column]
             missing_columns = [col for col in required_columns if col not in df.columns]
 
             if missing_columns:
-                error_msg = f'Colonnes manquantes: {", ".join(missing_columns)}. Le fichier doit contenir les colonnes: name, lat, lng'
+                error_msg = (f'Colonnes manquantes: {", ".join(missing_columns)}. Le fichier doit contenir les colonnes: '
+                             f'name, lat, lng, ou une colonne d\'adresse ({" / ".join(ADDRESS_COLUMNS)}) '
+                             'si un gazetteer est configuré')
+                if address_column:
+                    error_msg += " (colonne d'adresse ignorée : aucun gazetteer configuré)"
                 if is_ajax:
                     return jsonify({'error': error_msg}), 400
                 flash(error_msg, 'danger')
                 return redirect(url_for('main.index'))
 
-            # Convertir en liste de dictionnaires
-            waypoints = df.to_dict('records')
-
-            # Valider les coordonnées
-            valid_waypoints = []
-            for point in waypoints:
-                try:
-                    if validate_coordinates(float(point['lat']), float(point['lng'])):
-                        valid_waypoints.append({
-                            'name': str(point['name']),
-                            'lat': float(point['lat']),
-                            'lng': float(point['lng'])
-                        })
-                except (ValueError, TypeError):
-                    continue
+            unresolved = []
+            if geocoder is not None:
+                with stage('geocode'):
+                    unresolved = geocode_frame(df, address_column, geocoder)
+
+            with stage('validate'):
+                # Valider les coordonnées, colonne par colonne ; colonnes facultatives tw_start / tw_end (HH:MM)
+                # et service_min (minutes)
+                valid_waypoints = WaypointSet.from_frame(df)
+            record_problem(size=len(valid_waypoints))
+            valid_waypoints = valid_waypoints.to_points()
 
             # Pour une requête AJAX (JavaScript fetch), retourner du JSON
             if is_ajax:
-                return jsonify({'waypoints': valid_waypoints})
+                return jsonify({'waypoints': valid_waypoints, 'unresolved': unresolved})
 
             # Pour une soumission de formulaire traditionnelle, stocker les waypoints en session et rediriger
             # vers la page d'index avec les waypoints préchargés
             session['imported_waypoints'] = valid_waypoints
             flash(f'{len(valid_waypoints)} points importés avec succès', 'success')
+            if unresolved:
+                flash(f"{len(unresolved)} adresse(s) introuvable(s) dans le gazetteer : {', '.join(unresolved[:5])}", 'warning')
             return redirect(url_for('main.index'))
 
         except Exception as e:
@@ -227,11 +436,6 @@ def upload_excel():
             flash(f'Erreur lors du traitement du fichier: {str(e)}', 'danger')
             return redirect(url_for('main.index'))
 
-        finally:
-            # Nettoyer le fichier temporaire
-            if os.path.exists(filepath):
-                os.remove(filepath)
-
     return jsonify({'error': 'Type de fichier invalide. Veuillez télécharger des fichiers .xlsx, .xls ou .csv'}), 400
 
 
@@ -244,15 +448,20 @@ def save_route():
         start_point = json.loads(request.form.get('start_point'))
         waypoints = json.loads(request.form.get('waypoints'))
         total_distance = float(request.form.get('total_distance', 0))
+        leg_distances = json.loads(request.form.get('leg_distances') or 'null')
+
+        # Recalculer les tronçons s'ils sont absents ou incohérents avec les points
+        points = [start_point] + waypoints
+        if leg_distances is None or len(leg_distances) != len(points) - 1:
+            leg_distances = route_leg_distances(points)
 
         # Créer un nouvel enregistrement d'itinéraire
         new_route = SavedRoute(
             name=route_name,
             user_id=current_user.id,
-            start_point=start_point,
-            waypoints=waypoints,
             total_distance=total_distance
         )
+        new_route.set_points(start_point, waypoints, leg_distances)
 
         # Sauvegarder dans la base de données
         db.session.add(new_route)
@@ -267,79 +476,221 @@ def save_route():
         return redirect(url_for('main.index'))
 
 
+def parse_day_limit(value, cast):
+    """Limite journalière facultative (distance ou nombre de points), None si absente"""
+    if value is None or str(value).strip() == '':
+        return None
+    limit = cast(value)
+    if limit <= 0:
+        raise ValueError(value)
+    return limit
+
+
+@main_bp.route('/split_route', methods=['POST'])
+@login_required
+def split_route():
+    # Découpage d'un itinéraire optimisé en journées (distance et/ou nombre de points maximal par jour)
+    try:
+        start_point = json.loads(request.form.get('start_point'))
+        waypoints = json.loads(request.form.get('waypoints'))
+        leg_distances = json.loads(request.form.get('leg_distances') or 'null')
+        max_km = parse_day_limit(request.form.get('max_km'), float)
+        max_stops = parse_day_limit(request.form.get('max_stops'), int)
+    except (TypeError, ValueError):
+        flash('Paramètres de découpage invalides', 'danger')
+        return redirect(url_for('main.index'))
+
+    if max_km is None and max_stops is None:
+        flash('Indiquez une distance ou un nombre de points maximal par jour', 'warning')
+        return redirect(url_for('main.index'))
+
+    route = [start_point] + waypoints
+    road_network = get_road_network()
+    route_legs = road_network.leg_distances if road_network else route_leg_distances
+    if leg_distances is None or len(leg_distances) != len(route) - 1:
+        leg_distances = route_legs(route)
+
+    # Chaque journée repart du point de départ : distances départ -> point en un seul calcul de tronçons
+    depot_km = None
+    from_depot = request.form.get('from_depot') == '1'
+    if from_depot:
+        depot_km = [0.0] + list(route_legs([p for point in waypoints for p in (start_point, point)])[0::2])
+
+    try:
+        days = split_into_days(route, list(leg_distances), depot_km, max_km, max_stops)
+    except ValueError as e:
+        flash(str(e), 'danger')
+        days = []
+
+    for day in days:
+        day['google_maps_url'] = build_google_maps_url(day['points'])
+
+    return render_template(
+        'split_route.html',
+        days=days,
+        route_name=request.form.get('route_name', ''),
+        max_km=max_km,
+        max_stops=max_stops,
+        from_depot=from_depot
+    )
+
+
+@main_bp.route('/save_split_route', methods=['POST'])
+@login_required
+def save_split_route():
+    # Sauvegarde de chaque journée comme un itinéraire distinct ("<nom> - jour N")
+    try:
+        route_name = request.form.get('route_name') or 'Itinéraire'
+        days = json.loads(request.form.get('days'))
+        for number, day in enumerate(days, start=1):
+            new_route = SavedRoute(
+                name=f'{route_name[:85]} - jour {number}',
+                user_id=current_user.id,
+                total_distance=float(day['total_distance'])
+            )
+            new_route.set_points(day['points'][0], day['points'][1:], day['legs'])
+            db.session.add(new_route)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Erreur lors de la sauvegarde des journées: {str(e)}")
+        flash(f'Erreur lors de la sauvegarde des journées: {str(e)}', 'danger')
+        return redirect(url_for('main.index'))
+
+    flash(f'{len(days)} journées sauvegardées avec succès.', 'success')
+    return redirect(url_for('main.my_routes'))
+
+
 @main_bp.route('/my_routes')
 @login_required
 def my_routes():
-    # Récupérer tous les itinéraires de l'utilisateur actuel
-    routes = SavedRoute.query.filter_by(user_id=current_user.id).order_by(SavedRoute.created_at.desc()).all()
-    return render_template('my_routes.html', routes=routes)
+    # Pagination par clé sur (created_at, id) : le curseur désigne le dernier itinéraire de la page précédente
+    query = SavedRoute.query.filter_by(user_id=current_user.id)
+
+    cursor = parse_route_cursor(request.args.get('cursor'))
+    if cursor:
+        created_at, route_id = cursor
+        query = query.filter(
+            (SavedRoute.created_at < created_at) |
+            ((SavedRoute.created_at == created_at) & (SavedRoute.id < route_id))
+        )
+
+    routes = query.order_by(SavedRoute.created_at.desc(), SavedRoute.id.desc()).limit(ROUTES_PER_PAGE + 1).all()
+
+    # Une ligne de plus que la page indique l'existence d'une page suivante
+    next_cursor = None
+    if len(routes) > ROUTES_PER_PAGE:
+        routes = routes[:ROUTES_PER_PAGE]
+        next_cursor = format_route_cursor(routes[-1])
+
+    return render_template('my_routes.html', routes=routes, next_cursor=next_cursor, is_first_page=cursor is None)
+
+
+@main_bp.route('/my_routes/export/<export_format>')
+@login_required
+def export_my_routes(export_format):
+    # Export de tous les itinéraires de l'utilisateur, diffusé en flux ; ?archive=zip pour un fichier par itinéraire
+    if export_format not in EXPORT_FORMATS:
+        abort(404)
+    routes = iter_routes(SavedRoute.query.filter_by(user_id=current_user.id))
+    return export_response(routes, export_format, f'itineraires-{slugify(current_user.username)}',
+                           archive=request.args.get('archive') == 'zip')
+
+
+@main_bp.route('/route/<int:route_id>/export/<export_format>')
+@login_required
+def export_route(route_id, export_format):
+    if export_format not in EXPORT_FORMATS:
+        abort(404)
+    route = SavedRoute.query.options(db.undefer_group('geometry')).get_or_404(route_id)
+
+    # Vérifier si l'utilisateur actuel est propriétaire de cet itinéraire
+    if route.user_id != current_user.id and not current_user.is_admin():
+        flash('Vous n\'avez pas accès à cet itinéraire.', 'danger')
+        return redirect(url_for('main.my_routes'))
+
+    return export_response([route], export_format, export_basename(route))
 
 
 @main_bp.route('/route/<int:route_id>')
 @login_required
 def view_route(route_id):
-    # Récupérer l'itinéraire sauvegardé
-    route = SavedRoute.query.get_or_404(route_id)
+    # Récupérer l'itinéraire sauvegardé avec sa géométrie
+    with stage('load'):
+        route = SavedRoute.query.options(db.undefer_group('geometry')).get_or_404(route_id)
 
     # Vérifier si l'utilisateur actuel est propriétaire de cet itinéraire
     if route.user_id != current_user.id and not current_user.is_admin():
         flash('Vous n\'avez pas accès à cet itinéraire.', 'danger')
         return redirect(url_for('main.my_routes'))
 
-    # Récupérer les données de l'itinéraire
-    start_point = route.start_point
-    waypoints = route.waypoints
+    # Récupérer l'itinéraire complet (départ + points de passage)
+    with stage('decode'):
+        optimized_route = route.points
+    record_problem(size=len(optimized_route))
 
-    # Recréer l'itinéraire complet
-    optimized_route = [start_point] + waypoints
+    # Créer la carte et l'URL Google Maps à partir des tableaux de coordonnées stockés
+    with stage('map'):
+        map_html, google_maps_url = build_route_map(route.waypoint_set)
 
-    # Créer la carte
-    map_center = [start_point['lat'], start_point['lng']]
-    m = folium.Map(location=map_center, zoom_start=13)
+    with stage('render'):
+        return render_template(
+            'map.html',
+            map_html=map_html,
+            route=optimized_route,
+            google_maps_url=google_maps_url,
+            total_distance=route.total_distance,
+            leg_distances=route.legs,
+            can_save=False,
+            saved_route=True,
+            route_name=route.name
+        )
 
-    # Ajouter des marqueurs et un chemin à la carte
-    coordinates = []
-    for i, point in enumerate(optimized_route):
-        tooltip = point['name']
-        icon_color = 'green' if i == 0 else 'red' if i == len(optimized_route) - 1 else 'blue'
-        folium.Marker(
-            [point['lat'], point['lng']],
-            tooltip=tooltip,
-            popup=tooltip,
-            icon=folium.Icon(color=icon_color)
-        ).add_to(m)
-        coordinates.append([point['lat'], point['lng']])
 
-    # Ajouter une ligne pour le trajet
-    folium.PolyLine(
-        coordinates,
-        weight=3,
-        color='blue',
-        opacity=0.7
-    ).add_to(m)
+@main_bp.route('/route/<int:route_id>/edit', methods=['POST'])
+@login_required
+def edit_route(route_id):
+    # Modification incrémentale : {"add": [{"name", "lat", "lng"}], "remove": [positions des points de passage]}
+    route = SavedRoute.query.options(db.undefer_group('geometry')).get_or_404(route_id)
 
-    # Générer l'URL Google Maps
-    google_maps_url = "https://www.google.com/maps/dir/?api=1&origin={},{}&destination={},{}&waypoints={}".format(
-        start_point['lat'],
-        start_point['lng'],
-        optimized_route[-1]['lat'],
-        optimized_route[-1]['lng'],
-        "|".join([f"{p['lat']},{p['lng']}" for p in optimized_route[1:-1]])
-    )
+    if route.user_id != current_user.id and not current_user.is_admin():
+        return jsonify({'error': 'Vous n\'avez pas accès à cet itinéraire.'}), 403
 
-    # Enregistrer la carte en HTML
-    map_html = m._repr_html_()
+    data = request.get_json(silent=True) or {}
+    try:
+        add = [
+            {'name': str(point.get('name') or f"Point {i + 1}"), 'lat': float(point['lat']), 'lng': float(point['lng'])}
+            for i, point in enumerate(data.get('add', []))
+        ]
+        remove = [int(position) for position in data.get('remove', [])]
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Modifications invalides'}), 400
+
+    if any(not validate_coordinates(point['lat'], point['lng']) for point in add):
+        return jsonify({'error': 'Coordonnées invalides'}), 400
+
+    if any(position < 0 or position >= route.waypoint_count for position in remove):
+        return jsonify({'error': 'Position de point de passage inexistante'}), 400
+
+    if route.waypoint_count - len(set(remove)) + len(add) < 1:
+        return jsonify({'error': 'L\'itinéraire doit conserver au moins un point de passage'}), 400
+
+    # Admission par l'ordonnanceur, comme les autres calculs d'itinéraire
+    stops = route.waypoint_count + 1 + len(add)
+    road_network = get_road_network()
+    try:
+        with solver_slot(current_user.id, stops, 'edit', road_network is not None):
+            route.apply_edits(add=add, remove=remove, road_network=road_network)
+    except SchedulerBusy as busy:
+        return scheduler_busy_json(busy, stops)
+    db.session.commit()
 
-    return render_template(
-        'map.html',
-        map_html=map_html,
-        route=optimized_route,
-        google_maps_url=google_maps_url,
-        total_distance=route.total_distance,
-        can_save=False,
-        saved_route=True,
-        route_name=route.name
-    )
+    return jsonify({
+        'start_point': route.start_point,
+        'waypoints': route.waypoints,
+        'leg_distances': route.legs,
+        'total_distance': route.total_distance
+    })
 
 
 @main_bp.route('/route/<int:route_id>/delete', methods=['POST'])
@@ -103,34 +103,46 @@ document.addEventListener('DOMContentLoaded', function () {
                             ${data.error}
                         </div>
                     `;
-                    } else if (data.waypoints && data.waypoints.length > 0) {
-                        // Clear existing waypoints
-                        waypointsContainer.innerHTML = '';
-
-                        // Add waypoints from the uploaded file
-                        data.waypoints.forEach(point => {
-                            addWaypoint(point.name, point.lat, point.lng);
-                        });
-
-                        excelUploadResult.innerHTML = `
-                        <div class="alert alert-success">
-                            Successfully imported ${data.waypoints.length} waypoints
-                        </div>
-                    `;
-
-                        // Close modal after a delay
-                        setTimeout(() => {
-                            const modal = bootstrap.Modal.getInstance(document.getElementById('excelImportModal'));
-                            if (modal) {
-                                modal.hide();
-                            }
-                        }, 1500);
                     } else {
-                        excelUploadResult.innerHTML = `
-                        <div class="alert alert-warning">
-                            No valid waypoints found in the file
-                        </div>
-                    `;
+                        const imported = data.waypoints ? data.waypoints.length : 0;
+                        if (imported > 0) {
+                            // Clear existing waypoints
+                            waypointsContainer.innerHTML = '';
+
+                            // Add waypoints from the uploaded file
+                            data.waypoints.forEach(point => {
+                                addWaypoint(point.name, point.lat, point.lng, point.tw_start, point.tw_end, point.service_min);
+                            });
+
+                            excelUploadResult.innerHTML = `
+                            <div class="alert alert-success">
+                                Successfully imported ${imported} waypoints
+                            </div>
+                        `;
+                        } else {
+                            excelUploadResult.innerHTML = `
+                            <div class="alert alert-warning">
+                                No valid waypoints found in the file
+                            </div>
+                        `;
+                        }
+
+                        // Adresses que le gazetteer n'a pas pu résoudre, même si aucune ne l'a été ;
+                        // insérées en texte brut car elles viennent du fichier importé
+                        if (data.unresolved && data.unresolved.length > 0) {
+                            const warning = document.createElement('div');
+                            warning.className = 'alert alert-warning';
+                            warning.textContent = `${data.unresolved.length} address(es) not found: ${data.unresolved.slice(0, 5).join(', ')}`;
+                            excelUploadResult.appendChild(warning);
+                        } else if (imported > 0) {
+                            // Close modal after a delay
+                            setTimeout(() => {
+                                const modal = bootstrap.Modal.getInstance(document.getElementById('excelImportModal'));
+                                if (modal) {
+                                    modal.hide();
+                                }
+                            }, 1500);
+                        }
                     }
                 })
                 .catch(error => {
@@ -145,7 +157,7 @@ document.addEventListener('DOMContentLoaded', function () {
     }
 
     // Function to add a new waypoint to the form
-    function addWaypoint(name = '', lat = '', lng = '') {
+    function addWaypoint(name = '', lat = '', lng = '', twStart = '', twEnd = '', serviceMin = '') {
         const waypointNode = document.importNode(waypointTemplate.content, true);
         const waypointElement = waypointNode.querySelector('.waypoint-item');
 
@@ -153,6 +165,9 @@ document.addEventListener('DOMContentLoaded', function () {
         waypointNode.querySelector('.waypoint-name').value = name;
         waypointNode.querySelector('.waypoint-lat').value = lat;
         waypointNode.querySelector('.waypoint-lng').value = lng;
+        waypointNode.querySelector('.waypoint-tw-start').value = twStart || '';
+        waypointNode.querySelector('.waypoint-tw-end').value = twEnd || '';
+        waypointNode.querySelector('.waypoint-service-min').value = serviceMin || '';
 
         // Set up remove button functionality
         const removeBtn = waypointNode.querySelector('.remove-waypoint');
@@ -171,7 +186,7 @@ document.addEventListener('DOMContentLoaded', function () {
 
         // Ajouter les waypoints importés
         IMPORTED_WAYPOINTS.forEach(point => {
-            addWaypoint(point.name, point.lat, point.lng);
+            addWaypoint(point.name, point.lat, point.lng, point.tw_start, point.tw_end, point.service_min);
         });
     }
     // Sinon, ajouter un waypoint par défaut si le conteneur est vide
@@ -0,0 +1,44 @@
+import os
+import tempfile
+
+import pytest
+
+# Base SQLite, cache de distances, métriques, profils, créneaux de l'ordonnanceur et fichiers temporaires
+# des matrices isolés, définis avant la création de l'application (comme benchmarks/load_test.py)
+_scratch = tempfile.mkdtemp(prefix='gpspathfinder_tests_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_scratch, 'test.db')}"
+os.environ['DISTANCE_STORE_PATH'] = os.path.join(_scratch, 'distances.bin')
+os.environ['DISTANCE_STORE_BUCKETS'] = str(1 << 12)
+os.environ['METRICS_DIR'] = os.path.join(_scratch, 'metrics')
+os.environ['PROFILE_DIR'] = os.path.join(_scratch, 'profiles')
+os.environ['SCHEDULER_DIR'] = os.path.join(_scratch, 'scheduler')
+os.environ['DISTANCE_SCRATCH_DIR'] = _scratch
+os.environ.pop('SPEED_PROFILES_PATH', None)
+os.environ.pop('ROAD_GRAPH_PATH', None)
+os.environ.pop('GAZETTEER_PATH', None)
+
+from app import app as flask_app, bootstrap_database  # noqa: E402
+from extensions import db  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    flask_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with flask_app.app_context():
+        bootstrap_database()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_client(client):
+    # Administrateur créé par bootstrap_database
+    response = client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    assert response.status_code == 302
+    return client
@@ -0,0 +1,26 @@
+from datetime import datetime, timedelta
+
+from extensions import db
+from models import User, UserRole
+
+
+def add_user(username, **fields):
+    user = User(username=username, email=f'{username}@example.com', **fields)
+    user.set_password('motdepasse')
+    db.session.add(user)
+    return user
+
+
+def test_active_filter_matches_has_valid_access(admin_client):
+    add_user('valide', is_active=True, is_verified=True)
+    add_user('non_verifie', is_active=True, is_verified=False)
+    add_user('expire', is_active=True, is_verified=True, access_until=datetime.utcnow() - timedelta(days=1))
+    add_user('desactive', is_active=False, is_verified=True)
+    db.session.commit()
+
+    html = admin_client.get('/admin/users?status=active').get_data(as_text=True)
+
+    for user in User.query.all():
+        assert (f'{user.username}@example.com' in html) == user.has_valid_access(), user.username
+    assert User.query.filter(User.valid_access_filter()).count() == 2
+    assert User.query.filter_by(_role=UserRole.ADMIN).count() == 1
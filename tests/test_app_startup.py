@@ -0,0 +1,32 @@
+import os
+import subprocess
+import sys
+
+import sqlalchemy as sa
+
+from app import HEAVY_MODULES
+from extensions import db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_leaves_heavy_modules_and_database_alone(tmp_path):
+    database = tmp_path / 'startup.db'
+    code = ('import sys, app; '
+            f'print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))')
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{database}', PRELOAD_HEAVY_MODULES='')
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, capture_output=True, text=True,
+                            check=True)
+
+    assert result.stdout.strip() == ''
+    # Aucune table créée à l'import : l'initialisation passe par « flask bootstrap »
+    assert not database.exists() or not sa.inspect(sa.create_engine(f'sqlite:///{database}')).get_table_names()
+
+
+def test_bootstrap_command_creates_schema(app):
+    db.drop_all()
+
+    result = app.test_cli_runner().invoke(args=['bootstrap'])
+
+    assert result.exit_code == 0, result.output
+    assert 'saved_routes' in sa.inspect(db.engine).get_table_names()
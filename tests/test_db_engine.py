@@ -0,0 +1,27 @@
+import sqlalchemy as sa
+
+from extensions import db
+from utils.db_engine import InstrumentedQueuePool, engine_options
+
+
+def test_engine_options_follow_the_backend(monkeypatch):
+    monkeypatch.setenv('DB_POOL_SIZE', '7')
+
+    assert engine_options('sqlite:///:memory:') == {}
+    sqlite = engine_options('sqlite:////tmp/app.db')
+    assert sqlite['poolclass'] is InstrumentedQueuePool and sqlite['pool_size'] == 7
+    assert 'pool_pre_ping' not in sqlite
+    postgres = engine_options('postgresql://user@localhost/app')
+    assert postgres['pool_pre_ping'] is True and postgres['pool_recycle'] == 1800
+
+
+def test_sqlite_runs_in_wal_mode(app):
+    with db.engine.connect() as connection:
+        assert connection.execute(sa.text('PRAGMA journal_mode')).scalar() == 'wal'
+
+
+def test_db_stats_reports_the_pool(admin_client):
+    stats = admin_client.get('/admin/db-stats').get_json()
+
+    assert stats['backend'] == 'sqlite' and stats['pool_class'] == 'InstrumentedQueuePool'
+    assert stats['checkouts'] >= 1
@@ -0,0 +1,41 @@
+import numpy as np
+
+from utils.distance_store import DistanceStore, pair_keys, point_codes
+
+
+def keys_for(rng, count):
+    lats, lngs = 48.8 + rng.random(count) * 0.1, 2.3 + rng.random(count) * 0.1
+    codes = point_codes(lats, lngs)
+    return pair_keys(codes[:-1], codes[1:])
+
+
+def test_pairs_are_shared_between_store_instances(tmp_path):
+    rng = np.random.default_rng(0)
+    path = str(tmp_path / 'distances.bin')
+    keys = keys_for(rng, 101)
+    distances = rng.random(100) * 10
+
+    DistanceStore(path, buckets=64).put_many(keys, distances)
+    # Un autre worker ouvre le même fichier
+    found = DistanceStore(path).get_many(keys)
+
+    assert np.allclose(found, distances.astype(np.float32))
+    assert np.isnan(DistanceStore(path).get_many(keys_for(rng, 3))).all()
+
+
+def test_pair_keys_ignore_direction():
+    codes = point_codes(np.array([48.85, 48.86]), np.array([2.35, 2.36]))
+
+    assert pair_keys(codes[:1], codes[1:]) == pair_keys(codes[1:], codes[:1])
+
+
+def test_full_buckets_bound_the_file(tmp_path):
+    rng = np.random.default_rng(1)
+    path = str(tmp_path / 'distances.bin')
+    store = DistanceStore(path, buckets=4, ways=2)
+    size = (tmp_path / 'distances.bin').stat().st_size
+
+    store.put_many(keys_for(rng, 201), rng.random(200))
+
+    assert (tmp_path / 'distances.bin').stat().st_size == size
+    assert np.count_nonzero(store.slots['key']) == 8
@@ -0,0 +1,43 @@
+import random
+
+START = {'name': 'Départ', 'lat': 48.85, 'lng': 2.35}
+
+
+def random_waypoints(count, seed=5):
+    rng = random.Random(seed)
+    return [{'name': f'p{i}', 'lat': 48.8 + rng.random() * 0.1, 'lng': 2.3 + rng.random() * 0.1}
+            for i in range(count)]
+
+
+def test_improve_returns_a_permutation(admin_client):
+    waypoints = random_waypoints(40)
+    response = admin_client.post('/evaluate_route', json={'start_point': START, 'waypoints': waypoints, 'improve': True})
+
+    assert response.status_code == 200
+    data = response.get_json()
+    assert sorted(point['name'] for point in data['improved']['waypoints']) == sorted(p['name'] for p in waypoints)
+    assert data['improved']['total_distance'] <= data['total_distance'] + 1e-9
+
+
+def test_improve_on_tiled_matrix(admin_client, monkeypatch):
+    # Matrice au-delà du budget mémoire : tuiles sur disque au lieu d'une matrice dense
+    monkeypatch.setenv('DISTANCE_MATRIX_MEMORY_MB', '0.01')
+    waypoints = random_waypoints(100)
+    response = admin_client.post('/evaluate_route', json={
+        'start_point': START, 'waypoints': waypoints, 'improve': True, 'time_limit': 0.5})
+
+    assert response.status_code == 200
+    assert len(response.get_json()['improved']['waypoints']) == len(waypoints)
+
+
+def test_improve_goes_through_the_scheduler(admin_client, monkeypatch):
+    monkeypatch.setenv('SCHEDULER_DEADLINE', '1')
+    response = admin_client.post('/evaluate_route', json={
+        'start_point': START, 'waypoints': random_waypoints(10), 'improve': True})
+
+    assert response.status_code == 413
+    assert 'error' in response.get_json()
+
+    # Sans amélioration, l'évaluation seule reste possible
+    response = admin_client.post('/evaluate_route', json={'start_point': START, 'waypoints': random_waypoints(10)})
+    assert response.status_code == 200
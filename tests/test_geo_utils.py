@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from geopy.distance import geodesic
+
+from utils.geo_utils import PRECISION_MODES, choose_precision, distances_km, precision_error_bound
+
+
+def random_box(rng, lat, lng, span, count=200):
+    return lat + rng.random(count) * span, lng + rng.random(count) * span
+
+
+@pytest.mark.parametrize('lat, lng, span', [(48.8, 2.3, 0.3), (60.0, 10.0, 3.0), (-35.0, 140.0, 20.0)])
+def test_error_bounds_hold_against_the_geodesic(lat, lng, span):
+    rng = np.random.default_rng(0)
+    lats, lngs = random_box(rng, lat, lng, span)
+    a, b = rng.integers(0, len(lats), (2, 500))
+    exact = distances_km(lats[a], lngs[a], lats[b], lngs[b], 'ellipsoid')
+    nonzero = exact > 0
+
+    for precision in PRECISION_MODES[:-1]:
+        approx = distances_km(lats[a], lngs[a], lats[b], lngs[b], precision)
+        error = np.abs(approx[nonzero] - exact[nonzero]) / exact[nonzero]
+        assert error.max() <= precision_error_bound(precision, lats, lngs)
+
+
+def test_ellipsoid_matches_geopy():
+    pairs = [((48.8566, 2.3522), (51.5074, -0.1278)), ((-33.86, 151.21), (40.71, -74.0))]
+    for start, end in pairs:
+        assert distances_km(*np.array([[start[0]], [start[1]], [end[0]], [end[1]]]))[0] == \
+            pytest.approx(geodesic(start, end).km, rel=1e-9)
+
+
+def test_cheapest_precision_for_the_box():
+    rng = np.random.default_rng(1)
+    assert choose_precision(*random_box(rng, 48.8, 2.3, 0.3)) == 'equirectangular'
+    assert choose_precision(*random_box(rng, 48.8, 2.3, 0.3), tolerance=1e-12) == 'ellipsoid'
+    with pytest.raises(ValueError):
+        distances_km([0.0], [0.0], [1.0], [1.0], 'manhattan')
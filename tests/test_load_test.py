@@ -0,0 +1,18 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_load_test_runs_every_endpoint_without_errors(tmp_path):
+    report_path = tmp_path / 'report.json'
+    env = dict(os.environ, DISTANCE_STORE_PATH=str(tmp_path / 'distances.bin'), SCHEDULER_DIR=str(tmp_path))
+    subprocess.run([sys.executable, 'benchmarks/load_test.py', '--users', '2', '--iterations', '1',
+                    '--mix', '5:1', '--json', str(report_path)],
+                   cwd=ROOT, env=env, capture_output=True, text=True, check=True, timeout=120)
+
+    endpoints = json.loads(report_path.read_text())['endpoints']
+    assert {'auth.login', 'main.calculate_route', 'main.save_route', 'main.view_route'} <= set(endpoints)
+    assert all(row['errors'] == 0 for row in endpoints.values())
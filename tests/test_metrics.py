@@ -0,0 +1,47 @@
+import json
+import os
+import subprocess
+import sys
+
+from utils import metrics
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def series(count):
+    return [{'name': 'gps_problem_size_points', 'labels': {'endpoint': 'main.calculate_route'},
+             'buckets': [count] * len(metrics.SIZE_BUCKETS), 'sum': float(count), 'count': count}]
+
+
+def test_metrics_requires_token_or_admin(client, monkeypatch):
+    monkeypatch.setenv('METRICS_TOKEN', 'secret')
+    assert client.get('/metrics').status_code == 404
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 404
+    assert client.get('/metrics', headers={'Authorization': 'Bearer secret'}).status_code == 200
+
+    monkeypatch.delenv('METRICS_TOKEN')
+    assert client.get('/metrics', headers={'Authorization': 'Bearer '}).status_code == 404
+    client.post('/login', data={'username': 'admin', 'password': 'admin123'})
+    assert client.get('/metrics').status_code == 200
+
+
+def test_dead_worker_files_are_folded(app):
+    directory = metrics.metrics_dir()
+    for name in os.listdir(directory):
+        os.unlink(os.path.join(directory, name))
+    dead = [os.path.join(directory, f'worker-{dead_pid()}-{i}.json') for i in range(3)]
+    for path in dead:
+        with open(path, 'w') as handle:
+            json.dump(series(2), handle)
+
+    text = metrics.render_prometheus()
+    again = metrics.render_prometheus()
+
+    assert not any(os.path.exists(path) for path in dead)
+    assert os.path.exists(os.path.join(directory, metrics.CUMULATIVE_FILE))
+    line = 'gps_problem_size_points_count{endpoint="main.calculate_route"} 6'
+    assert line in text and line in again
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+import sqlalchemy as sa
+
+from extensions import db
+from migrations import upgrade_database
+from models import SavedRoute, User
+
+# Table saved_routes telle qu'avant le stockage binaire de la géométrie
+BASELINE_SAVED_ROUTES = '''
+CREATE TABLE saved_routes (
+    id INTEGER NOT NULL PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    user_id INTEGER NOT NULL REFERENCES users (id),
+    start_point JSON NOT NULL,
+    waypoints JSON NOT NULL,
+    total_distance FLOAT,
+    created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL
+)
+'''
+
+
+def test_baseline_saved_routes_are_migrated_and_readable(app):
+    db.session.remove()
+    db.drop_all()
+    db.metadata.create_all(db.engine, tables=[table for table in db.metadata.sorted_tables
+                                              if table.name != 'saved_routes'])
+    start = {'name': 'Départ', 'lat': 48.8566, 'lng': 2.3522}
+    waypoints = [{'name': 'Louvre', 'lat': 48.8606, 'lng': 2.3376},
+                 {'name': 'Bastille', 'lat': 48.8532, 'lng': 2.3692}]
+    user = User(id=1, username='alice', email='alice@example.com', is_active=True)
+    user.set_password('alice-password-1')
+    db.session.add(user)
+    db.session.commit()
+    with db.engine.begin() as connection:
+        connection.execute(sa.text(BASELINE_SAVED_ROUTES))
+        for route_id, points in ((1, waypoints), (2, [])):
+            connection.execute(sa.text(
+                "INSERT INTO saved_routes (id, name, user_id, start_point, waypoints, total_distance, "
+                "created_at, updated_at) VALUES (:id, :name, 1, :start, :waypoints, 1.0, "
+                "'2024-01-01 00:00:00', '2024-01-01 00:00:00')"),
+                {'id': route_id, 'name': f'Tournée {route_id}', 'start': json.dumps(start),
+                 'waypoints': json.dumps(points)})
+
+    upgrade_database()
+    # Idempotente : un second passage ne change rien
+    upgrade_database()
+
+    routes = {route.id: route for route in SavedRoute.query.all()}
+    assert routes[1].start_point['name'] == 'Départ'
+    assert [point['name'] for point in routes[1].waypoints] == ['Louvre', 'Bastille']
+    assert routes[1].waypoints[0]['lat'] == pytest.approx(48.8606)
+    assert routes[1].waypoint_count == 2 and routes[1].start_name == 'Départ'
+    assert len(routes[1].legs) == 2
+    assert routes[2].waypoints == [] and routes[2].waypoint_count == 0
+    assert db.session.get(User, 1).username == 'alice'
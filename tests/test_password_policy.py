@@ -0,0 +1,32 @@
+from extensions import db
+from models import User
+from utils.password_policy import hash_password, needs_rehash, verify_password
+
+FAST_METHOD = 'pbkdf2:sha256:1000'
+
+
+def test_hash_follows_configured_method(monkeypatch):
+    monkeypatch.setenv('PASSWORD_HASH_METHOD', FAST_METHOD)
+    password_hash = hash_password('secret')
+
+    assert password_hash.startswith('pbkdf2:sha256:1000$')
+    assert verify_password(password_hash, 'secret') and not verify_password(password_hash, 'other')
+    assert not needs_rehash(password_hash)
+
+    monkeypatch.setenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:2000')
+    assert needs_rehash(password_hash)
+
+
+def test_login_upgrades_outdated_hash(client, monkeypatch):
+    monkeypatch.setenv('PASSWORD_HASH_METHOD', FAST_METHOD)
+    admin = User.query.filter_by(username='admin').one()
+    admin.set_password('admin123')
+    db.session.commit()
+
+    monkeypatch.setenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:2000')
+    assert client.post('/login', data={'username': 'admin', 'password': 'admin123'}).status_code == 302
+
+    db.session.expire_all()
+    admin = User.query.filter_by(username='admin').one()
+    assert admin.password_hash.startswith('pbkdf2:sha256:2000$')
+    assert admin.check_password('admin123')
@@ -0,0 +1,22 @@
+from utils.profiling import list_profiles, profile_path
+
+
+def test_admin_can_profile_a_request(admin_client):
+    response = admin_client.get('/my_routes?profile=1')
+    name = response.headers['X-Profile-Id']
+
+    assert name in [summary['name'] for summary in list_profiles()]
+    assert admin_client.get(f'/admin/profiles/{name}').status_code == 200
+    download = admin_client.get(f'/admin/profiles/{name}/download')
+    assert download.status_code == 200 and download.data
+
+
+def test_profiling_is_admin_only(client):
+    response = client.get('/login?profile=1')
+
+    assert response.status_code == 200
+    assert 'X-Profile-Id' not in response.headers
+
+
+def test_profile_names_cannot_escape_the_directory():
+    assert profile_path('../secret') is None
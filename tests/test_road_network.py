@@ -0,0 +1,70 @@
+import numpy as np
+
+from utils import road_network
+from utils.road_network import RoadNetwork, TiledRoadNetwork
+
+
+def grid_network(size=4, step=0.002):
+    # Grille de rues à double sens autour de Paris, 50 km/h
+    lats, lngs, sources, targets = [], [], [], []
+    for row in range(size):
+        for col in range(size):
+            lats.append(48.85 + row * step)
+            lngs.append(2.35 + col * step)
+    for node in range(size * size):
+        row, col = divmod(node, size)
+        for other in ([node + 1] if col + 1 < size else []) + ([node + size] if row + 1 < size else []):
+            sources += [node, other]
+            targets += [other, node]
+    lengths = np.full(len(sources), step * 111.0)
+    return RoadNetwork.from_edges(np.array(lats), np.array(lngs), np.array(sources), np.array(targets),
+                                  lengths, lengths / 50.0 * 3600.0)
+
+
+def test_distance_then_travel_time_matrix_run_one_search(app, monkeypatch):
+    network = grid_network()
+    points = [{'lat': 48.8501, 'lng': 2.3501}, {'lat': 48.855, 'lng': 2.355}, {'lat': 48.852, 'lng': 2.351}]
+    calls = []
+    many_to_many = network.many_to_many
+    monkeypatch.setattr(network, 'many_to_many', lambda *args: calls.append(args) or many_to_many(*args))
+
+    # Chaque requête a son propre contexte d'application, donc son propre flask.g
+    with app.app_context(), app.test_request_context():
+        distances = network.distance_matrix(points)
+        times = network.travel_time_matrix(points)
+
+        assert len(calls) == 1
+        assert distances.shape == times.shape == (3, 3)
+        assert (distances[~np.eye(3, dtype=bool)] > 0).all()
+
+        # D'autres points relancent la recherche
+        network.distance_matrix(points[:2])
+        assert len(calls) == 2
+
+    # Le résultat ne survit pas à la requête : une autre requête (ou un autre utilisateur) recalcule
+    with app.app_context(), app.test_request_context():
+        network.distance_matrix(points[:2])
+        assert len(calls) == 3
+
+    # Hors requête, rien n'est conservé
+    network.distance_matrix(points)
+    network.distance_matrix(points)
+    assert len(calls) == 5
+
+
+def test_tiles_answer_like_the_in_memory_graph(tmp_path, monkeypatch):
+    # Petit noyau pour que la plupart des nœuds tombent dans les tuiles régionales
+    monkeypatch.setattr(road_network, 'MIN_CORE_NODES', 4)
+    network = grid_network(size=10, step=0.01)
+    network.write_tiles(str(tmp_path), tile_degrees=0.03, core_fraction=0.05)
+    tiled = TiledRoadNetwork(str(tmp_path))
+    assert tiled.mapped_tiles == []
+
+    points = [{'lat': 48.851, 'lng': 2.351}, {'lat': 48.869, 'lng': 2.362}, {'lat': 48.862, 'lng': 2.371}]
+    expected_distances, expected_times = network.matrices(points)
+    distances, times = tiled.matrices(points)
+
+    assert np.allclose(distances, expected_distances) and np.allclose(times, expected_times)
+    # Seules les tuiles proches de la requête (et le noyau) sont projetées en mémoire
+    assert 'core' in tiled.mapped_tiles
+    assert len(tiled.mapped_tiles) < len(tiled.tiles)
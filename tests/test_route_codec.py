@@ -0,0 +1,22 @@
+from utils.route_codec import decode_points, decode_waypoint_set, encode_points, pack_floats, unpack_floats
+from utils.waypoints import WaypointSet
+
+POINTS = [{'name': 'Départ', 'lat': 48.856614, 'lng': 2.3522219},
+          {'name': 'Louvre', 'lat': 48.8606111, 'lng': 2.337644}]
+
+
+def test_points_round_trip_exactly():
+    data, names = encode_points(POINTS)
+
+    assert len(data) == 16 * len(POINTS)
+    assert decode_points(data, names) == POINTS
+    assert list(unpack_floats(pack_floats([1.5, -2.25]))) == [1.5, -2.25]
+
+
+def test_waypoint_set_is_encoded_like_dictionaries():
+    waypoints = WaypointSet.from_points(POINTS)
+
+    assert encode_points(waypoints) == encode_points(POINTS)
+    decoded = decode_waypoint_set(*encode_points(POINTS))
+    assert list(decoded.lat) == [point['lat'] for point in POINTS]
+    assert decoded.name(1) == 'Louvre'
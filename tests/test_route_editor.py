@@ -0,0 +1,46 @@
+import time
+
+import numpy as np
+
+from test_road_network import grid_network
+from utils.route_editor import edit_route
+
+
+def random_route(rng, n, lat=48.85, lng=2.35, span=0.05):
+    points = [{'name': f'P{i}', 'lat': lat + rng.random() * span, 'lng': lng + rng.random() * span}
+              for i in range(n)]
+    # Ordre grossier par bandes de latitude, suffisant pour une tournée déjà « optimisée »
+    return sorted(points, key=lambda point: (round(point['lat'], 2), point['lng']))
+
+
+def test_edit_of_1000_stops_stays_interactive():
+    rng = np.random.default_rng(0)
+    points = random_route(rng, 1000)
+    points, legs = edit_route(points)
+    add = [{'name': f'N{i}', 'lat': 48.85 + rng.random() * 0.05, 'lng': 2.35 + rng.random() * 0.05}
+           for i in range(2)]
+
+    started = time.perf_counter()
+    new_points, new_legs = edit_route(points, legs, add=add[:1])
+    assert time.perf_counter() - started < 0.5
+    assert len(new_points) == 1001 and len(new_legs) == 1000
+
+    started = time.perf_counter()
+    new_points, new_legs = edit_route(points, legs, add=add, remove=[10, 500])
+    assert time.perf_counter() - started < 0.5
+    assert len(new_points) == 1000
+    assert {point['name'] for point in add} <= {point['name'] for point in new_points}
+    assert not {points[11]['name'], points[501]['name']} & {point['name'] for point in new_points}
+
+
+def test_edit_with_road_network_uses_road_distances():
+    network = grid_network(size=8)
+    rng = np.random.default_rng(1)
+    points = random_route(rng, 30, span=0.014)
+    legs = network.leg_distances(points)
+
+    new_points, new_legs = edit_route(points, legs, add=[{'name': 'N', 'lat': 48.856, 'lng': 2.356}],
+                                      remove=[3], road_network=network)
+
+    assert len(new_points) == 30
+    assert np.allclose(new_legs, network.leg_distances(new_points))
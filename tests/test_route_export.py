@@ -0,0 +1,47 @@
+import csv
+import io
+import zipfile
+from xml.etree import ElementTree
+
+from models import SavedRoute
+from test_saved_routes import save_route
+
+
+def test_my_routes_csv_export(admin_client):
+    save_route(admin_client, 'Tournée A')
+    save_route(admin_client, 'Tournée B')
+
+    response = admin_client.get('/my_routes/export/csv')
+
+    assert response.status_code == 200 and response.is_streamed
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(rows) == 6
+    assert {row['route_name'] for row in rows} == {'Tournée A', 'Tournée B'}
+    assert [row['name'] for row in rows if row['route_name'] == 'Tournée A'] == ['Départ', 'A', 'B']
+
+
+def test_route_gpx_and_kml_are_valid_xml(admin_client):
+    save_route(admin_client)
+    route_id = SavedRoute.query.filter_by(name='Tournée test').one().id
+
+    for export_format in ('gpx', 'kml'):
+        response = admin_client.get(f'/route/{route_id}/export/{export_format}')
+        assert response.status_code == 200
+        root = ElementTree.fromstring(response.data)
+        assert 'Départ' in ElementTree.tostring(root, encoding='unicode')
+
+
+def test_zip_archive_has_one_file_per_route(admin_client):
+    save_route(admin_client, 'Tournée A')
+    save_route(admin_client, 'Tournée B')
+
+    response = admin_client.get('/my_routes/export/gpx?archive=zip')
+
+    with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+        names = archive.namelist()
+        assert len(names) == 2 and all(name.endswith('.gpx') for name in names)
+        assert archive.testzip() is None
+
+
+def test_unknown_format_is_404(admin_client):
+    assert admin_client.get('/my_routes/export/xls').status_code == 404
@@ -0,0 +1,84 @@
+import json
+import re
+from datetime import datetime
+
+import sqlalchemy as sa
+
+from extensions import db
+from models import SavedRoute, User
+from routes.main import ROUTES_PER_PAGE
+
+
+def save_route(client, name='Tournée test'):
+    return client.post('/save_route', data={
+        'route_name': name,
+        'start_point': json.dumps({'name': 'Départ', 'lat': 48.85, 'lng': 2.35}),
+        'waypoints': json.dumps([
+            {'name': 'A', 'lat': 48.86, 'lng': 2.36},
+            {'name': 'B', 'lat': 48.87, 'lng': 2.30},
+        ]),
+        'total_distance': '9.5',
+    })
+
+
+def test_view_saved_route(admin_client):
+    assert save_route(admin_client).status_code == 302
+    route = SavedRoute.query.filter_by(name='Tournée test').one()
+
+    response = admin_client.get(f'/route/{route.id}')
+
+    assert response.status_code == 200
+    html = response.get_data(as_text=True)
+    assert 'Tournée test' in html
+    # Sans profils de vitesse, aucune durée estimée n'est affichée
+    assert 'Durée estimée' not in html
+
+
+def test_edit_saved_route(admin_client, monkeypatch):
+    save_route(admin_client)
+    route = SavedRoute.query.filter_by(name='Tournée test').one()
+    edit = {'add': [{'name': 'C', 'lat': 48.865, 'lng': 2.33}], 'remove': [0]}
+
+    monkeypatch.setenv('SCHEDULER_DEADLINE', '0')
+    assert admin_client.post(f'/route/{route.id}/edit', json=edit).status_code == 413
+
+    monkeypatch.delenv('SCHEDULER_DEADLINE')
+    response = admin_client.post(f'/route/{route.id}/edit', json=edit)
+    assert response.status_code == 200
+    assert [point['name'] for point in response.get_json()['waypoints']] in (['B', 'C'], ['C', 'B'])
+
+
+def add_routes(user_id, count, created_at):
+    for i in range(count):
+        route = SavedRoute(name=f'Route {i:02d}', user_id=user_id, total_distance=1.0, created_at=created_at)
+        route.set_points({'name': f'Départ {i}', 'lat': 48.85, 'lng': 2.35}, [{'name': 'A', 'lat': 48.86, 'lng': 2.36}])
+        db.session.add(route)
+    db.session.commit()
+
+
+def test_my_routes_pages_by_cursor(admin_client):
+    admin = User.query.filter_by(username='admin').one()
+    # Même date de création partout : l'identifiant départage les itinéraires
+    add_routes(admin.id, ROUTES_PER_PAGE + 2, datetime(2024, 1, 1))
+
+    first = admin_client.get('/my_routes').get_data(as_text=True)
+    cursor = re.search(r'cursor=([^"&]+)', first).group(1)
+    second = admin_client.get(f'/my_routes?cursor={cursor}').get_data(as_text=True)
+
+    first_names = set(re.findall(r'Route \d\d', first))
+    second_names = set(re.findall(r'Route \d\d', second))
+    assert len(first_names) == ROUTES_PER_PAGE and len(second_names) == 2
+    assert not first_names & second_names
+    assert 'cursor=' not in second
+
+
+def test_listing_does_not_load_geometry(app):
+    admin_id = User.query.filter_by(username='admin').one().id
+    add_routes(admin_id, 1, datetime(2024, 1, 1))
+    db.session.expunge_all()
+
+    route = SavedRoute.query.filter_by(user_id=admin_id).one()
+
+    unloaded = sa.inspect(route).unloaded
+    assert {'coordinates', 'point_names', 'leg_distances'} <= unloaded
+    assert route.start_name == 'Départ 0' and route.waypoint_count == 1
@@ -0,0 +1,38 @@
+import os
+
+import pytest
+
+from utils.solver_scheduler import SchedulerBusy, estimate_seconds, solver_slot
+
+
+@pytest.fixture
+def scheduler_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('SCHEDULER_DIR', str(tmp_path))
+    return tmp_path
+
+
+def test_lane_follows_estimated_duration(scheduler_dir):
+    # Une modification de 1 000 points est rapide, un calcul networkx de 200 points ne l'est pas
+    assert estimate_seconds(1000, 'edit') < estimate_seconds(200)
+    with solver_slot(1, 1000, 'edit') as lane:
+        assert lane == 'fast'
+    with solver_slot(1, 200) as lane:
+        assert lane == 'bulk'
+
+
+def test_user_slot_files_stay_bounded(scheduler_dir, monkeypatch):
+    monkeypatch.setenv('SCHEDULER_USER_BUCKETS', '8')
+    for user_id in range(200):
+        with solver_slot(user_id, 10):
+            pass
+    user_files = [name for name in os.listdir(scheduler_dir) if name.startswith('user-')]
+    assert 0 < len(user_files) <= 8 * 2
+
+
+def test_user_cap_still_applies(scheduler_dir, monkeypatch):
+    monkeypatch.setenv('SCHEDULER_USER_SLOTS', '1')
+    with solver_slot(7, 10):
+        with pytest.raises(SchedulerBusy) as busy:
+            with solver_slot(7, 10):
+                pass
+    assert busy.value.reason == 'user'
@@ -0,0 +1,37 @@
+import os
+
+import numpy as np
+
+from utils.geo_utils import haversine_km
+from utils.tiled_matrix import TiledDistanceMatrix
+
+
+def random_points(count, seed=2):
+    rng = np.random.default_rng(seed)
+    return [{'lat': 48.8 + lat * 0.2, 'lng': 2.3 + lng * 0.2} for lat, lng in rng.random((count, 2))]
+
+
+def test_tiles_match_the_dense_haversine_matrix(tmp_path):
+    points = random_points(50)
+    lats = np.array([point['lat'] for point in points])
+    lngs = np.array([point['lng'] for point in points])
+    dense = haversine_km(lats[:, None], lngs[:, None], lats[None, :], lngs[None, :])
+
+    with TiledDistanceMatrix(points, tile_rows=8, cache_tiles=2, scratch_dir=str(tmp_path)) as matrix:
+        assert matrix.shape == (50, 50)
+        rows = np.array([matrix[i] for i in range(50)])
+        assert np.allclose(rows, dense, rtol=1e-5, atol=1e-4)
+        assert matrix[3, 7] == rows[3, 7] and matrix[5, 5] == 0.0
+        # Chaque tuile n'est calculée qu'une fois ; le cache reste borné
+        assert matrix.tiles_computed == matrix.tile_count == 7
+        assert len(matrix._cache) <= 2
+
+        # Le fichier de travail est supprimé dès sa projection en mémoire
+        assert os.listdir(tmp_path) == []
+
+
+def test_other_precision_tiers():
+    points = random_points(10)
+    with TiledDistanceMatrix(points, precision='ellipsoid', tile_rows=4) as ellipsoid, \
+            TiledDistanceMatrix(points, tile_rows=4) as haversine:
+        assert np.allclose(ellipsoid[2], haversine[2], rtol=6e-3)
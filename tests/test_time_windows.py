@@ -0,0 +1,61 @@
+import random
+import time
+
+import numpy as np
+
+from utils.local_search import path_length
+from utils.time_windows import TimeWindowProblem, improve_with_time_windows, insert_stops
+
+
+def asymmetric_problem(rng, n, windows=False):
+    points = [{'name': 'Départ', 'lat': 48.85, 'lng': 2.35}]
+    for i in range(1, n):
+        point = {'name': f'p{i}', 'lat': 48.85, 'lng': 2.35}
+        if windows and rng.random() < 0.3:
+            start = rng.uniform(480, 700)
+            point.update(tw_start=start, tw_end=start + rng.uniform(30, 120))
+        points.append(point)
+    # Sens uniques : chaque trajet a un coût différent dans les deux sens
+    distances = np.array([[0.0 if a == b else rng.uniform(1, 20) for b in range(n)] for a in range(n)])
+    return TimeWindowProblem(points, distances, distances * 1.5, 480.0)
+
+
+def test_improve_never_lengthens_asymmetric_routes():
+    rng = random.Random(7)
+    for _ in range(100):
+        problem = asymmetric_problem(rng, rng.randint(5, 15))
+        order = insert_stops(problem)
+        before = path_length(order, problem.dist)
+
+        improve_with_time_windows(order, problem)
+
+        assert sorted(order) == list(range(len(problem.points)))
+        assert path_length(order, problem.dist) <= before + 1e-9
+
+
+def test_incremental_segments_match_a_full_rebuild():
+    rng = random.Random(11)
+    for _ in range(50):
+        problem = asymmetric_problem(rng, rng.randint(5, 15), windows=True)
+        initial = insert_stops(problem)
+        incremental = improve_with_time_windows(list(initial), problem)
+
+        def rebuild(order, prefixes, suffixes, first, last):
+            prefixes[:] = problem.prefixes(order)
+            suffixes[:] = problem.suffixes(order)
+
+        problem.update_segments = rebuild
+        assert improve_with_time_windows(list(initial), problem) == incremental
+
+
+def test_search_respects_its_time_limit():
+    rng = random.Random(3)
+    problem = asymmetric_problem(rng, 300, windows=True)
+    order = insert_stops(problem)
+
+    started = time.monotonic()
+    improve_with_time_windows(order, problem, time_limit=0.2)
+
+    # Budget plus at most one position's worth of moves
+    assert time.monotonic() - started < 1.0
+    assert sorted(order) == list(range(300))
@@ -0,0 +1,59 @@
+import math
+
+import numpy as np
+import pytest
+
+from utils.tour_split import split_route, split_tour
+
+
+def brute_force_split(legs, depot_km, max_km, max_stops):
+    # Programmation dynamique quadratique de référence : (jours, distance) minimaux
+    prefix = np.concatenate([[0.0], np.cumsum(legs)])
+    n = len(legs)
+    best = [(0, 0.0)] + [(math.inf, math.inf)] * n
+    for j in range(1, n + 1):
+        for i in range(max(0, j - max_stops), j):
+            day = prefix[j] - prefix[i] if depot_km is None else depot_km[i + 1] + prefix[j] - prefix[i + 1]
+            if day <= max_km + 1e-9 and best[i][0] < math.inf:
+                best[j] = min(best[j], (best[i][0] + 1, best[i][1] + day))
+    return best[n]
+
+
+def day_totals(legs, depot_km, days):
+    prefix = np.concatenate([[0.0], np.cumsum(legs)])
+    return [prefix[last] - prefix[first - 1] if depot_km is None else depot_km[first] + prefix[last] - prefix[first]
+            for first, last in days]
+
+
+@pytest.mark.parametrize('with_depot', [False, True])
+def test_split_matches_quadratic_reference(with_depot):
+    rng = np.random.default_rng(3)
+    for _ in range(30):
+        n = int(rng.integers(1, 40))
+        legs = list(rng.random(n) * 10)
+        depot_km = [0.0] + list(rng.random(n) * 15) if with_depot else None
+        max_km, max_stops = 25.0, int(rng.integers(1, 8))
+
+        days = split_tour(legs, depot_km, max_km, max_stops)
+
+        totals = day_totals(legs, depot_km, days)
+        assert [first for first, _ in days] == [1] + [last + 1 for _, last in days[:-1]]
+        assert days[-1][1] == n
+        assert all(total <= max_km + 1e-9 for total in totals)
+        assert all(last - first + 1 <= max_stops for first, last in days)
+        expected_days, expected_km = brute_force_split(legs, depot_km, max_km, max_stops)
+        assert len(days) == expected_days and sum(totals) == pytest.approx(expected_km)
+
+
+def test_stop_too_far_is_rejected():
+    with pytest.raises(ValueError):
+        split_tour([5.0, 50.0], max_km=20.0)
+
+
+def test_split_route_days_leave_from_the_start_point():
+    route = ['S', 'A', 'B', 'C']
+    days = split_route(route, [1.0, 1.0, 1.0], depot_km=[0.0, 1.0, 2.0, 3.0], max_stops=2)
+
+    # Deux jours dans les deux cas ; repartir vers B (2 km) coûte moins que vers C (3 km)
+    assert [day['points'] for day in days] == [['S', 'A'], ['S', 'B', 'C']]
+    assert [day['total_distance'] for day in days] == [1.0, 3.0]
@@ -0,0 +1,29 @@
+import random
+
+import numpy as np
+
+from utils.travel_profiles import SpeedProfiles, TravelTimeModel, improve_duration
+
+
+def test_improve_duration_never_lengthens_non_fifo_routes():
+    # Passage lent -> rapide à 10:00 : partir plus tard peut faire arriver plus tôt
+    profiles = SpeedProfiles.from_dict({
+        'bucket_minutes': 5,
+        'classes': [{'profile': {'00:00': 1.0, '09:00': 0.1, '10:00': 5.0}}],
+    })
+    rng = random.Random(3)
+    for _ in range(600):
+        n = rng.randint(4, 8)
+        distances = np.array([[0.0 if a == b else rng.uniform(1, 15) for b in range(n)] for a in range(n)])
+        distances = (distances + distances.T) / 2
+        model = TravelTimeModel(profiles, [{'lat': 48.85, 'lng': 2.35}] * n, distances, distances * 60)
+        departure = rng.uniform(480, 600)
+        order = list(range(n))
+        before = model.arrivals(order, departure)[-1]
+
+        saved = improve_duration(order, model, departure)
+
+        after = model.arrivals(order, departure)[-1]
+        assert sorted(order) == list(range(n))
+        assert after <= before
+        assert abs((before - after) - saved) < 1e-6
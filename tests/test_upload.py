@@ -0,0 +1,28 @@
+import io
+import os
+
+from app import bootstrap_database
+from utils import geocoder
+
+
+def test_missing_columns_mention_the_address_column(admin_client):
+    data = {'file': (io.BytesIO(b'name,lat\nA,48.85\n'), 'points.csv')}
+    response = admin_client.post('/upload_excel', data=data, content_type='multipart/form-data',
+                                 headers={'X-Requested-With': 'XMLHttpRequest'})
+
+    assert response.status_code == 400
+    error = response.get_json()['error']
+    assert 'lng' in error and 'adresse' in error
+
+
+def test_bootstrap_builds_the_gazetteer_index(app, tmp_path, monkeypatch):
+    path = tmp_path / 'adresses.csv'
+    path.write_text('numero;nom_voie;code_postal;nom_commune;lat;lon\n'
+                    '10;Rue de Rivoli;75001;Paris;48.8606;2.3376\n', encoding='utf-8')
+    monkeypatch.setenv('GAZETTEER_PATH', str(path))
+    monkeypatch.setattr(geocoder, '_geocoder', None)
+
+    bootstrap_database()
+
+    assert os.path.exists(f'{path}.index.pickle')
+    assert geocoder.get_geocoder().geocode_many(['10 rue de Rivoli 75001 Paris'])[0] is not None
@@ -0,0 +1,45 @@
+import pytest
+
+from extensions import db
+from models import User
+from utils.user_cache import CachedUser, UserCache, user_cache
+
+
+def test_snapshot_is_served_from_cache_until_ttl():
+    cache = UserCache(maxsize=2, ttl=60)
+    loads = []
+
+    def loader(user_id):
+        loads.append(user_id)
+        return User(id=user_id, username=f'u{user_id}', email=f'u{user_id}@example.com', is_active=True)
+
+    first = cache.get(1, loader)
+    assert cache.get(1, loader) is first
+    assert loads == [1]
+
+    # LRU : le plus ancien est évincé au-delà de maxsize
+    cache.get(2, loader)
+    cache.get(3, loader)
+    cache.get(1, loader)
+    assert loads == [1, 2, 3, 1]
+
+
+def test_snapshot_is_read_only():
+    snapshot = CachedUser(User(id=1, username='u', email='u@example.com', is_active=True))
+    with pytest.raises(AttributeError):
+        snapshot.username = 'other'
+
+
+def test_orm_update_invalidates_snapshot(app):
+    user_cache.clear()
+    admin = User.query.filter_by(username='admin').one()
+
+    def loader(user_id):
+        return db.session.get(User, user_id)
+
+    assert user_cache.get(admin.id, loader).email == 'admin@example.com'
+
+    admin.email = 'root@example.com'
+    db.session.commit()
+
+    assert user_cache.get(admin.id, loader).email == 'root@example.com'
@@ -0,0 +1,39 @@
+import io
+
+from models import User, UserRole
+
+CSV = '''username,email,password,role,access_days
+alice,alice@example.com,alice-secret,,30
+bob,bob@example.com,bob-secret,admin,
+admin,other@example.com,admin-secret,,
+carol,not-an-email,carol-secret,,
+alice,alice2@example.com,alice-secret,,
+'''
+
+
+def test_import_users_reports_every_row(admin_client, monkeypatch):
+    monkeypatch.setenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+
+    response = admin_client.post('/admin/users/import', headers={'X-Requested-With': 'XMLHttpRequest'},
+                                 data={'file': (io.BytesIO(CSV.encode()), 'users.csv')},
+                                 content_type='multipart/form-data')
+
+    result = response.get_json()
+    assert response.status_code == 200
+    assert (result['created'], result['skipped']) == (2, 3)
+    assert [row['status'] for row in result['rows']] == ['created', 'created', 'skipped', 'skipped', 'skipped']
+    # Les numéros de ligne sont ceux du tableur (en-tête en ligne 1)
+    assert [row['line'] for row in result['rows']] == [2, 3, 4, 5, 6]
+
+    alice = User.query.filter_by(username='alice').one()
+    assert alice.check_password('alice-secret') and alice.access_until is not None
+    assert User.query.filter_by(username='bob').one().role == UserRole.ADMIN
+
+
+def test_import_users_requires_columns(admin_client):
+    response = admin_client.post('/admin/users/import', headers={'X-Requested-With': 'XMLHttpRequest'},
+                                 data={'file': (io.BytesIO(b'username,email\nx,x@example.com\n'), 'users.csv')},
+                                 content_type='multipart/form-data')
+
+    assert response.status_code == 400
+    assert 'password' in response.get_json()['error']
@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+
+from utils.waypoints import WaypointSet
+
+
+def test_points_round_trip_with_attributes():
+    points = [{'name': 'Départ', 'lat': 48.85, 'lng': 2.35},
+              {'name': 'A', 'lat': 48.86, 'lng': 2.36, 'tw_start': '09:00', 'tw_end': '10:30', 'service_min': 5.0}]
+
+    waypoints = WaypointSet.from_points(points)
+
+    assert waypoints.to_points() == points
+    assert WaypointSet.from_points(waypoints) is waypoints
+
+
+def test_reordering_shares_names_and_slices_are_views():
+    waypoints = WaypointSet.from_points([{'name': 'Dépôt', 'lat': 48.0 + i, 'lng': 2.0} for i in range(4)])
+
+    assert waypoints.names == ['Dépôt']
+    reordered = waypoints.take([3, 1])
+    assert [point['lat'] for point in reordered] == [51.0, 49.0]
+    assert np.shares_memory(waypoints[1:].lat, waypoints.lat)
+
+
+def test_from_frame_skips_invalid_rows_and_inconsistent_windows():
+    frame = pd.DataFrame({'name': ['A', 'B', 'C'], 'lat': [48.8, 'x', 48.9], 'lng': [2.3, 2.4, 2.5],
+                          'tw_start': ['09:00', None, '12:00'], 'tw_end': ['10:00', None, '11:00']})
+
+    waypoints = WaypointSet.from_frame(frame)
+
+    assert [point['name'] for point in waypoints] == ['A', 'C']
+    assert waypoints[0]['tw_start'] == '09:00'
+    # Une fenêtre dont le début suit la fin est ignorée
+    assert 'tw_start' not in waypoints[1]
+
+
+def test_concat_fills_missing_attributes():
+    first = WaypointSet.from_points([{'name': 'S', 'lat': 48.8, 'lng': 2.3}])
+    combined = first.concat([{'name': 'A', 'lat': 48.9, 'lng': 2.4, 'service_min': 10}])
+
+    assert len(combined) == 2
+    assert 'service_min' not in combined[0] and combined[1]['service_min'] == 10.0
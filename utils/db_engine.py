@@ -0,0 +1,195 @@
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _env_bool(name, default):
+    return os.environ.get(name, str(default)).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+class PoolStatistics:
+    """
+    Thread-safe counters describing connection pool usage in this worker.
+
+    Wait times cover the whole checkout, including opening a new connection
+    when the pool is allowed to grow.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.checked_out = 0
+            self.max_checked_out = 0
+            self.connects = 0
+            self.timeouts = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def record_connect(self):
+        with self._lock:
+            self.connects += 1
+
+    def record_checkout(self):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+    def record_checkin(self):
+        with self._lock:
+            self.checked_out = max(self.checked_out - 1, 0)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'checked_out': self.checked_out,
+                'max_checked_out': self.max_checked_out,
+                'connects': self.connects,
+                'timeouts': self.timeouts,
+                'wait_total_seconds': round(self.wait_total, 6),
+                'wait_max_seconds': round(self.wait_max, 6),
+                'wait_avg_seconds': round(self.wait_total / self.checkouts, 6) if self.checkouts else 0.0,
+            }
+
+
+pool_statistics = PoolStatistics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waits for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_statistics.record_timeout()
+            raise
+        finally:
+            pool_statistics.record_wait(time.perf_counter() - started)
+
+
+def _is_memory_sqlite(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def engine_options(database_uri):
+    """
+    Builds the SQLALCHEMY_ENGINE_OPTIONS for the given database URI.
+
+    Pool settings come from DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE and DB_POOL_PRE_PING. In-memory SQLite keeps the
+    SQLAlchemy defaults since it cannot share connections.
+
+    Args:
+        database_uri (str): SQLAlchemy database URI
+
+    Returns:
+        dict: Keyword arguments for create_engine
+    """
+    url = make_url(database_uri)
+    if _is_memory_sqlite(url):
+        return {}
+
+    options = {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': _env_int('DB_POOL_SIZE', 5),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+    }
+    if url.get_backend_name() != 'sqlite':
+        options['pool_pre_ping'] = _env_bool('DB_POOL_PRE_PING', True)
+        options['pool_recycle'] = _env_int('DB_POOL_RECYCLE', 1800)
+    return options
+
+
+def _sqlite_pragmas():
+    return [
+        'PRAGMA journal_mode=WAL',
+        f"PRAGMA busy_timeout={_env_int('SQLITE_BUSY_TIMEOUT_MS', 5000)}",
+        f"PRAGMA synchronous={os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')}",
+        # A negative value sets the cache size in KiB
+        f"PRAGMA cache_size=-{_env_int('SQLITE_CACHE_SIZE_KB', 20000)}",
+        'PRAGMA temp_store=MEMORY',
+    ]
+
+
+def configure_engine(engine):
+    """
+    Installs the connection hooks on an engine: SQLite pragmas (WAL, busy
+    timeout, synchronous, cache size) and pool usage counters.
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+    """
+    if engine.url.get_backend_name() == 'sqlite' and not _is_memory_sqlite(engine.url):
+        pragmas = _sqlite_pragmas()
+
+        @event.listens_for(engine, 'connect')
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+
+    @event.listens_for(engine, 'connect')
+    def count_connect(dbapi_connection, connection_record):
+        pool_statistics.record_connect()
+
+    @event.listens_for(engine, 'checkout')
+    def count_checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_statistics.record_checkout()
+
+    @event.listens_for(engine, 'checkin')
+    def count_checkin(dbapi_connection, connection_record):
+        pool_statistics.record_checkin()
+
+
+def pool_status(engine):
+    """
+    Returns the pool configuration and usage counters of this worker.
+
+    Args:
+        engine (Engine): SQLAlchemy engine
+
+    Returns:
+        dict: Pool size, overflow and checkout/wait statistics
+    """
+    pool = engine.pool
+    status = {
+        'backend': engine.url.get_backend_name(),
+        'pool_class': type(pool).__name__,
+        'pid': os.getpid(),
+    }
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'overflow': pool.overflow(),
+            'timeout': pool.timeout(),
+        })
+    status.update(pool_statistics.snapshot())
+    return status
@@ -0,0 +1,109 @@
+import numpy as np
+
+from utils.distance_store import get_distance_store, pair_keys, point_codes
+from utils.geo_utils import choose_precision, distances_km
+from utils.tiled_matrix import TiledDistanceMatrix, matrix_settings
+from utils.waypoints import coordinate_arrays
+
+
+def pairwise_distances(lats_a, lngs_a, lats_b, lngs_b, precision='ellipsoid'):
+    """
+    Computes element-wise distances between two sequences of points.
+
+    Ellipsoid distances already in the persistent distance store are read
+    from it; the others are computed in one vectorised pass and appended
+    in one batch. The cheaper precision modes are computed directly.
+
+    Args:
+        lats_a, lngs_a (array): Coordinates of the first points
+        lats_b, lngs_b (array): Coordinates of the second points
+        precision (str): One of geo_utils.PRECISION_MODES
+
+    Returns:
+        ndarray: Distances in kilometers
+    """
+    lats_a, lngs_a = np.asarray(lats_a, dtype=np.float64), np.asarray(lngs_a, dtype=np.float64)
+    lats_b, lngs_b = np.asarray(lats_b, dtype=np.float64), np.asarray(lngs_b, dtype=np.float64)
+    if precision != 'ellipsoid':
+        return distances_km(lats_a, lngs_a, lats_b, lngs_b, precision)
+
+    store = get_distance_store()
+    if store is not None:
+        keys = pair_keys(point_codes(lats_a, lngs_a), point_codes(lats_b, lngs_b))
+        distances = store.get_many(keys)
+    else:
+        distances = np.full(len(lats_a), np.nan)
+
+    missing = np.flatnonzero(np.isnan(distances))
+    if len(missing):
+        distances[missing] = distances_km(lats_a[missing], lngs_a[missing], lats_b[missing], lngs_b[missing])
+
+    if store is not None and len(missing):
+        store.put_many(keys[missing], distances[missing])
+    return distances
+
+
+def distance_matrix(points, precision=None, dtype=np.float64):
+    """
+    Builds the symmetric distance matrix of a set of points.
+
+    Without an explicit precision, the cheapest mode accurate enough for
+    ordering stops over the points' bounding box is used (see
+    geo_utils.choose_precision); totals should come from leg_distances.
+
+    Args:
+        points: WaypointSet, or list of dictionaries each with 'lat', 'lng'
+        precision (str): One of geo_utils.PRECISION_MODES, None to choose from the extent
+        dtype: float64, or float32 to halve the memory
+
+    Returns:
+        ndarray: (n, n) matrix of distances in kilometers
+    """
+    n = len(points)
+    lats, lngs = coordinate_arrays(points)
+    if precision is None:
+        precision = choose_precision(lats, lngs)
+
+    rows, cols = np.triu_indices(n, k=1)
+    matrix = np.zeros((n, n), dtype=dtype)
+    matrix[rows, cols] = pairwise_distances(lats[rows], lngs[rows], lats[cols], lngs[cols], precision)
+    matrix[cols, rows] = matrix[rows, cols]
+    return matrix
+
+
+def build_distance_matrix(points, precision=None):
+    """
+    Distance matrix of a set of points, dense or tiled depending on its size.
+
+    Matrices within DISTANCE_MATRIX_MEMORY_MB are computed at once in
+    DISTANCE_MATRIX_DTYPE; larger ones become a TiledDistanceMatrix whose
+    float32 rows are computed on demand into a scratch file.
+
+    Args:
+        points: WaypointSet, or list of dictionaries each with 'lat', 'lng'
+        precision (str): One of geo_utils.PRECISION_MODES, None to choose from the extent
+
+    Returns:
+        ndarray or TiledDistanceMatrix: (n, n) distances in kilometers
+    """
+    config = matrix_settings()
+    n = len(points)
+    if n * n * config['dtype'].itemsize <= config['memory_mb'] * 1024 * 1024:
+        return distance_matrix(points, precision, config['dtype'])
+    return TiledDistanceMatrix(points, precision)
+
+
+def leg_distances(route):
+    """
+    Computes the distance of each leg of an ordered route, on the ellipsoid.
+
+    Args:
+        route: Ordered WaypointSet, or list of dictionaries each with 'lat', 'lng'
+
+    Returns:
+        list: len(route) - 1 distances in kilometers
+    """
+    if len(route) < 2:
+        return []
+    lats, lngs = coordinate_arrays(route)
+    return pairwise_distances(lats[:-1], lngs[:-1], lats[1:], lngs[1:]).tolist()
@@ -0,0 +1,209 @@
+import fcntl
+import os
+import tempfile
+import time
+
+import numpy as np
+
+# Coordinates are quantised to 1e-5 degree (about 1.1 m) before hashing
+QUANTUM = 1e5
+
+MAGIC = b'GPSDIST1'
+HEADER_SIZE = 64
+SLOT_DTYPE = np.dtype([('key', '<u8'), ('distance', '<f4'), ('stamp', '<u4')])
+
+# Keys are looked up in chunks to bound the size of temporary arrays
+LOOKUP_CHUNK = 65536
+
+
+def _mix64(values):
+    """splitmix64 finaliser, applied element-wise to a uint64 array"""
+    values = values.copy()
+    values ^= values >> np.uint64(30)
+    values *= np.uint64(0xBF58476D1CE4E5B9)
+    values ^= values >> np.uint64(27)
+    values *= np.uint64(0x94D049BB133111EB)
+    values ^= values >> np.uint64(31)
+    return values
+
+
+def point_codes(lats, lngs):
+    """
+    Encodes quantised coordinates as 51-bit integers.
+
+    Args:
+        lats (array): Latitudes in degrees
+        lngs (array): Longitudes in degrees
+
+    Returns:
+        ndarray: uint64 codes, one per point
+    """
+    qlat = np.rint((np.asarray(lats, dtype=np.float64) + 90.0) * QUANTUM).astype(np.uint64)
+    qlng = np.rint((np.asarray(lngs, dtype=np.float64) + 180.0) * QUANTUM).astype(np.uint64)
+    return (qlat << np.uint64(26)) | qlng
+
+
+def pair_keys(codes_a, codes_b):
+    """
+    Hashes unordered point pairs into non-zero 64-bit keys.
+
+    Args:
+        codes_a (ndarray): Point codes of the first points
+        codes_b (ndarray): Point codes of the second points
+
+    Returns:
+        ndarray: uint64 keys (0 is reserved for empty slots)
+    """
+    low = np.minimum(codes_a, codes_b)
+    high = np.maximum(codes_a, codes_b)
+    with np.errstate(over='ignore'):
+        keys = _mix64(_mix64(low) ^ high)
+    keys[keys == 0] = 1
+    return keys
+
+
+class DistanceStore:
+    """
+    Persistent pairwise distance cache shared by all workers.
+
+    The file holds a set-associative hash table mapped with np.memmap, so
+    every process reads the same pages from the OS cache without copying.
+    Writers append whole batches under an exclusive file lock. Each bucket
+    has a fixed number of slots; when a bucket is full, the entry that was
+    least recently written or hit is evicted, which bounds the file size.
+    """
+
+    def __init__(self, path, buckets=1 << 18, ways=8):
+        self.path = path
+        self.lock_path = path + '.lock'
+        self._ensure_file(buckets, ways)
+
+        with open(path, 'rb') as handle:
+            header = handle.read(HEADER_SIZE)
+        self.buckets, self.ways = (int(v) for v in np.frombuffer(header[8:24], dtype='<u8'))
+        self.slots = np.memmap(path, dtype=SLOT_DTYPE, mode='r+', offset=HEADER_SIZE,
+                               shape=(self.buckets, self.ways))
+
+    def _ensure_file(self, buckets, ways):
+        if os.path.exists(self.path) and os.path.getsize(self.path) > HEADER_SIZE:
+            return
+        with open(self.lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if os.path.exists(self.path) and os.path.getsize(self.path) > HEADER_SIZE:
+                    return
+                tmp_path = f'{self.path}.{os.getpid()}.tmp'
+                with open(tmp_path, 'wb') as handle:
+                    header = MAGIC + np.array([buckets, ways], dtype='<u8').tobytes()
+                    handle.write(header.ljust(HEADER_SIZE, b'\0'))
+                    handle.truncate(HEADER_SIZE + buckets * ways * SLOT_DTYPE.itemsize)
+                os.replace(tmp_path, self.path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _stamp():
+        # Hours since the epoch: coarse enough to avoid rewriting stamps on every hit
+        return np.uint32(int(time.time() // 3600))
+
+    def _buckets_of(self, keys):
+        return (keys % np.uint64(self.buckets)).astype(np.int64)
+
+    def get_many(self, keys):
+        """
+        Looks up distances for an array of pair keys.
+
+        Args:
+            keys (ndarray): uint64 keys from pair_keys
+
+        Returns:
+            ndarray: float64 distances, NaN where the pair is not stored
+        """
+        result = np.full(len(keys), np.nan)
+        stamp = self._stamp()
+        for start in range(0, len(keys), LOOKUP_CHUNK):
+            chunk = keys[start:start + LOOKUP_CHUNK]
+            buckets = self._buckets_of(chunk)
+            rows = self.slots[buckets]
+            match = rows['key'] == chunk[:, None]
+            found = match.any(axis=1)
+            way = match.argmax(axis=1)
+            result[start:start + LOOKUP_CHUNK][found] = rows['distance'][found, way[found]]
+
+            # Refresh the eviction stamp of entries that are still in use
+            stale = found & (rows['stamp'][np.arange(len(chunk)), way] != stamp)
+            if stale.any():
+                self.slots['stamp'][buckets[stale], way[stale]] = stamp
+        return result
+
+    def put_many(self, keys, distances):
+        """
+        Appends a batch of distances, evicting the oldest entries of full buckets.
+
+        Args:
+            keys (ndarray): uint64 keys from pair_keys
+            distances (ndarray): Distances in km
+        """
+        if len(keys) == 0:
+            return
+        keys, first = np.unique(keys, return_index=True)
+        distances = np.asarray(distances, dtype=np.float32)[first]
+        buckets = self._buckets_of(keys)
+        stamp = self._stamp()
+
+        with open(self.lock_path, 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                # Skip pairs another worker stored in the meantime
+                rows = self.slots[buckets]
+                new = ~(rows['key'] == keys[:, None]).any(axis=1)
+                keys, distances, buckets = keys[new], distances[new], buckets[new]
+                if len(keys) == 0:
+                    return
+
+                # Rank the new keys within their bucket
+                order = np.argsort(buckets, kind='stable')
+                keys, distances, buckets = keys[order], distances[order], buckets[order]
+                unique_buckets, starts, counts = np.unique(buckets, return_index=True, return_counts=True)
+                rank = np.arange(len(keys)) - np.repeat(starts, counts)
+                keep = rank < self.ways
+                group = np.repeat(np.arange(len(unique_buckets)), counts)
+
+                # Fill empty slots first, then overwrite the least recently used ones
+                rows = self.slots[unique_buckets]
+                priority = np.where(rows['key'] == 0, 0, rows['stamp'].astype(np.int64) + 1)
+                way_order = np.argsort(priority, axis=1, kind='stable')
+                ways = way_order[group[keep], rank[keep]]
+                buckets, keys, distances = buckets[keep], keys[keep], distances[keep]
+
+                # Readers never see a half-written entry: the key is cleared first and set last
+                self.slots['key'][buckets, ways] = 0
+                self.slots['distance'][buckets, ways] = distances
+                self.slots['stamp'][buckets, ways] = stamp
+                self.slots['key'][buckets, ways] = keys
+                self.slots.flush()
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+_store = None
+
+
+def get_distance_store():
+    """
+    Returns the process-wide distance store, or None if disabled.
+
+    The file location comes from DISTANCE_STORE_PATH (an empty value
+    disables the store) and its capacity from DISTANCE_STORE_BUCKETS
+    (8 entries of 16 bytes per bucket).
+
+    Returns:
+        DistanceStore: Shared store, or None
+    """
+    global _store
+    path = os.environ.get('DISTANCE_STORE_PATH', os.path.join(tempfile.gettempdir(), 'gpspathfinder_distances.bin'))
+    if not path:
+        return None
+    if _store is None or _store.path != path:
+        _store = DistanceStore(path, buckets=int(os.environ.get('DISTANCE_STORE_BUCKETS', 1 << 18)))
+    return _store
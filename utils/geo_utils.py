@@ -1,6 +1,32 @@
 import math
 
-from geopy.distance import geodesic
+import numpy as np
+
+# Mean Earth radius (IUGG) and WGS84 ellipsoid
+EARTH_RADIUS_KM = 6371.0088
+WGS84_A_KM = 6378.137
+WGS84_F = 1 / 298.257223563
+WGS84_E2 = WGS84_F * (2 - WGS84_F)
+
+# Distance precision tiers, cheapest first. Worst-case relative errors
+# against the WGS84 geodesic:
+#   equirectangular: (D / R)^2 / (24 cos^2 phi), D being the bounding-box
+#       diagonal and phi its largest absolute latitude; about 3e-6 for a
+#       50 km city box at 45 degrees, i.e. better than haversine below a few
+#       hundred kilometres because it uses the ellipsoid's local radii
+#   haversine: 0.56 % anywhere (spherical Earth)
+#   ellipsoid: sub-millimetre (Vincenty, geopy's Karney solver when it does
+#       not converge)
+PRECISION_MODES = ('equirectangular', 'haversine', 'ellipsoid')
+HAVERSINE_MAX_ERROR = 5.6e-3
+ELLIPSOID_MAX_ERROR = 1e-9
+
+# Relative error accepted when ordering stops: the search only compares
+# candidate routes, reported totals always use the ellipsoid
+SEARCH_TOLERANCE = 1e-2
+
+VINCENTY_ITERATIONS = 50
+VINCENTY_CONVERGENCE = 1e-12
 
 
 def validate_coordinates(lat, lng):
@@ -22,18 +48,209 @@ def validate_coordinates(lat, lng):
         return False
 
 
-def calculate_distance(point1, point2):
+def calculate_distance(point1, point2, precision='ellipsoid'):
     """
     Calculates the distance between two points in kilometers.
     
     Args:
         point1 (tuple): (latitude, longitude) of first point
         point2 (tuple): (latitude, longitude) of second point
+        precision (str): One of PRECISION_MODES
     
     Returns:
         float: Distance in kilometers
     """
-    return geodesic(point1, point2).kilometers
+    return float(distances_km(point1[0], point1[1], point2[0], point2[1], precision))
+
+
+def equirectangular_km(lats_a, lngs_a, lats_b, lngs_b):
+    """
+    Vectorised distance on the plane tangent at each pair's mid-latitude.
+
+    The north and east offsets are scaled by the meridional and prime
+    vertical radii of curvature of the ellipsoid there.
+
+    Args:
+        lats_a, lngs_a (array): Coordinates of the first points in degrees
+        lats_b, lngs_b (array): Coordinates of the second points in degrees
+
+    Returns:
+        ndarray: Distances in kilometers
+    """
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lats_a, lngs_a, lats_b, lngs_b))
+    mid = (lat1 + lat2) / 2
+    w = np.sqrt(1 - WGS84_E2 * np.sin(mid) ** 2)
+    meridional = WGS84_A_KM * (1 - WGS84_E2) / w ** 3
+    prime_vertical = WGS84_A_KM / w
+    # Longitude difference wrapped to [-pi, pi) so that the antimeridian is crossed the short way
+    dlng = (lng2 - lng1 + np.pi) % (2 * np.pi) - np.pi
+    return np.hypot(meridional * (lat2 - lat1), prime_vertical * np.cos(mid) * dlng)
+
+
+def haversine_km(lats_a, lngs_a, lats_b, lngs_b):
+    """
+    Vectorised great-circle distance on a spherical Earth.
+
+    Args:
+        lats_a, lngs_a (array): Coordinates of the first points in degrees
+        lats_b, lngs_b (array): Coordinates of the second points in degrees
+
+    Returns:
+        ndarray: Distances in kilometers
+    """
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lats_a, lngs_a, lats_b, lngs_b))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def ellipsoid_km(lats_a, lngs_a, lats_b, lngs_b):
+    """
+    Vectorised geodesic distance on the WGS84 ellipsoid (Vincenty's inverse formula).
+
+    The iteration runs on all pairs at once; the rare pairs that do not
+    converge (nearly antipodal points) are solved by geopy.
+
+    Args:
+        lats_a, lngs_a (array): Coordinates of the first points in degrees
+        lats_b, lngs_b (array): Coordinates of the second points in degrees
+
+    Returns:
+        ndarray: Distances in kilometers
+    """
+    lats_a, lngs_a, lats_b, lngs_b = np.broadcast_arrays(
+        *(np.asarray(v, dtype=np.float64) for v in (lats_a, lngs_a, lats_b, lngs_b)))
+    b = WGS84_A_KM * (1 - WGS84_F)
+    lng_diff = np.radians(lngs_b - lngs_a)
+    u1 = np.arctan((1 - WGS84_F) * np.tan(np.radians(lats_a)))
+    u2 = np.arctan((1 - WGS84_F) * np.tan(np.radians(lats_b)))
+    sin_u1, cos_u1, sin_u2, cos_u2 = np.sin(u1), np.cos(u1), np.sin(u2), np.cos(u2)
+
+    lam = lng_diff
+    converged = np.zeros(lng_diff.shape, dtype=bool)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for _ in range(VINCENTY_ITERATIONS):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_sigma = np.hypot(cos_u2 * sin_lam, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam)
+            cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+            # Coincident points have sin_sigma = 0, equatorial lines cos2_alpha = 0
+            sin_alpha = np.where(sin_sigma > 0, cos_u1 * cos_u2 * sin_lam / sin_sigma, 0.0)
+            cos2_alpha = 1 - sin_alpha ** 2
+            cos_2sigma_m = np.where(cos2_alpha > 0, cos_sigma - 2 * sin_u1 * sin_u2 / cos2_alpha, 0.0)
+            c = WGS84_F / 16 * cos2_alpha * (4 + WGS84_F * (4 - 3 * cos2_alpha))
+            previous = lam
+            lam = lng_diff + (1 - c) * WGS84_F * sin_alpha * (
+                sigma + c * sin_sigma * (cos_2sigma_m + c * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)))
+            converged = np.abs(lam - previous) < VINCENTY_CONVERGENCE
+            if converged.all():
+                break
+
+    u_sq = cos2_alpha * (WGS84_A_KM ** 2 - b ** 2) / b ** 2
+    big_a = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+    big_b = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+    delta_sigma = big_b * sin_sigma * (cos_2sigma_m + big_b / 4 * (
+        cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)
+        - big_b / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)))
+    distances = b * big_a * (sigma - delta_sigma)
+
+    failed = np.flatnonzero(~(converged & np.isfinite(distances)))
+    if len(failed):
+        # Imported lazily so that worker startup does not pay for geopy
+        from geopy.distance import geodesic
+        flat = distances.reshape(-1)
+        for index in failed:
+            flat[index] = geodesic((lats_a.flat[index], lngs_a.flat[index]),
+                                   (lats_b.flat[index], lngs_b.flat[index])).kilometers
+    return distances
+
+
+DISTANCE_FUNCTIONS = {
+    'equirectangular': equirectangular_km,
+    'haversine': haversine_km,
+    'ellipsoid': ellipsoid_km,
+}
+
+
+def distances_km(lats_a, lngs_a, lats_b, lngs_b, precision='ellipsoid'):
+    """
+    Element-wise distances between two sequences of points.
+
+    Args:
+        lats_a, lngs_a (array): Coordinates of the first points in degrees
+        lats_b, lngs_b (array): Coordinates of the second points in degrees
+        precision (str): One of PRECISION_MODES
+
+    Returns:
+        ndarray: Distances in kilometers
+    """
+    if precision not in DISTANCE_FUNCTIONS:
+        raise ValueError(f'Précision de distance inconnue : {precision}')
+    return DISTANCE_FUNCTIONS[precision](lats_a, lngs_a, lats_b, lngs_b)
+
+
+def bbox_extent_km(lats, lngs):
+    """
+    Diagonal of the bounding box of a set of points, an upper bound of any pair distance.
+
+    Args:
+        lats, lngs (array): Coordinates in degrees
+
+    Returns:
+        float: Extent in kilometers (0 for fewer than two points)
+    """
+    lats, lngs = np.asarray(lats, dtype=np.float64), np.asarray(lngs, dtype=np.float64)
+    if len(lats) < 2:
+        return 0.0
+    # Longitude span the short way round: 360 minus the largest gap between sorted longitudes
+    sorted_lngs = np.sort(lngs)
+    gaps = np.diff(np.append(sorted_lngs, sorted_lngs[0] + 360.0))
+    lng_span = 360.0 - gaps.max()
+    # Widest parallel of the box (nearest the equator) for the east-west side
+    widest = 0.0 if lats.min() <= 0 <= lats.max() else min(abs(lats.min()), abs(lats.max()))
+    north_south = math.radians(lats.max() - lats.min())
+    east_west = math.radians(lng_span) * math.cos(math.radians(widest))
+    return EARTH_RADIUS_KM * math.hypot(north_south, east_west) * (1 + HAVERSINE_MAX_ERROR)
+
+
+def precision_error_bound(precision, lats, lngs):
+    """
+    Worst-case relative distance error of a precision mode over a set of points.
+
+    Args:
+        precision (str): One of PRECISION_MODES
+        lats, lngs (array): Coordinates in degrees
+
+    Returns:
+        float: Relative error bound (inf when the mode is unusable there)
+    """
+    if precision == 'haversine':
+        return HAVERSINE_MAX_ERROR
+    if precision == 'ellipsoid':
+        return ELLIPSOID_MAX_ERROR
+    lats = np.asarray(lats, dtype=np.float64)
+    if len(lats) < 2:
+        return 0.0
+    cos_lat = math.cos(math.radians(float(np.abs(lats).max())))
+    if cos_lat < 1e-6:
+        return math.inf
+    return (bbox_extent_km(lats, lngs) / EARTH_RADIUS_KM) ** 2 / (24 * cos_lat ** 2)
+
+
+def choose_precision(lats, lngs, tolerance=SEARCH_TOLERANCE):
+    """
+    Cheapest precision mode whose worst-case error over the points is within `tolerance`.
+
+    Args:
+        lats, lngs (array): Coordinates in degrees
+        tolerance (float): Accepted relative error
+
+    Returns:
+        str: One of PRECISION_MODES
+    """
+    for precision in PRECISION_MODES[:-1]:
+        if precision_error_bound(precision, lats, lngs) <= tolerance:
+            return precision
+    return PRECISION_MODES[-1]
 
 
 def format_distance(distance_km):
@@ -0,0 +1,373 @@
+import bisect
+import csv
+import logging
+import os
+import pickle
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+# Street type abbreviations expanded during normalisation (French and English forms)
+ABBREVIATIONS = {
+    'av': 'avenue', 'ave': 'avenue', 'bd': 'boulevard', 'bld': 'boulevard', 'blvd': 'boulevard',
+    'r': 'rue', 'pl': 'place', 'imp': 'impasse', 'all': 'allee', 'che': 'chemin', 'chem': 'chemin',
+    'rte': 'route', 'st': 'saint', 'ste': 'sainte', 'fg': 'faubourg', 'fbg': 'faubourg',
+    'sq': 'square', 'qu': 'quai', 'crs': 'cours', 'pas': 'passage', 'mte': 'montee',
+    'str': 'street', 'rd': 'road', 'dr': 'drive', 'ln': 'lane',
+}
+NUMBER_SUFFIXES = {'bis', 'ter', 'quater', 'a', 'b', 'c', 'd'}
+
+# Gazetteer column names accepted for each field (BAN, OpenAddresses and plain layouts)
+COLUMN_ALIASES = {
+    'number': ('numero', 'number', 'housenumber', 'num'),
+    'suffix': ('rep', 'suffix', 'indice_repetition'),
+    'street': ('nom_voie', 'street', 'voie', 'nom_afnor'),
+    'postcode': ('code_postal', 'postcode', 'zip', 'cp'),
+    'city': ('nom_commune', 'city', 'commune', 'ville'),
+    'lat': ('lat', 'latitude'),
+    'lng': ('lon', 'lng', 'long', 'longitude'),
+}
+
+# Fuzzy matching: minimum Dice similarity of trigram sets, candidates scored per query,
+# and share of the streets above which a trigram is too common to be useful
+MIN_SCORE = 0.55
+CANDIDATES = 20
+COMMON_TRIGRAM_SHARE = 0.05
+
+CACHE_SIZE = 100000
+INDEX_VERSION = 1
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+def normalize(text):
+    """
+    Normalises an address fragment: no accents, lower case, expanded abbreviations.
+
+    Args:
+        text (str): Raw text
+
+    Returns:
+        str: Space-separated normalised tokens
+    """
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(char for char in text if not unicodedata.combining(char)).lower()
+    return ' '.join(ABBREVIATIONS.get(token, token) for token in _NON_ALNUM.split(text) if token)
+
+
+def trigrams(text):
+    """Set of character trigrams of a normalised string, padded at word boundaries"""
+    padded = f' {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def parse_address(text):
+    """
+    Splits a free-form address into house number, postcode and street/city text.
+
+    Args:
+        text (str): Address such as "12 bis rue de Rivoli, 75001 Paris"
+
+    Returns:
+        tuple: (house number key or None, postcode or None, normalised remaining text)
+    """
+    tokens = normalize(text).split()
+    postcode = None
+    for token in tokens:
+        if len(token) == 5 and token.isdigit():
+            postcode = token
+    tokens = [token for token in tokens if token != postcode]
+
+    number = None
+    if tokens and tokens[0].isdigit():
+        number = tokens.pop(0)
+        if tokens and tokens[0] in NUMBER_SUFFIXES:
+            number += tokens.pop(0)
+    return number, postcode, ' '.join(tokens)
+
+
+def _house_number_value(number):
+    """Numeric part of a house number key ("12bis" -> 12)"""
+    digits = re.match(r'\d+', number)
+    return int(digits.group()) if digits else float('inf')
+
+
+def _column(header, field):
+    for alias in COLUMN_ALIASES[field]:
+        if alias in header:
+            return header.index(alias)
+    return None
+
+
+class Gazetteer:
+    """
+    In-memory address index built from a local gazetteer file.
+
+    Addresses are grouped by street (name, postcode, city). Streets are
+    found through a sorted list of normalised "street city" keys (exact and
+    prefix lookups with bisect) and, for misspellings, an inverted trigram
+    index stored as CSR numpy arrays. House numbers are then resolved inside
+    the street, falling back to the nearest number or the street centroid.
+    """
+
+    def __init__(self):
+        self.street_keys = []
+        self.street_postcodes = []
+        self.street_labels = []
+        self.street_numbers = []
+        self.street_centroids = []
+        self.sorted_keys = []
+        self.sorted_ids = np.zeros(0, dtype=np.int32)
+        self.trigram_keys = []
+        self.trigram_offsets = np.zeros(1, dtype=np.int64)
+        self.trigram_streets = np.zeros(0, dtype=np.int32)
+        self.trigram_counts = np.zeros(0, dtype=np.int32)
+
+    @classmethod
+    def from_csv(cls, path):
+        """
+        Reads a BAN / OpenAddresses style CSV (';' or ',' separated).
+
+        Args:
+            path (str): Gazetteer file
+
+        Returns:
+            Gazetteer: The index
+        """
+        gazetteer = cls()
+        streets = {}
+        with open(path, newline='', encoding='utf-8') as handle:
+            sample = handle.readline()
+            delimiter = ';' if sample.count(';') > sample.count(',') else ','
+            header = [name.strip().lower() for name in next(csv.reader([sample], delimiter=delimiter))]
+            columns = {field: _column(header, field) for field in COLUMN_ALIASES}
+            if columns['street'] is None or columns['lat'] is None or columns['lng'] is None:
+                raise ValueError('Le fichier doit contenir au moins les colonnes voie, latitude et longitude')
+
+            for row in csv.reader(handle, delimiter=delimiter):
+                try:
+                    lat = float(row[columns['lat']])
+                    lng = float(row[columns['lng']])
+                except (ValueError, IndexError):
+                    continue
+                value = lambda field: row[columns[field]].strip() if columns[field] is not None else ''
+                street, city, postcode = value('street'), value('city'), value('postcode')
+                key = (normalize(street), postcode, normalize(city))
+                street_id = streets.get(key)
+                if street_id is None:
+                    street_id = streets[key] = len(gazetteer.street_keys)
+                    gazetteer.street_keys.append(f'{key[0]} {key[2]}'.strip())
+                    gazetteer.street_postcodes.append(postcode)
+                    gazetteer.street_labels.append(' '.join(part for part in (street, postcode, city) if part))
+                    gazetteer.street_numbers.append({})
+                    gazetteer.street_centroids.append([0.0, 0.0, 0])
+                number = normalize(value('number') + value('suffix')).replace(' ', '')
+                if number:
+                    gazetteer.street_numbers[street_id][number] = (lat, lng)
+                centroid = gazetteer.street_centroids[street_id]
+                centroid[0] += lat
+                centroid[1] += lng
+                centroid[2] += 1
+
+        gazetteer.street_centroids = [(lat / count, lng / count) for lat, lng, count in gazetteer.street_centroids]
+        gazetteer._build_indexes()
+        return gazetteer
+
+    def _build_indexes(self):
+        order = sorted(range(len(self.street_keys)), key=self.street_keys.__getitem__)
+        self.sorted_keys = [self.street_keys[i] for i in order]
+        self.sorted_ids = np.array(order, dtype=np.int32)
+
+        postings = {}
+        counts = []
+        for street_id, key in enumerate(self.street_keys):
+            grams = trigrams(key)
+            counts.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(street_id)
+        self.trigram_keys = sorted(postings)
+        sizes = np.array([len(postings[gram]) for gram in self.trigram_keys], dtype=np.int64)
+        self.trigram_offsets = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        self.trigram_streets = np.array(
+            [street_id for gram in self.trigram_keys for street_id in postings[gram]], dtype=np.int32
+        )
+        self.trigram_counts = np.array(counts, dtype=np.int32)
+
+    def _prefix_candidates(self, text, limit=CANDIDATES):
+        """Streets whose "street city" key starts with the query text"""
+        start = bisect.bisect_left(self.sorted_keys, text)
+        candidates = []
+        for position in range(start, min(start + limit, len(self.sorted_keys))):
+            if not self.sorted_keys[position].startswith(text):
+                break
+            candidates.append(int(self.sorted_ids[position]))
+        return candidates
+
+    def _fuzzy_candidates(self, text):
+        """
+        Best streets by trigram Dice similarity: [(score, street id)].
+
+        Candidates are gathered from the selective trigrams of the query
+        only (very common ones such as " ru" would touch most streets), then
+        rescored on their full trigram sets.
+        """
+        grams = trigrams(text)
+        common_limit = max(CANDIDATES, int(len(self.street_keys) * COMMON_TRIGRAM_SHARE))
+        lists = []
+        for gram in grams:
+            position = bisect.bisect_left(self.trigram_keys, gram)
+            if position < len(self.trigram_keys) and self.trigram_keys[position] == gram:
+                start, end = self.trigram_offsets[position], self.trigram_offsets[position + 1]
+                if end - start <= common_limit:
+                    lists.append(self.trigram_streets[start:end])
+        if not lists:
+            return []
+        hits = np.bincount(np.concatenate(lists), minlength=len(self.street_keys))
+        best = np.argsort(hits)[::-1][:CANDIDATES * 5]
+        scored = []
+        for street_id in best[hits[best] > 0].tolist():
+            shared = len(grams & trigrams(self.street_keys[street_id]))
+            scored.append((2.0 * shared / (len(grams) + int(self.trigram_counts[street_id])), street_id))
+        scored.sort(reverse=True)
+        return scored[:CANDIDATES]
+
+    def geocode(self, address):
+        """
+        Resolves one address.
+
+        Args:
+            address (str): Free-form address
+
+        Returns:
+            dict: 'lat', 'lng', 'score', 'precision' ('address' or 'street') and
+                'label', or None if nothing matches well enough
+        """
+        number, postcode, text = parse_address(address)
+        if not text or not self.street_keys:
+            return None
+
+        scored = [(1.0, street_id) for street_id in self._prefix_candidates(text)]
+        if not scored:
+            scored = [(score, street_id) for score, street_id in self._fuzzy_candidates(text) if score >= MIN_SCORE]
+        if not scored:
+            return None
+
+        def rank(candidate):
+            score, street_id = candidate
+            if postcode:
+                score += 0.1 if self.street_postcodes[street_id] == postcode else -0.1
+            if number and number in self.street_numbers[street_id]:
+                score += 0.05
+            return score
+
+        score, street_id = max(scored, key=rank)
+        numbers = self.street_numbers[street_id]
+        label = self.street_labels[street_id]
+        if number and number in numbers:
+            lat, lng = numbers[number]
+            return {'lat': lat, 'lng': lng, 'score': score, 'precision': 'address', 'label': f'{number} {label}'}
+
+        if number and numbers:
+            # Nearest house number on the same street
+            target = _house_number_value(number)
+            nearest = min(numbers, key=lambda key: abs(_house_number_value(key) - target))
+            lat, lng = numbers[nearest]
+            return {'lat': lat, 'lng': lng, 'score': score, 'precision': 'street', 'label': f'{nearest} {label}'}
+
+        lat, lng = self.street_centroids[street_id]
+        return {'lat': lat, 'lng': lng, 'score': score, 'precision': 'street', 'label': label}
+
+
+class Geocoder:
+    """
+    Batch geocoder over a Gazetteer with a bounded LRU cache of results.
+
+    The index built from the gazetteer file is pickled next to it and
+    reused as long as the file does not change.
+    """
+
+    def __init__(self, path, cache_size=CACHE_SIZE):
+        self.path = path
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.gazetteer = self._load_index()
+
+    def _load_index(self):
+        stat = os.stat(self.path)
+        signature = (INDEX_VERSION, stat.st_size, stat.st_mtime_ns)
+        index_path = f'{self.path}.index.pickle'
+        try:
+            with open(index_path, 'rb') as handle:
+                stored_signature, gazetteer = pickle.load(handle)
+            if stored_signature == signature:
+                return gazetteer
+        except (OSError, pickle.UnpicklingError, EOFError, ValueError):
+            pass
+
+        gazetteer = Gazetteer.from_csv(self.path)
+        try:
+            tmp_path = f'{index_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as handle:
+                pickle.dump((signature, gazetteer), handle, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, index_path)
+        except OSError as e:
+            logging.warning(f"Index du gazetteer non enregistré : {e}")
+        return gazetteer
+
+    def geocode_many(self, addresses):
+        """
+        Resolves a batch of addresses; identical addresses are resolved once.
+
+        Args:
+            addresses (list): Free-form addresses
+
+        Returns:
+            list: One result dict (see Gazetteer.geocode) or None per address
+        """
+        results = []
+        for address in addresses:
+            key = normalize(address)
+            with self._lock:
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    results.append(self._cache[key])
+                    continue
+            result = self.gazetteer.geocode(address)
+            with self._lock:
+                self._cache[key] = result
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            results.append(result)
+        return results
+
+
+_geocoder = None
+
+
+def get_geocoder():
+    """
+    Returns the process-wide geocoder, or None if no gazetteer is configured.
+
+    GAZETTEER_PATH points to a local CSV extract (BAN, OpenAddresses...).
+    The index is built by `flask bootstrap` (or on first use if the file
+    changed since), then cached next to the file; with
+    PRELOAD_HEAVY_MODULES it is loaded before the workers fork.
+
+    Returns:
+        Geocoder: Shared geocoder, or None
+    """
+    global _geocoder
+    path = os.environ.get('GAZETTEER_PATH', '')
+    if not path:
+        return None
+    if _geocoder is None or _geocoder[0] != path:
+        try:
+            _geocoder = (path, Geocoder(path))
+        except (OSError, ValueError) as e:
+            logging.error(f"Gazetteer indisponible ({path}) : {e}")
+            _geocoder = (path, None)
+    return _geocoder[1]
@@ -0,0 +1,174 @@
+import time
+
+
+def path_length(order, dist):
+    """
+    Computes the length of an open path.
+
+    Args:
+        order (list): Point indices in visiting order
+        dist (callable): dist(a, b) -> distance between points a and b
+
+    Returns:
+        float: Sum of the leg distances
+    """
+    return sum(dist(order[i], order[i + 1]) for i in range(len(order) - 1))
+
+
+def _neighbourhood(positions, window, size):
+    """Positions within `window` of any changed position, excluding the fixed start (0)"""
+    candidates = set()
+    for position in positions:
+        for p in range(max(1, position - window), min(size, position + window + 1)):
+            candidates.add(p)
+    return sorted(candidates)
+
+
+def two_opt_move_delta(order, i, j, dist):
+    """
+    Cost change of reversing order[i..j] in an open path (O(1)).
+
+    Args:
+        order (list): Point indices in visiting order
+        i (int): First reversed position (>= 1)
+        j (int): Last reversed position (> i)
+        dist (callable): dist(a, b) -> distance
+
+    Returns:
+        float: New length minus old length
+    """
+    before, first, last = order[i - 1], order[i], order[j]
+    delta = dist(before, last) - dist(before, first)
+    if j + 1 < len(order):
+        after = order[j + 1]
+        delta += dist(first, after) - dist(last, after)
+    return delta
+
+
+def relocate_move_delta(order, i, j, dist):
+    """
+    Cost change of moving the point at position i so that it ends up at position j (O(1)).
+
+    Args:
+        order (list): Point indices in visiting order
+        i (int): Current position of the point (>= 1)
+        j (int): Target position after the move (>= 1, != i)
+        dist (callable): dist(a, b) -> distance
+
+    Returns:
+        float: New length minus old length
+    """
+    n = len(order)
+    moved = order[i]
+    before = order[i - 1]
+    after = order[i + 1] if i + 1 < n else None
+
+    # Remove the point
+    delta = -dist(before, moved)
+    if after is not None:
+        delta += dist(before, after) - dist(moved, after)
+
+    # Insert between the neighbours it will have at position j
+    if j < i:
+        left, right = order[j - 1], order[j]
+    else:
+        left, right = order[j], order[j + 1] if j + 1 < n else None
+    delta += dist(left, moved)
+    if right is not None:
+        delta += dist(moved, right) - dist(left, right)
+    return delta
+
+
+def apply_relocate(order, i, j):
+    moved = order.pop(i)
+    order.insert(j, moved)
+
+
+def improve_path(order, dist, positions=None, window=10, max_passes=5, epsilon=1e-9, time_limit=None):
+    """
+    Improves an open path with a fixed start using 2-opt and relocate moves.
+
+    Every move is evaluated in O(1). When `positions` is given, only moves
+    whose endpoints lie within `window` of those positions are tried, which
+    keeps the work bounded after a local edit. `time_limit` bounds the
+    search on large paths; the moves already applied are kept.
+
+    Args:
+        order (list): Point indices in visiting order, modified in place
+        dist (callable): dist(a, b) -> distance
+        positions (iterable): Positions to search around; None searches everywhere
+        window (int): Neighbourhood radius around each position
+        max_passes (int): Maximum number of improvement passes
+        epsilon (float): Minimum gain for a move to be applied
+        time_limit (float): Optional search budget in seconds
+
+    Returns:
+        float: Total gain (old length minus new length)
+    """
+    n = len(order)
+    if n < 3:
+        return 0.0
+
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+    gain = 0.0
+    for _ in range(max_passes):
+        candidates = range(1, n) if positions is None else _neighbourhood(positions, window, n)
+        improved = False
+
+        for i in candidates:
+            if deadline is not None and time.monotonic() > deadline:
+                return gain
+            for j in candidates:
+                if j <= i:
+                    continue
+                delta = two_opt_move_delta(order, i, j, dist)
+                if delta < -epsilon:
+                    order[i:j + 1] = reversed(order[i:j + 1])
+                    gain -= delta
+                    improved = True
+
+        for i in candidates:
+            if deadline is not None and time.monotonic() > deadline:
+                return gain
+            for j in candidates:
+                if j == i:
+                    continue
+                delta = relocate_move_delta(order, i, j, dist)
+                if delta < -epsilon:
+                    apply_relocate(order, i, j)
+                    gain -= delta
+                    improved = True
+
+        if not improved:
+            break
+    return gain
+
+
+def sweep_windows(order, dist, window, time_limit, max_passes=2):
+    """
+    Improves a long open path window by window, for paths too long for a full search.
+
+    2-opt / relocate moves are tried inside windows of `window` consecutive
+    positions, overlapping by half, sweeping from the start until
+    `time_limit`.
+
+    Args:
+        order (list): Point indices in visiting order, modified in place
+        dist (callable): dist(a, b) -> distance
+        window (int): Number of consecutive positions per window
+        time_limit (float): Search budget in seconds
+        max_passes (int): Improvement passes per window
+
+    Returns:
+        float: Total gain (old length minus new length)
+    """
+    n = len(order)
+    gain = 0.0
+    deadline = time.monotonic() + time_limit
+    for start in range(1, n, max(1, window // 2)):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        gain += improve_path(order, dist, positions=range(start, min(n, start + window)),
+                             window=0, max_passes=max_passes, time_limit=remaining)
+    return gain
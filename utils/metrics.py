@@ -0,0 +1,322 @@
+import fcntl
+import glob
+import hmac
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request, Response, abort
+from flask_login import current_user
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000)
+
+HISTOGRAMS = {
+    'gps_request_duration_seconds': ('Request latency by endpoint and solver engine', LATENCY_BUCKETS),
+    'gps_stage_duration_seconds': ('Duration of each instrumented stage of a request', LATENCY_BUCKETS),
+    'gps_problem_size_points': ('Number of points handled by a request', SIZE_BUCKETS),
+}
+
+# Minimum delay between two snapshots of this worker's histograms on disk
+FLUSH_INTERVAL = 1.0
+
+# Worker files not rewritten for this long (seconds) are folded into the cumulative file even if
+# their pid is alive, since the pid may have been recycled by another process (METRICS_FILE_TTL)
+WORKER_FILE_TTL = 24 * 3600.0
+
+WORKER_FILE_PATTERN = re.compile(r'^worker-(\d+)-\d+\.json$')
+CUMULATIVE_FILE = 'cumulative.json'
+
+
+class Registry:
+    """
+    Histograms of this worker, periodically written to METRICS_DIR so that
+    /metrics can merge the values of every gunicorn worker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self._last_flush = 0.0
+        self._flushed = None
+        self._pid = None
+
+    def _check_process(self):
+        # A new file per process start, so a recycled pid never overwrites a dead worker's counts.
+        # Series inherited from the parent at fork time belong to the parent's file.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                if self._pid is not None:
+                    self._series = {}
+                    self._flushed = None
+                # The file name is set before the pid so that concurrent threads never see a stale path
+                self._file = os.path.join(metrics_dir(), f'worker-{os.getpid()}-{int(time.time() * 1000)}.json')
+                self._pid = os.getpid()
+
+    def observe(self, name, labels, value):
+        self._check_process()
+        buckets = HISTOGRAMS[name][1]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    series['buckets'][i] += 1
+            series['sum'] += value
+            series['count'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return [
+                {'name': name, 'labels': dict(labels), **{k: (list(v) if k == 'buckets' else v) for k, v in data.items()}}
+                for (name, labels), data in self._series.items()
+            ]
+
+    def _forget_folded(self):
+        # Our file was folded into the cumulative file after idling past the TTL:
+        # keep only what was observed since that snapshot, in a new file
+        with self._lock:
+            for series in self._flushed:
+                data = self._series.get((series['name'], tuple(sorted(series['labels'].items()))))
+                if data is None:
+                    continue
+                data['buckets'] = [a - b for a, b in zip(data['buckets'], series['buckets'])]
+                data['sum'] -= series['sum']
+                data['count'] -= series['count']
+            self._file = os.path.join(metrics_dir(), f'worker-{os.getpid()}-{int(time.time() * 1000)}.json')
+
+    def flush(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_flush < FLUSH_INTERVAL:
+            return
+        self._last_flush = now
+        self._check_process()
+        if self._flushed is not None and not os.path.exists(self._file):
+            self._forget_folded()
+        path = self._file
+        snapshot = self.snapshot()
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as handle:
+            json.dump(snapshot, handle)
+        os.replace(tmp_path, path)
+        self._flushed = snapshot
+
+
+registry = Registry()
+
+
+def metrics_dir():
+    path = os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'gpspathfinder_metrics'))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+@contextmanager
+def stage(name):
+    """
+    Times a stage of the current request.
+
+    The duration is added to the Server-Timing header and to the stage
+    histogram. Outside a request the block simply runs untimed.
+
+    Args:
+        name (str): Stage name (e.g. 'parse', 'matrix', 'solve', 'map', 'render')
+    """
+    if not has_request_context():
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        g.setdefault('stage_timings', []).append((name, time.perf_counter() - started))
+
+
+def record_problem(size=None, engine=None):
+    """
+    Attaches the problem size and solver engine to the current request's metrics.
+
+    Args:
+        size (int): Number of points
+        engine (str): Solver engine used
+    """
+    if not has_request_context():
+        return
+    if size is not None:
+        g.problem_size = size
+    if engine is not None:
+        g.solver_engine = engine
+
+
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+
+def _record_request(response):
+    started = g.get('request_started')
+    if started is None or request.endpoint in (None, 'metrics', 'static'):
+        return response
+
+    total = time.perf_counter() - started
+    timings = g.get('stage_timings', [])
+    endpoint = request.endpoint
+
+    # Server-Timing: durations are expressed in milliseconds
+    entries = [f'{name};dur={duration * 1000:.1f}' for name, duration in timings]
+    entries.append(f'total;dur={total * 1000:.1f}')
+    response.headers['Server-Timing'] = ', '.join(entries)
+
+    registry.observe('gps_request_duration_seconds', {'endpoint': endpoint, 'engine': g.get('solver_engine', 'none')}, total)
+    for name, duration in timings:
+        registry.observe('gps_stage_duration_seconds', {'endpoint': endpoint, 'stage': name}, duration)
+    if g.get('problem_size') is not None:
+        registry.observe('gps_problem_size_points', {'endpoint': endpoint}, g.problem_size)
+
+    registry.flush()
+    return response
+
+
+def _format_labels(labels):
+    return ','.join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+
+
+def _read_series(path):
+    try:
+        with open(path) as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return []
+
+
+def _merge_series(merged, series_list):
+    for series in series_list:
+        key = (series['name'], tuple(sorted(series['labels'].items())))
+        total = merged.setdefault(key, {'buckets': [0] * len(series['buckets']), 'sum': 0.0, 'count': 0})
+        total['buckets'] = [a + b for a, b in zip(total['buckets'], series['buckets'])]
+        total['sum'] += series['sum']
+        total['count'] += series['count']
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _expired(path, now, ttl):
+    match = WORKER_FILE_PATTERN.match(os.path.basename(path))
+    if match is None or int(match.group(1)) == os.getpid():
+        return False
+    try:
+        idle = now - os.path.getmtime(path)
+    except OSError:
+        return False
+    return not _pid_alive(int(match.group(1))) or idle > ttl
+
+
+def fold_expired_workers():
+    """
+    Folds the files of dead workers (or idle past METRICS_FILE_TTL) into the cumulative file.
+
+    Each restart, recycle or reload leaves a worker file behind; folding
+    keeps their counts while bounding the number of files a scrape reads.
+    A lock file serialises concurrent scrapes.
+    """
+    try:
+        ttl = float(os.environ.get('METRICS_FILE_TTL', WORKER_FILE_TTL))
+    except ValueError:
+        ttl = WORKER_FILE_TTL
+    directory = metrics_dir()
+    now = time.time()
+    if not any(_expired(path, now, ttl) for path in glob.glob(os.path.join(directory, 'worker-*.json'))):
+        return
+
+    with open(os.path.join(directory, 'fold.lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        expired = [path for path in glob.glob(os.path.join(directory, 'worker-*.json')) if _expired(path, now, ttl)]
+        if not expired:
+            return
+        cumulative_path = os.path.join(directory, CUMULATIVE_FILE)
+        merged = {}
+        for path in [cumulative_path] + expired:
+            _merge_series(merged, _read_series(path))
+        tmp_path = f'{cumulative_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as handle:
+            json.dump([{'name': name, 'labels': dict(labels), **data} for (name, labels), data in merged.items()], handle)
+        os.replace(tmp_path, cumulative_path)
+        for path in expired:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+
+def render_prometheus():
+    """
+    Merges the histograms of all workers into the Prometheus text format.
+
+    Returns:
+        str: Exposition text
+    """
+    registry.flush(force=True)
+    fold_expired_workers()
+    directory = metrics_dir()
+    merged = {}
+    _merge_series(merged, _read_series(os.path.join(directory, CUMULATIVE_FILE)))
+    for path in glob.glob(os.path.join(directory, 'worker-*.json')):
+        _merge_series(merged, _read_series(path))
+
+    lines = []
+    for name, (description, buckets) in HISTOGRAMS.items():
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} histogram')
+        for (series_name, labels), data in sorted(merged.items()):
+            if series_name != name:
+                continue
+            labels = dict(labels)
+            for bound, count in zip(buckets, data['buckets']):
+                lines.append(f'{name}_bucket{{{_format_labels({**labels, "le": str(bound)})}}} {count}')
+            lines.append(f'{name}_bucket{{{_format_labels({**labels, "le": "+Inf"})}}} {data["count"]}')
+            lines.append(f'{name}_sum{{{_format_labels(labels)}}} {data["sum"]}')
+            lines.append(f'{name}_count{{{_format_labels(labels)}}} {data["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def _scrape_authorized():
+    # Behind the reverse proxy every request comes from localhost: require the scrape token
+    # (Authorization: Bearer <METRICS_TOKEN>) or an administrator session
+    token = os.environ.get('METRICS_TOKEN', '')
+    header = request.headers.get('Authorization', '')
+    if token and header.startswith('Bearer ') and hmac.compare_digest(header[len('Bearer '):], token):
+        return True
+    return current_user.is_authenticated and current_user.is_admin()
+
+
+def metrics():
+    if not _scrape_authorized():
+        abort(404)
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app):
+    """
+    Installs request timing hooks and the /metrics endpoint on an application.
+
+    Args:
+        app (Flask): Application
+    """
+    app.before_request(_start_timer)
+    app.after_request(_record_request)
+    app.add_url_rule('/metrics', 'metrics', metrics)
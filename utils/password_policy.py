@@ -0,0 +1,64 @@
+import os
+from functools import lru_cache
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# werkzeug method string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000"
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+
+
+def current_method():
+    """
+    Returns the configured hashing method (PASSWORD_HASH_METHOD).
+
+    Returns:
+        str: werkzeug method string
+    """
+    return os.environ.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+
+
+@lru_cache(maxsize=None)
+def _canonical_method(method):
+    # werkzeug fills in default parameters ("scrypt" -> "scrypt:32768:8:1"),
+    # so compare against the prefix it actually writes.
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+
+def hash_password(password):
+    """
+    Hashes a password with the current policy.
+
+    Args:
+        password (str): Clear-text password
+
+    Returns:
+        str: Password hash
+    """
+    return generate_password_hash(password, method=current_method())
+
+
+def verify_password(password_hash, password):
+    """
+    Checks a password against a hash produced by any supported method.
+
+    Args:
+        password_hash (str): Stored hash
+        password (str): Clear-text password
+
+    Returns:
+        bool: True if the password matches
+    """
+    return check_password_hash(password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """
+    Tells whether a stored hash was produced with a different method or cost.
+
+    Args:
+        password_hash (str): Stored hash
+
+    Returns:
+        bool: True if the hash should be upgraded on next successful login
+    """
+    return password_hash.split('$', 1)[0] != _canonical_method(current_method())
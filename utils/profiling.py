@@ -0,0 +1,216 @@
+import cProfile
+import glob
+import io
+import json
+import os
+import pstats
+import random
+import re
+import tempfile
+import time
+from datetime import datetime
+
+from flask import g, request
+from flask_login import current_user
+
+# Header and query parameter an administrator uses to profile a single request
+PROFILE_HEADER = 'X-Profile'
+PROFILE_QUERY_PARAM = 'profile'
+
+# Number of functions kept in the summary written next to each profile
+SUMMARY_FUNCTIONS = 10
+
+PROFILE_NAME_PATTERN = re.compile(r'^[\w.-]+$')
+
+
+def profile_dir():
+    path = os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'gpspathfinder_profiles'))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def sample_rate():
+    """Fraction of requests profiled without being asked (PROFILE_SAMPLE_RATE, 0 by default)"""
+    try:
+        return min(max(float(os.environ.get('PROFILE_SAMPLE_RATE', 0)), 0.0), 1.0)
+    except ValueError:
+        return 0.0
+
+
+def _requested_by_admin():
+    flag = request.headers.get(PROFILE_HEADER) or request.args.get(PROFILE_QUERY_PARAM)
+    if not flag or flag.lower() not in ('1', 'true', 'yes'):
+        return False
+    return current_user.is_authenticated and current_user.is_admin()
+
+
+def _should_profile():
+    if request.endpoint in (None, 'static', 'metrics') or (request.endpoint or '').startswith('admin.profile'):
+        return False
+    if _requested_by_admin():
+        return True
+    rate = sample_rate()
+    return rate > 0 and random.random() < rate
+
+
+def top_functions(stats, limit=SUMMARY_FUNCTIONS, sort='cumulative'):
+    """
+    Lists the most expensive functions of a profile.
+
+    Args:
+        stats (pstats.Stats): Loaded profile
+        limit (int): Number of functions to return
+        sort (str): 'cumulative' or 'tottime'
+
+    Returns:
+        list: Dictionaries with 'function', 'calls', 'tottime' and 'cumtime'
+    """
+    index = 3 if sort == 'cumulative' else 2
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][index], reverse=True)
+    functions = []
+    for (filename, line, name), (_, calls, tottime, cumtime, _) in rows[:limit]:
+        functions.append({
+            'function': f'{name} ({os.path.basename(filename)}:{line})' if line else name,
+            'calls': calls,
+            'tottime': tottime,
+            'cumtime': cumtime,
+        })
+    return functions
+
+
+def _prune(directory, keep):
+    summaries = sorted(glob.glob(os.path.join(directory, '*.json')))
+    for path in summaries[:max(len(summaries) - keep, 0)]:
+        for stale in (path, path[:-len('.json')] + '.prof'):
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+
+
+def _start_profile():
+    if not _should_profile():
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler is already active in this process
+        return
+    g.profiler = profiler
+    g.profile_started = time.perf_counter()
+    g.profile_trigger = 'admin' if _requested_by_admin() else 'sample'
+
+
+def _save_profile(response):
+    profiler = g.pop('profiler', None)
+    if profiler is None:
+        return response
+    profiler.disable()
+    duration = time.perf_counter() - g.profile_started
+
+    directory = profile_dir()
+    created_at = datetime.utcnow()
+    name = f"{created_at.strftime('%Y%m%dT%H%M%S%f')}-{os.getpid()}-{request.endpoint}"
+    profiler.dump_stats(os.path.join(directory, f'{name}.prof'))
+
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    summary = {
+        'name': name,
+        'created_at': created_at.isoformat(),
+        'endpoint': request.endpoint,
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'duration': duration,
+        'trigger': g.profile_trigger,
+        'user_id': current_user.get_id() if current_user.is_authenticated else None,
+        'problem_size': g.get('problem_size'),
+        'engine': g.get('solver_engine'),
+        'top_functions': top_functions(stats),
+    }
+    with open(os.path.join(directory, f'{name}.json'), 'w') as handle:
+        json.dump(summary, handle)
+
+    _prune(directory, int(os.environ.get('PROFILE_KEEP', 200)))
+    response.headers['X-Profile-Id'] = name
+    return response
+
+
+def _stop_profile(exception=None):
+    # The request failed before after_request: drop the profile but release the profiler
+    profiler = g.pop('profiler', None)
+    if profiler is not None:
+        profiler.disable()
+
+
+def list_profiles(limit=100):
+    """
+    Returns the summaries of the most recent profiles, newest first.
+
+    Args:
+        limit (int): Maximum number of profiles
+
+    Returns:
+        list: Summary dictionaries as written by the profiling hook
+    """
+    summaries = []
+    for path in sorted(glob.glob(os.path.join(profile_dir(), '*.json')), reverse=True)[:limit]:
+        try:
+            with open(path) as handle:
+                summaries.append(json.load(handle))
+        except (OSError, ValueError):
+            continue
+    return summaries
+
+
+def profile_path(name):
+    """
+    Resolves the .prof file of a profile, or None if the name is invalid or unknown.
+
+    Args:
+        name (str): Profile name
+
+    Returns:
+        str: Absolute path of the profile file, or None
+    """
+    if not PROFILE_NAME_PATTERN.match(name):
+        return None
+    path = os.path.join(profile_dir(), f'{name}.prof')
+    return path if os.path.exists(path) else None
+
+
+def load_profile(name, limit=40, sort='cumulative'):
+    """
+    Loads a saved profile with its summary and its hottest functions.
+
+    Args:
+        name (str): Profile name
+        limit (int): Number of functions to return
+        sort (str): 'cumulative' or 'tottime'
+
+    Returns:
+        tuple: (summary dict, list of functions), or None if the profile does not exist
+    """
+    path = profile_path(name)
+    if path is None:
+        return None
+    try:
+        with open(path[:-len('.prof')] + '.json') as handle:
+            summary = json.load(handle)
+    except (OSError, ValueError):
+        summary = {'name': name}
+    stats = pstats.Stats(path, stream=io.StringIO())
+    return summary, top_functions(stats, limit=limit, sort=sort)
+
+
+def init_app(app):
+    """
+    Installs the on-demand profiling hooks on an application.
+
+    Args:
+        app (Flask): Application
+    """
+    app.before_request(_start_profile)
+    app.after_request(_save_profile)
+    app.teardown_request(_stop_profile)
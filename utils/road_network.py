@@ -0,0 +1,852 @@
+import heapq
+import json
+import logging
+import math
+import os
+
+import numpy as np
+from flask import g, has_request_context
+
+from utils.geo_utils import EARTH_RADIUS_KM, haversine_km
+from utils.waypoints import coordinate_arrays
+
+# Default speeds (km/h) of the drivable highway classes, used when a way has no usable maxspeed
+DEFAULT_SPEEDS_KMH = {
+    'motorway': 110, 'motorway_link': 60,
+    'trunk': 90, 'trunk_link': 50,
+    'primary': 70, 'primary_link': 40,
+    'secondary': 60, 'secondary_link': 35,
+    'tertiary': 50, 'tertiary_link': 30,
+    'unclassified': 40, 'residential': 30, 'living_street': 10,
+    'service': 20, 'road': 30,
+}
+ONEWAY_FORWARD = {'yes', 'true', '1'}
+ONEWAY_BACKWARD = {'-1', 'reverse'}
+
+# Snap index: square cells of SNAP_CELL_DEGREES; points farther than MAX_SNAP_KM from the graph are not snapped
+SNAP_CELL_DEGREES = 0.01
+MAX_SNAP_KM = 2.0
+
+# Speed between a point and its snapped node, and detour factor applied to unroutable pairs
+ACCESS_SPEED_KMH = 15.0
+UNROUTABLE_DETOUR = 1.3
+
+# Maximum number of nodes settled by a witness search during contraction
+WITNESS_SETTLE_LIMIT = 60
+
+# Regional tile size, and share of the highest-ranked nodes kept in the always-mapped core tile
+TILE_DEGREES = 0.25
+CORE_FRACTION = 0.02
+MIN_CORE_NODES = 256
+
+FORMAT_VERSION = 2
+
+NODE_ARRAYS = ('node_lat', 'node_lng', 'rank')
+CSR_GROUPS = ('edge', 'up', 'down')
+SNAP_ARRAYS = ('cell_ids', 'cell_starts', 'cell_nodes')
+ARRAY_NAMES = NODE_ARRAYS + tuple(
+    f'{group}_{field}' for group in CSR_GROUPS for field in ('offsets', 'targets', 'lengths', 'times')
+) + SNAP_ARRAYS
+
+
+def way_speed_kmh(tags):
+    """Speed of a way from its maxspeed tag, or the default of its highway class (None if not drivable)"""
+    highway = tags.get('highway')
+    if highway not in DEFAULT_SPEEDS_KMH:
+        return None
+    maxspeed = (tags.get('maxspeed') or '').split(' ')[0]
+    if maxspeed.isdigit() and int(maxspeed) > 0:
+        speed = float(maxspeed)
+        return speed * 1.609344 if 'mph' in tags.get('maxspeed', '') else speed
+    return float(DEFAULT_SPEEDS_KMH[highway])
+
+
+def way_directions(tags):
+    """(forward, backward) travel permissions of a way"""
+    oneway = (tags.get('oneway') or '').lower()
+    if oneway in ONEWAY_BACKWARD:
+        return False, True
+    if oneway in ONEWAY_FORWARD:
+        return True, False
+    if oneway != 'no' and (tags.get('junction') in ('roundabout', 'circular') or tags.get('highway') == 'motorway'):
+        return True, False
+    return True, True
+
+
+def read_osm_ways(path):
+    """
+    Reads the drivable ways of an OSM extract (.osm.pbf, .osm or .osm.bz2).
+
+    Requires the optional `osmium` package (pyosmium).
+
+    Args:
+        path (str): Path of the extract
+
+    Returns:
+        list: (node ids, latitudes, longitudes, speed km/h, forward, backward) per way
+    """
+    try:
+        import osmium
+    except ImportError as e:
+        raise RuntimeError("Le paquet 'osmium' est requis pour lire un extrait OSM (pip install osmium)") from e
+
+    ways = []
+
+    class WayCollector(osmium.SimpleHandler):
+        def way(self, way):
+            tags = {tag.k: tag.v for tag in way.tags}
+            speed = way_speed_kmh(tags)
+            if speed is None or tags.get('access') in ('no', 'private') or tags.get('area') == 'yes':
+                return
+            refs, lats, lngs = [], [], []
+            for node in way.nodes:
+                if not node.location.valid():
+                    continue
+                refs.append(node.ref)
+                lats.append(node.location.lat)
+                lngs.append(node.location.lon)
+            if len(refs) >= 2:
+                forward, backward = way_directions(tags)
+                ways.append((refs, lats, lngs, speed, forward, backward))
+
+    WayCollector().apply_file(path, locations=True)
+    return ways
+
+
+def graph_from_ways(ways):
+    """
+    Builds the edge list of the road graph, keeping only junctions and way ends.
+
+    Intermediate shape nodes are folded into the edge lengths, which usually
+    divides the number of nodes by three or more.
+
+    Args:
+        ways (list): Output of read_osm_ways
+
+    Returns:
+        tuple: (node latitudes, node longitudes, sources, targets, lengths km, times s)
+    """
+    usage = {}
+    for refs, *_ in ways:
+        for ref in refs:
+            usage[ref] = usage.get(ref, 0) + 1
+        # Way ends are always kept
+        usage[refs[0]] = usage[refs[0]] + 2
+        usage[refs[-1]] = usage[refs[-1]] + 2
+
+    index = {}
+    node_lat, node_lng = [], []
+    sources, targets, lengths, times = [], [], [], []
+
+    def node_index(ref, lat, lng):
+        position = index.get(ref)
+        if position is None:
+            position = index[ref] = len(node_lat)
+            node_lat.append(lat)
+            node_lng.append(lng)
+        return position
+
+    for refs, lats, lngs, speed, forward, backward in ways:
+        segment = haversine_km(lats[:-1], lngs[:-1], lats[1:], lngs[1:])
+        start = node_index(refs[0], lats[0], lngs[0])
+        length = 0.0
+        for k in range(1, len(refs)):
+            length += segment[k - 1]
+            if usage[refs[k]] < 2:
+                continue
+            end = node_index(refs[k], lats[k], lngs[k])
+            travel_time = length / speed * 3600.0
+            if forward:
+                sources.append(start)
+                targets.append(end)
+                lengths.append(length)
+                times.append(travel_time)
+            if backward:
+                sources.append(end)
+                targets.append(start)
+                lengths.append(length)
+                times.append(travel_time)
+            start, length = end, 0.0
+
+    return (np.array(node_lat), np.array(node_lng), np.array(sources, dtype=np.int64),
+            np.array(targets, dtype=np.int64), np.array(lengths), np.array(times))
+
+
+def build_csr(n, sources, targets, lengths, times):
+    """
+    Sorts edges by source into compressed sparse row arrays.
+
+    Returns:
+        tuple: (offsets int64 (n + 1), targets int32, lengths float32, times float32)
+    """
+    order = np.lexsort((targets, sources))
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n), out=offsets[1:])
+    return (offsets, np.asarray(targets)[order].astype(np.int32),
+            np.asarray(lengths)[order].astype(np.float32), np.asarray(times)[order].astype(np.float32))
+
+
+def _witness_costs(out, source, excluded, max_cost, settle_limit):
+    """Bounded Dijkstra from `source` that never enters `excluded`"""
+    costs = {source: 0.0}
+    heap = [(0.0, source)]
+    settled = 0
+    while heap:
+        cost, node = heapq.heappop(heap)
+        if cost > costs[node]:
+            continue
+        if cost > max_cost or settled >= settle_limit:
+            break
+        settled += 1
+        for neighbour, (weight, _) in out[node].items():
+            if neighbour == excluded:
+                continue
+            new_cost = cost + weight
+            if new_cost < costs.get(neighbour, math.inf):
+                costs[neighbour] = new_cost
+                heapq.heappush(heap, (new_cost, neighbour))
+    return costs
+
+
+def _required_shortcuts(out, inc, node, settle_limit):
+    """Shortcuts needed to preserve shortest paths through `node` once it is removed"""
+    shortcuts = []
+    outgoing = out[node]
+    for source, (weight_in, length_in) in inc[node].items():
+        candidates = [(target, edge) for target, edge in outgoing.items() if target != source]
+        if not candidates:
+            continue
+        max_cost = weight_in + max(edge[0] for _, edge in candidates)
+        costs = _witness_costs(out, source, node, max_cost, settle_limit)
+        for target, (weight_out, length_out) in candidates:
+            cost = weight_in + weight_out
+            if costs.get(target, math.inf) > cost:
+                shortcuts.append((source, target, cost, length_in + length_out))
+    return shortcuts
+
+
+def contract_graph(n, sources, targets, lengths, times, settle_limit=WITNESS_SETTLE_LIMIT):
+    """
+    Builds a contraction hierarchy on travel time.
+
+    Nodes are contracted in order of edge difference plus contracted
+    neighbours (lazily updated). Each edge, original or shortcut, ends up
+    in the upward graph of its lower-ranked endpoint: `up` holds edges
+    u -> v and `down` holds reversed edges v <- u, both towards higher ranks.
+
+    Args:
+        n (int): Number of nodes
+        sources, targets (array): Edge endpoints
+        lengths (array): Edge lengths in km (carried along shortest-time paths)
+        times (array): Edge travel times in seconds (the contraction metric)
+        settle_limit (int): Witness search budget
+
+    Returns:
+        tuple: (rank array, up edges, down edges), edges as (sources, targets, lengths, times) arrays
+    """
+    out = [dict() for _ in range(n)]
+    inc = [dict() for _ in range(n)]
+    for u, v, length, weight in zip(sources.tolist(), targets.tolist(), lengths.tolist(), times.tolist()):
+        if u != v and weight < out[u].get(v, (math.inf,))[0]:
+            out[u][v] = (weight, length)
+            inc[v][u] = (weight, length)
+
+    deleted_neighbours = [0] * n
+
+    def priority(node):
+        shortcuts = _required_shortcuts(out, inc, node, settle_limit)
+        return len(shortcuts) - len(out[node]) - len(inc[node]) + deleted_neighbours[node], shortcuts
+
+    heap = [(priority(node)[0], node) for node in range(n)]
+    heapq.heapify(heap)
+
+    rank = np.full(n, -1, dtype=np.int32)
+    up, down = [], []
+    next_rank = 0
+    while heap:
+        _, node = heapq.heappop(heap)
+        if rank[node] >= 0:
+            continue
+        # Lazy update: re-evaluate, and postpone if another node became cheaper
+        current, shortcuts = priority(node)
+        if heap and current > heap[0][0]:
+            heapq.heappush(heap, (current, node))
+            continue
+
+        rank[node] = next_rank
+        next_rank += 1
+        for target, (weight, length) in out[node].items():
+            up.append((node, target, length, weight))
+            del inc[target][node]
+        for source, (weight, length) in inc[node].items():
+            down.append((node, source, length, weight))
+            del out[source][node]
+        for neighbour in set(out[node]) | set(inc[node]):
+            deleted_neighbours[neighbour] += 1
+        out[node], inc[node] = {}, {}
+
+        for source, target, weight, length in shortcuts:
+            if weight < out[source].get(target, (math.inf,))[0]:
+                out[source][target] = (weight, length)
+                inc[target][source] = (weight, length)
+
+    def as_arrays(edges):
+        if not edges:
+            return (np.zeros(0, dtype=np.int64),) * 2 + (np.zeros(0),) * 2
+        u, v, length, weight = zip(*edges)
+        return np.array(u, dtype=np.int64), np.array(v, dtype=np.int64), np.array(length), np.array(weight)
+
+    return rank, as_arrays(up), as_arrays(down)
+
+
+def build_snap_index(node_lat, node_lng, cell_degrees=SNAP_CELL_DEGREES):
+    """
+    Grid index of the nodes: sorted cell ids with the nodes of each cell.
+
+    Returns:
+        tuple: (cell ids int64, cell starts int64 (cells + 1), node indices int32)
+    """
+    cells = _cell_ids(node_lat, node_lng, cell_degrees)
+    order = np.argsort(cells, kind='stable')
+    cell_ids, starts = np.unique(cells[order], return_index=True)
+    cell_starts = np.append(starts, len(order)).astype(np.int64)
+    return cell_ids.astype(np.int64), cell_starts, order.astype(np.int32)
+
+
+def _cell_rows_cols(lats, lngs, cell_degrees):
+    rows = np.floor((np.asarray(lats, dtype=np.float64) + 90.0) / cell_degrees).astype(np.int64)
+    cols = np.floor((np.asarray(lngs, dtype=np.float64) + 180.0) / cell_degrees).astype(np.int64)
+    return rows, cols
+
+
+def _cell_ids(lats, lngs, cell_degrees):
+    rows, cols = _cell_rows_cols(lats, lngs, cell_degrees)
+    return rows * int(math.ceil(360.0 / cell_degrees)) + cols
+
+
+def _snap_in_index(lat, lng, arrays, cell_degrees, max_km):
+    """Nearest node of one point within one snap index: (local node index or -1, distance km)"""
+    cell_ids, cell_starts, cell_nodes = arrays['cell_ids'], arrays['cell_starts'], arrays['cell_nodes']
+    if len(cell_ids) == 0:
+        return -1, math.inf
+
+    cell_km = cell_degrees * math.pi * EARTH_RADIUS_KM / 180.0
+    columns = int(math.ceil(360.0 / cell_degrees))
+    rows, cols = _cell_rows_cols(lat, lng, cell_degrees)
+    row_radius = int(math.ceil(max_km / cell_km))
+    col_radius = int(math.ceil(max_km / (cell_km * max(math.cos(math.radians(lat)), 0.01))))
+    neighbourhood = ((rows + np.arange(-row_radius, row_radius + 1))[:, None] * columns
+                     + (cols + np.arange(-col_radius, col_radius + 1))[None, :]).ravel()
+
+    positions = np.searchsorted(cell_ids, neighbourhood)
+    inside = positions < len(cell_ids)
+    positions, neighbourhood = positions[inside], neighbourhood[inside]
+    positions = positions[cell_ids[positions] == neighbourhood]
+    if not len(positions):
+        return -1, math.inf
+
+    candidates = np.concatenate([cell_nodes[cell_starts[p]:cell_starts[p + 1]] for p in positions])
+    candidate_km = haversine_km(lat, lng, arrays['node_lat'][candidates], arrays['node_lng'][candidates])
+    best = int(np.argmin(candidate_km))
+    if candidate_km[best] > max_km:
+        return -1, math.inf
+    return int(candidates[best]), float(candidate_km[best])
+
+
+def _gather_csr(arrays, group, nodes, renumber):
+    """CSR arrays of `group` restricted to `nodes` (in that order), with targets renumbered"""
+    offsets = arrays[f'{group}_offsets']
+    starts, ends = offsets[nodes], offsets[nodes + 1]
+    counts = ends - starts
+    local_offsets = np.zeros(len(nodes) + 1, dtype=np.int64)
+    np.cumsum(counts, out=local_offsets[1:])
+    edges = np.repeat(starts - local_offsets[:-1], counts) + np.arange(local_offsets[-1])
+    return {
+        f'{group}_offsets': local_offsets,
+        f'{group}_targets': renumber[arrays[f'{group}_targets'][edges]].astype(np.int32),
+        f'{group}_lengths': arrays[f'{group}_lengths'][edges],
+        f'{group}_times': arrays[f'{group}_times'][edges],
+    }
+
+
+class HierarchyQueries:
+    """
+    Many-to-many and point-to-point queries on a contraction hierarchy.
+
+    Subclasses provide `_edges(node, direction)` (upward edges of a node as
+    lists of targets, times and lengths) and `snap(lats, lngs)`.
+
+    Distances are the lengths (km) of the fastest paths; travel times are
+    in seconds.
+    """
+
+    def _prepare(self, lats, lngs):
+        """Hook called with the coordinates of a request before any search"""
+
+    def _upward_search(self, node, direction):
+        """Dijkstra restricted to higher-ranked nodes: {node: (time s, length km)}"""
+        best = {node: (0.0, 0.0)}
+        settled = {}
+        heap = [(0.0, node)]
+        while heap:
+            time_s, current = heapq.heappop(heap)
+            if current in settled:
+                continue
+            length = best[current][1]
+            settled[current] = (time_s, length)
+            for target, edge_time, edge_length in zip(*self._edges(current, direction)):
+                new_time = time_s + edge_time
+                if target not in settled and new_time < best.get(target, (math.inf,))[0]:
+                    best[target] = (new_time, length + edge_length)
+                    heapq.heappush(heap, (new_time, target))
+        return settled
+
+    def many_to_many(self, sources, targets):
+        """
+        Bucket-based many-to-many shortest paths on the hierarchy.
+
+        One backward upward search per target fills buckets on the nodes it
+        reaches; one forward upward search per source then scans the buckets
+        of the nodes it settles.
+
+        Args:
+            sources (array): Source node indices
+            targets (array): Target node indices
+
+        Returns:
+            tuple: (travel times s, lengths km), (len(sources), len(targets)) arrays, inf when unreachable
+        """
+        times = np.full((len(sources), len(targets)), np.inf)
+        lengths = np.full((len(sources), len(targets)), np.inf)
+
+        buckets = {}
+        for j, target in enumerate(targets):
+            for node, (time_s, length) in self._upward_search(int(target), 'down').items():
+                buckets.setdefault(node, []).append((j, time_s, length))
+
+        for i, source in enumerate(sources):
+            row_times, row_lengths = times[i], lengths[i]
+            for node, (time_s, length) in self._upward_search(int(source), 'up').items():
+                for j, bucket_time, bucket_length in buckets.get(node, ()):
+                    total = time_s + bucket_time
+                    if total < row_times[j]:
+                        row_times[j] = total
+                        row_lengths[j] = length + bucket_length
+        return times, lengths
+
+    def matrices(self, points):
+        """
+        Road distance and travel-time matrices between points.
+
+        Points are snapped to their nearest node; the straight line to that
+        node is added at ACCESS_SPEED_KMH. Pairs that cannot be routed (point
+        too far from the graph, disconnected component) fall back to the
+        great-circle distance times UNROUTABLE_DETOUR.
+
+        Within a request, the result of the last call is kept on flask.g and
+        reused when the same points are asked again, e.g. by distance_matrix
+        then travel_time_matrix; it is dropped with the request.
+
+        Args:
+            points: WaypointSet, or list of dictionaries each with 'lat', 'lng'
+
+        Returns:
+            tuple: (distances km, travel times s), (n, n) read-only arrays
+        """
+        lats, lngs = coordinate_arrays(points)
+        key = (np.ascontiguousarray(lats).tobytes(), np.ascontiguousarray(lngs).tobytes())
+        recent = g.get('road_matrices') if has_request_context() else None
+        if recent is not None and recent[0] is self and recent[1] == key:
+            return recent[2]
+        result = self._compute_matrices(lats, lngs)
+        for matrix in result:
+            matrix.flags.writeable = False
+        if has_request_context():
+            g.road_matrices = (self, key, result)
+        return result
+
+    def _compute_matrices(self, lats, lngs):
+        self._prepare(lats, lngs)
+        nodes, snap_km = self.snap(lats, lngs)
+
+        n = len(lats)
+        distances = np.full((n, n), np.inf)
+        times = np.full((n, n), np.inf)
+        snapped = np.flatnonzero(nodes >= 0)
+        if len(snapped):
+            unique_nodes, inverse = np.unique(nodes[snapped], return_inverse=True)
+            node_times, node_lengths = self.many_to_many(unique_nodes, unique_nodes)
+            access_km = snap_km[snapped]
+            access_s = access_km / ACCESS_SPEED_KMH * 3600.0
+            block = np.ix_(snapped, snapped)
+            distances[block] = node_lengths[np.ix_(inverse, inverse)] + access_km[:, None] + access_km[None, :]
+            times[block] = node_times[np.ix_(inverse, inverse)] + access_s[:, None] + access_s[None, :]
+
+        unroutable = ~np.isfinite(distances)
+        if unroutable.any():
+            rows, cols = np.nonzero(unroutable)
+            fallback = haversine_km(lats[rows], lngs[rows], lats[cols], lngs[cols]) * UNROUTABLE_DETOUR
+            distances[rows, cols] = fallback
+            times[rows, cols] = fallback / ACCESS_SPEED_KMH * 3600.0
+        np.fill_diagonal(distances, 0.0)
+        np.fill_diagonal(times, 0.0)
+        return distances, times
+
+    def distance_matrix(self, points):
+        """
+        Road distance matrix (km); a drop-in matrix provider for optimize_route.
+
+        Args:
+            points: WaypointSet, or list of dictionaries each with 'lat', 'lng'
+
+        Returns:
+            ndarray: (n, n) matrix, not necessarily symmetric (one-way streets)
+        """
+        return self.matrices(points)[0]
+
+    def travel_time_matrix(self, points):
+        """
+        Travel-time matrix (seconds) between points.
+
+        Args:
+            points: WaypointSet, or list of dictionaries each with 'lat', 'lng'
+
+        Returns:
+            ndarray: (n, n) matrix
+        """
+        return self.matrices(points)[1]
+
+    def leg_distances(self, route):
+        """
+        Road distance of each leg of an ordered route.
+
+        Args:
+            route: Ordered WaypointSet, or list of dictionaries each with 'lat', 'lng'
+
+        Returns:
+            list: len(route) - 1 distances in kilometers
+        """
+        if len(route) < 2:
+            return []
+        lats, lngs = coordinate_arrays(route)
+        self._prepare(lats, lngs)
+        nodes, snap_km = self.snap(lats, lngs)
+
+        legs = []
+        for i in range(len(route) - 1):
+            length = math.inf
+            if nodes[i] >= 0 and nodes[i + 1] >= 0:
+                # Point-to-point query: the two upward searches meet at the highest node of the path
+                forward = self._upward_search(int(nodes[i]), 'up')
+                backward = self._upward_search(int(nodes[i + 1]), 'down')
+                meeting = [(forward[node][0] + backward[node][0], forward[node][1] + backward[node][1])
+                           for node in forward.keys() & backward.keys()]
+                if meeting:
+                    length = min(meeting)[1] + snap_km[i] + snap_km[i + 1]
+            if math.isinf(length):
+                length = float(haversine_km(lats[i], lngs[i], lats[i + 1], lngs[i + 1])) * UNROUTABLE_DETOUR
+            legs.append(float(length))
+        return legs
+
+    def pair_distances(self, lats_a, lngs_a, lats_b, lngs_b):
+        """
+        Road distances between two sequences of points, element-wise.
+
+        One many-to-many search covers the distinct snapped sources and
+        targets, so a point against every stop of a route costs a single
+        query instead of one per pair.
+
+        Args:
+            lats_a, lngs_a (array): Coordinates of the origins
+            lats_b, lngs_b (array): Coordinates of the destinations
+
+        Returns:
+            ndarray: Distances in kilometers
+        """
+        lats_a, lngs_a = np.asarray(lats_a, dtype=np.float64), np.asarray(lngs_a, dtype=np.float64)
+        lats_b, lngs_b = np.asarray(lats_b, dtype=np.float64), np.asarray(lngs_b, dtype=np.float64)
+        count = len(lats_a)
+        if not count:
+            return np.zeros(0)
+        lats, lngs = np.concatenate([lats_a, lats_b]), np.concatenate([lngs_a, lngs_b])
+        self._prepare(lats, lngs)
+        nodes, snap_km = self.snap(lats, lngs)
+
+        distances = np.full(count, np.inf)
+        routable = np.flatnonzero((nodes[:count] >= 0) & (nodes[count:] >= 0))
+        if len(routable):
+            sources, rows = np.unique(nodes[routable], return_inverse=True)
+            targets, cols = np.unique(nodes[count + routable], return_inverse=True)
+            lengths = self.many_to_many(sources, targets)[1]
+            distances[routable] = lengths[rows, cols] + snap_km[routable] + snap_km[count + routable]
+
+        unroutable = np.flatnonzero(~np.isfinite(distances))
+        if len(unroutable):
+            distances[unroutable] = haversine_km(lats_a[unroutable], lngs_a[unroutable],
+                                                 lats_b[unroutable], lngs_b[unroutable]) * UNROUTABLE_DETOUR
+        return distances
+
+
+class RoadNetwork(HierarchyQueries):
+    """
+    Road graph with a contraction hierarchy, held as flat in-memory arrays.
+
+    Arrays: node coordinates and ranks, the original edges in CSR form
+    (`edge_*`), the upward (`up_*`) and reversed downward (`down_*`)
+    hierarchy in CSR form, and a grid snap index. Built once from an OSM
+    extract, then written as memory-mappable tiles with write_tiles().
+    """
+
+    def __init__(self, arrays, cell_degrees=SNAP_CELL_DEGREES):
+        self.arrays = arrays
+        self.cell_degrees = cell_degrees
+        self.node_count = len(arrays['node_lat'])
+
+    @classmethod
+    def from_edges(cls, node_lat, node_lng, sources, targets, lengths, times, settle_limit=WITNESS_SETTLE_LIMIT):
+        """
+        Builds a network (CSR graph, hierarchy and snap index) from an edge list.
+
+        Args:
+            node_lat, node_lng (array): Node coordinates in degrees
+            sources, targets (array): Directed edge endpoints (node indices)
+            lengths (array): Edge lengths in km
+            times (array): Edge travel times in seconds
+            settle_limit (int): Witness search budget of the contraction
+
+        Returns:
+            RoadNetwork: The network
+        """
+        n = len(node_lat)
+        sources, targets = np.asarray(sources, dtype=np.int64), np.asarray(targets, dtype=np.int64)
+        lengths, times = np.asarray(lengths, dtype=np.float64), np.asarray(times, dtype=np.float64)
+
+        arrays = {'node_lat': np.asarray(node_lat, dtype=np.float64), 'node_lng': np.asarray(node_lng, dtype=np.float64)}
+        (arrays['edge_offsets'], arrays['edge_targets'],
+         arrays['edge_lengths'], arrays['edge_times']) = build_csr(n, sources, targets, lengths, times)
+
+        rank, up, down = contract_graph(n, sources, targets, lengths, times, settle_limit)
+        arrays['rank'] = rank
+        arrays['up_offsets'], arrays['up_targets'], arrays['up_lengths'], arrays['up_times'] = build_csr(n, *up)
+        arrays['down_offsets'], arrays['down_targets'], arrays['down_lengths'], arrays['down_times'] = build_csr(n, *down)
+        arrays['cell_ids'], arrays['cell_starts'], arrays['cell_nodes'] = build_snap_index(arrays['node_lat'], arrays['node_lng'])
+        return cls(arrays)
+
+    @classmethod
+    def from_osm(cls, path, settle_limit=WITNESS_SETTLE_LIMIT):
+        """
+        Builds a network from a local OSM extract (requires pyosmium).
+
+        Args:
+            path (str): Path of the .osm.pbf extract
+
+        Returns:
+            RoadNetwork: The network
+        """
+        return cls.from_edges(*graph_from_ways(read_osm_ways(path)), settle_limit=settle_limit)
+
+    def _edges(self, node, direction):
+        offsets = self.arrays[f'{direction}_offsets']
+        start, end = int(offsets[node]), int(offsets[node + 1])
+        return (self.arrays[f'{direction}_targets'][start:end].tolist(),
+                self.arrays[f'{direction}_times'][start:end].tolist(),
+                self.arrays[f'{direction}_lengths'][start:end].tolist())
+
+    def snap(self, lats, lngs, max_km=MAX_SNAP_KM):
+        """
+        Finds the nearest graph node of each point.
+
+        Args:
+            lats, lngs (array): Point coordinates in degrees
+            max_km (float): Maximum snapping distance
+
+        Returns:
+            tuple: (node indices, -1 where nothing is within max_km; snapping distances in km)
+        """
+        nodes = np.full(len(lats), -1, dtype=np.int64)
+        distances = np.full(len(lats), np.inf)
+        for i, (lat, lng) in enumerate(zip(lats, lngs)):
+            nodes[i], distances[i] = _snap_in_index(float(lat), float(lng), self.arrays, self.cell_degrees, max_km)
+        return nodes, distances
+
+    def write_tiles(self, directory, tile_degrees=TILE_DEGREES, core_fraction=CORE_FRACTION):
+        """
+        Serialises the network as memory-mappable regional tiles.
+
+        Nodes are renumbered so that each tile holds a contiguous id range.
+        The highest-ranked nodes, which nearly every hierarchy search
+        reaches, go to a `core` tile that is always mapped; the others are
+        grouped into square tiles of `tile_degrees`. Each tile directory
+        holds the node, CSR edge, hierarchy and snap index arrays of its
+        nodes as .npy files, and manifest.json lists the tiles.
+
+        Args:
+            directory (str): Target directory (created if needed)
+            tile_degrees (float): Side of a regional tile in degrees
+            core_fraction (float): Share of the nodes kept in the core tile
+        """
+        n = self.node_count
+        rank = np.asarray(self.arrays['rank'])
+        core_size = min(n, max(MIN_CORE_NODES, int(n * core_fraction)))
+        is_core = rank >= n - core_size
+
+        tile_rows, tile_cols = _cell_rows_cols(self.arrays['node_lat'], self.arrays['node_lng'], tile_degrees)
+        regional_keys = np.unique(np.stack([tile_rows[~is_core], tile_cols[~is_core]], axis=1), axis=0)
+        tile_index = np.zeros(n, dtype=np.int64)
+        if len(regional_keys):
+            columns = int(math.ceil(360.0 / tile_degrees))
+            key_codes = regional_keys[:, 0] * columns + regional_keys[:, 1]
+            tile_index[~is_core] = 1 + np.searchsorted(key_codes, (tile_rows * columns + tile_cols)[~is_core])
+
+        # Tile 0 is the core, then regional tiles in (row, col) order
+        order = np.argsort(tile_index, kind='stable')
+        renumber = np.empty(n, dtype=np.int64)
+        renumber[order] = np.arange(n)
+        firsts = np.searchsorted(tile_index[order], np.arange(len(regional_keys) + 1))
+
+        os.makedirs(directory, exist_ok=True)
+        tiles = []
+        for t in range(len(regional_keys) + 1):
+            first = int(firsts[t])
+            count = int((firsts[t + 1] if t + 1 < len(firsts) else n) - first)
+            nodes = order[first:first + count]
+            name = 'core' if t == 0 else f'{int(regional_keys[t - 1][0])}_{int(regional_keys[t - 1][1])}'
+
+            arrays = {'node_lat': self.arrays['node_lat'][nodes], 'node_lng': self.arrays['node_lng'][nodes],
+                      'rank': rank[nodes]}
+            for group in CSR_GROUPS:
+                arrays.update(_gather_csr(self.arrays, group, nodes, renumber))
+            arrays['cell_ids'], arrays['cell_starts'], arrays['cell_nodes'] = build_snap_index(
+                arrays['node_lat'], arrays['node_lng'], self.cell_degrees
+            )
+
+            tile_path = os.path.join(directory, name)
+            os.makedirs(tile_path, exist_ok=True)
+            for array_name in ARRAY_NAMES:
+                np.save(os.path.join(tile_path, f'{array_name}.npy'), np.ascontiguousarray(arrays[array_name]))
+
+            entry = {'name': name, 'first': first, 'count': count}
+            if count:
+                entry['bbox'] = [float(arrays['node_lat'].min()), float(arrays['node_lng'].min()),
+                                 float(arrays['node_lat'].max()), float(arrays['node_lng'].max())]
+            tiles.append(entry)
+
+        manifest = {'version': FORMAT_VERSION, 'nodes': n, 'tile_degrees': tile_degrees,
+                    'cell_degrees': self.cell_degrees, 'tiles': tiles}
+        tmp_path = os.path.join(directory, f'manifest.json.{os.getpid()}.tmp')
+        with open(tmp_path, 'w') as handle:
+            json.dump(manifest, handle)
+        # The manifest is written last: a directory without it is an unfinished build
+        os.replace(tmp_path, os.path.join(directory, 'manifest.json'))
+
+
+class TiledRoadNetwork(HierarchyQueries):
+    """
+    Road network read from the tiles written by RoadNetwork.write_tiles().
+
+    Opening it only reads the manifest. Tiles are mapped with
+    np.load(mmap_mode='r') the first time they are needed: the core tile,
+    the tiles covering a request's bounding box, and any tile a search
+    wanders into. Mapped pages live in the OS cache and are shared by all
+    workers, so start-up time and per-worker memory do not depend on the
+    size of the graph.
+    """
+
+    def __init__(self, directory):
+        with open(os.path.join(directory, 'manifest.json')) as handle:
+            manifest = json.load(handle)
+        if manifest.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Format de graphe routier non pris en charge : {manifest.get('version')}")
+        self.directory = directory
+        self.node_count = manifest['nodes']
+        self.cell_degrees = manifest['cell_degrees']
+        self.tiles = manifest['tiles']
+        self.firsts = np.array([tile['first'] for tile in self.tiles], dtype=np.int64)
+        self._mapped = {}
+
+    @property
+    def mapped_tiles(self):
+        """Names of the tiles mapped by this process"""
+        return sorted(self.tiles[t]['name'] for t in self._mapped)
+
+    def _tile(self, t):
+        arrays = self._mapped.get(t)
+        if arrays is None:
+            tile_path = os.path.join(self.directory, self.tiles[t]['name'])
+            arrays = {name: np.load(os.path.join(tile_path, f'{name}.npy'), mmap_mode='r') for name in ARRAY_NAMES}
+            self._mapped[t] = arrays
+        return arrays
+
+    def _tiles_near(self, lat_min, lng_min, lat_max, lng_max, margin_km):
+        """Regional tiles whose nodes may lie within margin_km of the box"""
+        margin_lat = margin_km / 111.0
+        margin_lng = margin_km / (111.0 * max(math.cos(math.radians(max(abs(lat_min), abs(lat_max)))), 0.01))
+        return [t for t, tile in enumerate(self.tiles)
+                if t > 0 and tile['count']
+                and tile['bbox'][0] <= lat_max + margin_lat and tile['bbox'][2] >= lat_min - margin_lat
+                and tile['bbox'][1] <= lng_max + margin_lng and tile['bbox'][3] >= lng_min - margin_lng]
+
+    def _prepare(self, lats, lngs):
+        # Map the core and the tiles covering the request's bounding box up front
+        self._tile(0)
+        if len(lats):
+            for t in self._tiles_near(lats.min(), lngs.min(), lats.max(), lngs.max(), MAX_SNAP_KM):
+                self._tile(t)
+
+    def _edges(self, node, direction):
+        t = int(np.searchsorted(self.firsts, node, side='right')) - 1
+        arrays = self._tile(t)
+        local = node - self.tiles[t]['first']
+        offsets = arrays[f'{direction}_offsets']
+        start, end = int(offsets[local]), int(offsets[local + 1])
+        return (arrays[f'{direction}_targets'][start:end].tolist(),
+                arrays[f'{direction}_times'][start:end].tolist(),
+                arrays[f'{direction}_lengths'][start:end].tolist())
+
+    def snap(self, lats, lngs, max_km=MAX_SNAP_KM):
+        """
+        Finds the nearest graph node of each point, searching only nearby tiles.
+
+        Args:
+            lats, lngs (array): Point coordinates in degrees
+            max_km (float): Maximum snapping distance
+
+        Returns:
+            tuple: (node indices, -1 where nothing is within max_km; snapping distances in km)
+        """
+        nodes = np.full(len(lats), -1, dtype=np.int64)
+        distances = np.full(len(lats), np.inf)
+        for i, (lat, lng) in enumerate(zip(lats, lngs)):
+            lat, lng = float(lat), float(lng)
+            for t in [0] + self._tiles_near(lat, lng, lat, lng, max_km):
+                local, distance = _snap_in_index(lat, lng, self._tile(t), self.cell_degrees, max_km)
+                if local >= 0 and distance < distances[i]:
+                    nodes[i], distances[i] = self.tiles[t]['first'] + local, distance
+        return nodes, distances
+
+
+_network = None
+
+
+def get_road_network():
+    """
+    Returns the process-wide road network, or None if not configured.
+
+    ROAD_GRAPH_PATH points to a directory of tiles written by
+    `flask --app main build-road-graph`. When it is unset or unusable,
+    callers keep using great-circle distances.
+
+    Returns:
+        TiledRoadNetwork: Shared network, or None
+    """
+    global _network
+    path = os.environ.get('ROAD_GRAPH_PATH', '')
+    if not path:
+        return None
+    if _network is None or _network[0] != path:
+        try:
+            _network = (path, TiledRoadNetwork(path))
+        except (OSError, ValueError) as e:
+            logging.error(f"Graphe routier indisponible ({path}) : {e}")
+            _network = (path, None)
+    return _network[1]
@@ -0,0 +1,97 @@
+import sys
+from array import array
+
+import numpy as np
+
+from utils.waypoints import WaypointSet
+
+
+def pack_floats(values):
+    """
+    Packs a sequence of floats into a little-endian float64 byte string.
+
+    Args:
+        values (iterable): Float values
+
+    Returns:
+        bytes: Packed values (8 bytes per value)
+    """
+    packed = array('d', values)
+    if sys.byteorder != 'little':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack_floats(data):
+    """
+    Unpacks a byte string produced by pack_floats.
+
+    Args:
+        data (bytes): Packed float64 values
+
+    Returns:
+        array: Array of floats
+    """
+    values = array('d')
+    if data:
+        values.frombytes(data)
+        if sys.byteorder != 'little':
+            values.byteswap()
+    return values
+
+
+def encode_points(points):
+    """
+    Splits a list of points into a packed coordinate buffer and a name list.
+
+    Coordinates are stored as interleaved (lat, lng) float64 pairs.
+
+    Args:
+        points: WaypointSet, or list of dictionaries each with 'name', 'lat', 'lng'
+
+    Returns:
+        tuple: (coordinates bytes, list of names)
+    """
+    if isinstance(points, WaypointSet):
+        pairs = np.column_stack([points.lat, points.lng]).astype('<f8')
+        return pairs.tobytes(), [points.name(i) for i in range(len(points))]
+    coordinates = []
+    names = []
+    for point in points:
+        coordinates.append(float(point['lat']))
+        coordinates.append(float(point['lng']))
+        names.append(str(point.get('name', '')))
+    return pack_floats(coordinates), names
+
+
+def decode_points(data, names):
+    """
+    Rebuilds the list of point dictionaries from encode_points output.
+
+    Args:
+        data (bytes): Packed (lat, lng) pairs
+        names (list): Point names, in the same order
+
+    Returns:
+        list: List of dictionaries, each with 'name', 'lat', 'lng'
+    """
+    coordinates = unpack_floats(data)
+    return [
+        {'name': names[i], 'lat': coordinates[2 * i], 'lng': coordinates[2 * i + 1]}
+        for i in range(len(coordinates) // 2)
+    ]
+
+
+def decode_waypoint_set(data, names):
+    """
+    Rebuilds a WaypointSet from encode_points output without copying the coordinates.
+
+    Args:
+        data (bytes): Packed (lat, lng) pairs
+        names (list): Point names, in the same order
+
+    Returns:
+        WaypointSet: Read-only views on `data`
+    """
+    pairs = np.frombuffer(data or b'', dtype='<f8').reshape(-1, 2)
+    return WaypointSet(pairs[:, 0], pairs[:, 1], list(names))
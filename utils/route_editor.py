@@ -0,0 +1,184 @@
+import numpy as np
+
+from utils.distance_matrix import pairwise_distances
+from utils.local_search import improve_path
+from utils.waypoints import coordinate_arrays
+
+
+class LegDistanceCache:
+    """
+    Pairwise distance cache over a list of points, filled in vectorised batches.
+
+    Known leg distances (e.g. those stored with a saved route) are seeded
+    so that unchanged legs are never recomputed. Distances come from
+    `provider(a, b)`, which returns the element-wise distances between two
+    index arrays; geodesic distances (symmetric, through the shared
+    distance store) by default.
+    """
+
+    def __init__(self, points, known_legs=None, provider=None, symmetric=True):
+        self.points = points
+        self.lats, self.lngs = coordinate_arrays(points)
+        self.provider = provider or self._geodesic
+        self.symmetric = symmetric
+        self.cache = {}
+        if known_legs:
+            for i, distance in enumerate(known_legs):
+                self.cache[(i, i + 1)] = distance
+                if symmetric:
+                    self.cache[(i + 1, i)] = distance
+
+    def _geodesic(self, a, b):
+        return pairwise_distances(self.lats[a], self.lngs[a], self.lats[b], self.lngs[b])
+
+    def preload(self, pairs):
+        """
+        Computes in one provider call the distances of the pairs not cached yet.
+
+        Args:
+            pairs (iterable): (a, b) point index pairs
+        """
+        missing = list(dict.fromkeys(pair for pair in pairs if pair[0] != pair[1] and pair not in self.cache))
+        if not missing:
+            return
+        a = np.array([pair[0] for pair in missing], dtype=np.intp)
+        b = np.array([pair[1] for pair in missing], dtype=np.intp)
+        for pair, distance in zip(missing, self.provider(a, b).tolist()):
+            self.cache[pair] = distance
+            if self.symmetric:
+                self.cache[(pair[1], pair[0])] = distance
+
+    def __call__(self, a, b):
+        if a == b:
+            return 0.0
+        distance = self.cache.get((a, b))
+        if distance is None:
+            self.preload([(a, b)])
+            distance = self.cache[(a, b)]
+        return distance
+
+    def average(self, a, b):
+        """Mean of both directions, for the local search on asymmetric (road) distances"""
+        return (self(a, b) + self(b, a)) / 2
+
+
+def cheapest_insertion_position(order, point, dist):
+    """
+    Finds where inserting a point into an open path costs the least.
+
+    Args:
+        order (list): Point indices in visiting order (position 0 is the fixed start)
+        point (int): Index of the point to insert
+        dist (callable): dist(a, b) -> distance
+
+    Returns:
+        int: Position at which to insert (1..len(order))
+    """
+    # Appending after the last stop
+    best_position = len(order)
+    best_cost = dist(order[-1], point)
+    for position in range(1, len(order)):
+        before, after = order[position - 1], order[position]
+        cost = dist(before, point) + dist(point, after) - dist(before, after)
+        if cost < best_cost:
+            best_position, best_cost = position, cost
+    return best_position
+
+
+def touched_segments(positions, window, size):
+    """
+    Merges the neighbourhoods of changed positions into disjoint position ranges.
+
+    Args:
+        positions (iterable): Changed positions
+        window (int): Neighbourhood radius
+        size (int): Path length
+
+    Returns:
+        list: (first, last) inclusive ranges, excluding the fixed start (0)
+    """
+    segments = []
+    for position in sorted(positions):
+        first, last = max(1, position - window), min(size - 1, position + window)
+        if segments and first <= segments[-1][1] + 1:
+            segments[-1] = (segments[-1][0], max(segments[-1][1], last))
+        elif first <= last:
+            segments.append((first, last))
+    return segments
+
+
+def edit_route(points, legs=None, add=(), remove=(), window=10, road_network=None):
+    """
+    Applies stop additions and removals to an already optimized route.
+
+    Removed stops are spliced out, added stops are placed by cheapest
+    insertion, then a bounded local search runs only around the changed
+    positions. Distances of unchanged legs are reused from `legs`; the
+    others are computed in a few vectorised batches (each added stop to
+    every stop, then each searched neighbourhood), so an edit costs
+    O(n * len(add)) distance lookups plus a constant-size search.
+
+    Args:
+        points (list): Current route (start point first), dicts with 'name', 'lat', 'lng'
+        legs (list): Current leg distances in km (len(points) - 1), or None
+        add (list): Stops to add, dicts with 'name', 'lat', 'lng'
+        remove (iterable): Waypoint positions to remove (0-based, start point excluded)
+        window (int): Neighbourhood radius of the local search
+        road_network (HierarchyQueries): Road graph the route was built on, None for geodesic distances
+
+    Returns:
+        tuple: (new points list, new leg distances list)
+    """
+    all_points = list(points) + list(add)
+    if legs is not None and len(legs) != len(points) - 1:
+        legs = None
+    if road_network is not None:
+        lats, lngs = coordinate_arrays(all_points)
+
+        def provider(a, b):
+            return road_network.pair_distances(lats[a], lngs[a], lats[b], lngs[b])
+
+        dist = LegDistanceCache(all_points, legs, provider, symmetric=False)
+        search_dist = dist.average
+    else:
+        dist = search_dist = LegDistanceCache(all_points, legs)
+
+    removed = {position + 1 for position in remove if 0 <= position < len(points) - 1}
+    order = []
+    touched = set()
+    gaps = []
+    for index in range(len(points)):
+        if index in removed:
+            # The stop before the gap now has a new neighbour
+            touched.add(order[-1])
+            continue
+        if order and order[-1] in touched:
+            gaps.append((order[-1], index))
+        order.append(index)
+    if legs is None:
+        dist.preload(zip(order, order[1:]))
+
+    # Each added stop to every stop in one batch (and back, in a second one on one-way streets)
+    added = range(len(points), len(all_points))
+    dist.preload(gaps + [(new, other) for new in added for other in order + list(added)])
+    if not dist.symmetric:
+        dist.preload([(other, new) for new in added for other in order + list(added)])
+
+    for index in added:
+        position = cheapest_insertion_position(order, index, dist)
+        order.insert(position, index)
+        touched.add(index)
+
+    if touched:
+        positions = [position for position, index in enumerate(order) if index in touched]
+        for first, last in touched_segments(positions, window, len(order)):
+            # Moves stay inside the segment, so only the distances between its stops and its two
+            # outer neighbours are ever read: one batch per segment
+            nodes = order[first - 1:last + 2]
+            dist.preload((a, b) for a in nodes for b in nodes)
+            improve_path(order, search_dist, positions=range(first, last + 1), window=0)
+
+    dist.preload(zip(order, order[1:]))
+    new_points = [all_points[index] for index in order]
+    new_legs = [dist(order[i], order[i + 1]) for i in range(len(order) - 1)]
+    return new_points, new_legs
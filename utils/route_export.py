@@ -0,0 +1,234 @@
+import csv
+import io
+import re
+import zipfile
+from xml.sax.saxutils import escape, quoteattr
+
+from flask import Response, stream_with_context
+from sqlalchemy.orm import undefer_group
+
+# Rows fetched per round trip when streaming routes from the database
+EXPORT_BATCH_SIZE = 500
+
+# Export format -> (MIME type, file extension)
+EXPORT_FORMATS = {
+    'gpx': ('application/gpx+xml', 'gpx'),
+    'kml': ('application/vnd.google-earth.kml+xml', 'kml'),
+    'csv': ('text/csv', 'csv'),
+}
+
+CSV_COLUMNS = ['route_id', 'route_name', 'created_at', 'position', 'name', 'lat', 'lng', 'leg_km']
+
+
+def iter_routes(query, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Streams saved routes with their geometry, `batch_size` rows at a time.
+
+    Uses yield_per, i.e. a server-side cursor where the database supports it,
+    so memory stays bounded by the batch size whatever the number of routes.
+
+    Args:
+        query (Query): SavedRoute query, already filtered
+        batch_size (int): Rows per fetch
+
+    Yields:
+        SavedRoute: Routes in id order
+    """
+    from models import SavedRoute
+
+    query = query.options(undefer_group('geometry')).order_by(SavedRoute.id)
+    yield from query.yield_per(batch_size)
+
+
+def slugify(text):
+    """ASCII file-name-safe version of a name"""
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')[:60]
+
+
+def export_basename(route):
+    """File name of a route export without extension, e.g. "12-tournee-lundi" """
+    return f'{route.id}-{slugify(route.name) or "itineraire"}'
+
+
+def _leg_distances(route):
+    legs = route.legs
+    points = route.points
+    if legs is None or len(legs) != len(points) - 1:
+        return [None] * (len(points) - 1)
+    return legs
+
+
+def gpx_chunks(routes):
+    """
+    GPX 1.1 document with one <rte> per route.
+
+    Args:
+        routes (iterable): Saved routes
+
+    Yields:
+        str: Document parts, one per route
+    """
+    yield ('<?xml version="1.0" encoding="UTF-8"?>\n'
+           '<gpx version="1.1" creator="GPS Pathfinder" xmlns="http://www.topografix.com/GPX/1/1">\n')
+    for route in routes:
+        parts = [f'  <rte>\n    <name>{escape(route.name)}</name>\n']
+        if route.total_distance is not None:
+            parts.append(f'    <desc>{route.total_distance:.2f} km</desc>\n')
+        for point in route.points:
+            parts.append(f'    <rtept lat="{point["lat"]:.7f}" lon="{point["lng"]:.7f}">'
+                         f'<name>{escape(str(point["name"]))}</name></rtept>\n')
+        parts.append('  </rte>\n')
+        yield ''.join(parts)
+    yield '</gpx>\n'
+
+
+def kml_chunks(routes):
+    """
+    KML document with one folder per route: the path and a placemark per stop.
+
+    Args:
+        routes (iterable): Saved routes
+
+    Yields:
+        str: Document parts, one per route
+    """
+    yield ('<?xml version="1.0" encoding="UTF-8"?>\n'
+           '<kml xmlns="http://www.opengis.net/kml/2.2">\n<Document>\n  <name>GPS Pathfinder</name>\n')
+    for route in routes:
+        points = route.points
+        name = escape(route.name)
+        coordinates = ' '.join(f'{point["lng"]:.7f},{point["lat"]:.7f}' for point in points)
+        parts = [f'  <Folder>\n    <name>{name}</name>\n',
+                 f'    <Placemark>\n      <name>{name}</name>\n'
+                 f'      <LineString><coordinates>{coordinates}</coordinates></LineString>\n    </Placemark>\n']
+        for position, point in enumerate(points):
+            parts.append(f'    <Placemark id={quoteattr(f"r{route.id}-{position}")}>'
+                         f'<name>{escape(str(point["name"]))}</name>'
+                         f'<Point><coordinates>{point["lng"]:.7f},{point["lat"]:.7f}</coordinates></Point>'
+                         f'</Placemark>\n')
+        parts.append('  </Folder>\n')
+        yield ''.join(parts)
+    yield '</Document>\n</kml>\n'
+
+
+def csv_chunks(routes):
+    """
+    CSV with one row per point; position 0 is the start point.
+
+    Args:
+        routes (iterable): Saved routes
+
+    Yields:
+        str: Header, then the rows of one route per chunk
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    for route in routes:
+        created_at = route.created_at.isoformat() if route.created_at else ''
+        legs = [None] + _leg_distances(route)
+        for position, point in enumerate(route.points):
+            leg = legs[position]
+            writer.writerow([route.id, route.name, created_at, position, point['name'],
+                             f'{point["lat"]:.7f}', f'{point["lng"]:.7f}', '' if leg is None else f'{leg:.3f}'])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+FORMAT_WRITERS = {'gpx': gpx_chunks, 'kml': kml_chunks, 'csv': csv_chunks}
+
+
+def export_chunks(routes, export_format):
+    """
+    Streams routes as a single document in `export_format`, encoded as UTF-8.
+
+    Args:
+        routes (iterable): Saved routes
+        export_format (str): Key of EXPORT_FORMATS
+
+    Yields:
+        bytes: Document parts
+    """
+    for chunk in FORMAT_WRITERS[export_format](routes):
+        yield chunk.encode('utf-8')
+
+
+class _ZipSink(io.RawIOBase):
+    """Write-only, non-seekable sink collecting the bytes zipfile produces until they are drained"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def zip_chunks(routes, export_format):
+    """
+    Streams a zip archive with one `export_format` file per route.
+
+    The archive is produced incrementally (entries use data descriptors), so
+    only the central directory, a few dozen bytes per route, is kept in memory.
+
+    Args:
+        routes (iterable): Saved routes
+        export_format (str): Key of EXPORT_FORMATS
+
+    Yields:
+        bytes: Archive parts, one per route
+    """
+    extension = EXPORT_FORMATS[export_format][1]
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for route in routes:
+            with archive.open(f'{export_basename(route)}.{extension}', 'w') as entry:
+                for chunk in export_chunks([route], export_format):
+                    entry.write(chunk)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def export_response(routes, export_format, basename, archive=False):
+    """
+    Streaming download of routes, as one document or a zip of one file per route.
+
+    The generator runs inside the request context, so the database cursor
+    behind `routes` stays open until the last chunk is sent.
+
+    Args:
+        routes (iterable): Saved routes, typically from iter_routes
+        export_format (str): Key of EXPORT_FORMATS
+        basename (str): Download file name without extension
+        archive (bool): True for a zip archive
+
+    Returns:
+        Response: Streamed attachment
+    """
+    if archive:
+        body, mimetype, filename = zip_chunks(routes, export_format), 'application/zip', f'{basename}.zip'
+    else:
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        body, filename = export_chunks(routes, export_format), f'{basename}.{extension}'
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
@@ -1,45 +1,216 @@
-import networkx as nx
+import numpy as np
 
-from utils.geo_utils import calculate_distance
+from utils.distance_matrix import build_distance_matrix, distance_matrix
+from utils.local_search import sweep_windows
+from utils.metrics import stage
+from utils.time_windows import DEFAULT_SPEED_KMH, has_time_windows, solve_time_windows
+from utils.travel_profiles import TravelTimeModel, improve_duration
+from utils.waypoints import WaypointSet
 
+# Above this many points (start included) the NetworkX solver is replaced by a
+# row-streaming heuristic that also works on tiled, out-of-core matrices
+LARGE_INSTANCE_STOPS = 400
+LARGE_INSTANCE_TIME_LIMIT = 10.0
+# Positions along the path searched together by the large-instance local search
+LARGE_INSTANCE_WINDOW = 30
 
-def optimize_route(start_point, waypoints):
+# Local search budget of the time-window solver, after its quadratic insertion
+TIME_WINDOWS_TIME_LIMIT = 5.0
+
+
+def solver_engine(stops, time_windows=False):
+    """
+    Engine optimize_route uses for a problem.
+
+    Args:
+        stops (int): Number of points including the start
+        time_windows (bool): True if some waypoints have time windows
+
+    Returns:
+        str: 'time_windows', 'large' or 'networkx'
+    """
+    if time_windows:
+        return 'time_windows'
+    return 'large' if stops > LARGE_INSTANCE_STOPS else 'networkx'
+
+
+def optimize_with_time_windows(all_points, matrix, stats=None, time_matrix_provider=None, departure=480.0,
+                               travel_model=None):
+    """
+    Orders the waypoints so that each stop is served within its time window.
+
+    Args:
+        all_points (WaypointSet): Start point followed by the waypoints; waypoints may
+            carry 'tw_start', 'tw_end' and 'service_min'
+        matrix (ndarray): (n, n) distance matrix in km
+        stats (dict): Optional dictionary filled with solver details ('engine', 'late_stops')
+        time_matrix_provider (callable): Optional provider(points) -> (n, n) travel times
+            in seconds; distances at DEFAULT_SPEED_KMH otherwise
+        departure (float): Departure time from the start point, in minutes since midnight
+        travel_model (TravelTimeModel): Optional time-dependent travel times; the solver
+            uses those of the departure's time bucket
+
+    Returns:
+        WaypointSet: The points in visiting order with 'arrival', 'late' and, when the
+            vehicle waits for the window to open, 'service_start'
+    """
+    with stage('travel_times'):
+        if travel_model is not None:
+            travel_minutes = np.array(travel_model.matrix(travel_model.profiles.bucket(departure)))
+        elif time_matrix_provider is not None:
+            travel_minutes = time_matrix_provider(all_points) / 60.0
+        else:
+            travel_minutes = matrix / DEFAULT_SPEED_KMH * 60.0
+
+    with stage('solve'):
+        order, schedule = solve_time_windows(all_points, matrix, travel_minutes, departure,
+                                             time_limit=TIME_WINDOWS_TIME_LIMIT)
+
+    arrival = np.array([stop['arrival'] for stop in schedule])
+    start = np.array([stop['start'] for stop in schedule])
+    late = np.array([stop['late'] for stop in schedule], dtype=np.float64)
+    # Early arrival: the vehicle waits for the window to open
+    service_start = np.where(start > arrival, start, np.nan)
+    if stats is not None:
+        stats['engine'] = 'time_windows'
+        stats['late_stops'] = int(late.sum())
+    return all_points.take(order).with_attributes(arrival=arrival, late=late, service_start=service_start)
+
+
+def optimize_route(start_point, waypoints, stats=None, matrix_provider=None, time_matrix_provider=None,
+                   departure=480.0, speed_profiles=None):
     """
     Optimize the route from a starting point through all waypoints
-    using the Traveling Salesman Problem (TSP) solver in NetworkX.
+    using the Traveling Salesman Problem (TSP) solver in NetworkX
+    (see solver_engine for the other engines).
     
     Args:
         start_point (dict): Dictionary with 'name', 'lat', 'lng'
-        waypoints (list): List of dictionaries, each with 'name', 'lat', 'lng'
+        waypoints: WaypointSet, or list of dictionaries each with 'name', 'lat', 'lng'
+        stats (dict): Optional dictionary filled with solver details ('engine', and
+            'duration_min' with speed profiles)
+        matrix_provider (callable): Optional matrix_provider(points) -> (n, n) distance
+            matrix, e.g. RoadNetwork.distance_matrix; great-circle distances by default
+        time_matrix_provider (callable): Optional provider(points) -> (n, n) travel times
+            in seconds, used when waypoints have time windows
+        departure (float): Departure time in minutes since midnight, used with time windows
+            and speed profiles
+        speed_profiles (SpeedProfiles): Optional time-of-day speed profiles; the order is then
+            polished to minimise the duration for `departure`, and stops get their 'arrival'
     
     Returns:
-        list: Ordered list of points for the optimized route
+        WaypointSet or list: Start point and waypoints in visiting order, of the same
+            kind as `waypoints`
     """
-    if not waypoints:
-        return [start_point]
+    as_set = isinstance(waypoints, WaypointSet)
 
-    # Create a complete graph
-    G = nx.Graph()
+    # Start point + waypoints, as arrays; the route is a permutation of them
+    all_points = WaypointSet.from_points([start_point]).concat(waypoints)
+    engine = solver_engine(len(all_points), has_time_windows(all_points[1:]))
+    if stats is not None:
+        stats['engine'] = engine
+    if len(all_points) == 1:
+        return all_points if as_set else all_points.to_points()
+
+    # Distances between all points (served by the persistent distance store when possible);
+    # large instances may get a tiled matrix computed on demand
+    with stage('matrix'):
+        if matrix_provider is not None:
+            matrix = matrix_provider(all_points)
+        elif engine == 'large':
+            matrix = build_distance_matrix(all_points)
+        else:
+            matrix = distance_matrix(all_points)
 
-    # Create a list of all points (start point + waypoints)
-    all_points = [start_point] + waypoints
+    # Time-dependent travel times, cached per time bucket (not for large instances: one dense matrix per bucket)
+    travel_model = None
+    if speed_profiles is not None and engine != 'large':
+        with stage('travel_times'):
+            travel_model = TravelTimeModel.for_points(speed_profiles, all_points, matrix, time_matrix_provider)
 
-    # Add nodes to the graph
-    for i, point in enumerate(all_points):
-        G.add_node(i, point=point)
+    # Stops with delivery windows are ordered by the time-window solver instead
+    if engine == 'time_windows':
+        route = optimize_with_time_windows(all_points, matrix, stats, time_matrix_provider, departure, travel_model)
+        return route if as_set else route.to_points()
 
-    # Add edges with distances as weights
-    for i in range(len(all_points)):
-        for j in range(i + 1, len(all_points)):
-            point_i = (all_points[i]['lat'], all_points[i]['lng'])
-            point_j = (all_points[j]['lat'], all_points[j]['lng'])
-            distance = calculate_distance(point_i, point_j)
-            G.add_edge(i, j, weight=distance)
+    order = large_instance_order(matrix) if engine == 'large' else tsp_order(matrix)
+    if travel_model is None:
+        route = all_points.take(order)
+    else:
+        # The distance-based order is the starting point of a search on the duration at this departure time
+        with stage('improve'):
+            improve_duration(order, travel_model, departure)
+        arrivals = travel_model.arrivals(order, departure)
+        if stats is not None:
+            stats['duration_min'] = arrivals[-1] - departure
+        route = all_points.take(order).with_attributes(arrival=arrivals)
+    return route if as_set else route.to_points()
+
+
+def large_instance_order(matrix, time_limit=LARGE_INSTANCE_TIME_LIMIT):
+    """
+    Open path starting at point 0 for instances too large for the NetworkX solver.
+
+    A nearest-neighbour construction reads one matrix row per step, so a
+    TiledDistanceMatrix is consumed row by row and never held in memory.
+    The path is then improved by 2-opt / relocate moves inside windows of
+    LARGE_INSTANCE_WINDOW consecutive positions, sweeping along the path
+    until `time_limit`.
+
+    Args:
+        matrix: (n, n) distances, ndarray or TiledDistanceMatrix
+        time_limit (float): Local search budget in seconds
+
+    Returns:
+        list: Point indices in visiting order, starting with 0
+    """
+    n = len(matrix)
+    with stage('solve'):
+        visited = np.zeros(n, dtype=bool)
+        visited[0] = True
+        order = [0]
+        current = 0
+        for _ in range(n - 1):
+            current = int(np.argmin(np.where(visited, np.inf, matrix[current])))
+            visited[current] = True
+            order.append(current)
+
+    with stage('improve'):
+        # Road matrices (one-way streets) are symmetrised, 2-opt reverses path segments
+        def dist(a, b):
+            return (matrix[a, b] + matrix[b, a]) / 2
+
+        sweep_windows(order, dist, LARGE_INSTANCE_WINDOW, time_limit)
+    return order
+
+
+def tsp_order(matrix):
+    """
+    Approximate open TSP path starting at point 0, with NetworkX.
+
+    Args:
+        matrix (ndarray): (n, n) distance matrix
+
+    Returns:
+        list: Point indices in visiting order, starting with 0
+    """
+    # Imported lazily so that worker startup does not pay for networkx
+    import networkx as nx
+
+    # Create a complete graph, one node per point index
+    n = len(matrix)
+    G = nx.Graph()
+    G.add_nodes_from(range(n))
+    # The solver works on an undirected graph: road matrices (one-way streets) are symmetrised
+    symmetric = (matrix + matrix.T) / 2
+    rows, cols = np.triu_indices(n, k=1)
+    G.add_weighted_edges_from(zip(rows.tolist(), cols.tolist(), symmetric[rows, cols].tolist()))
 
     # Find the approximate solution to the TSP
     # We need to ensure the start point (index 0) is the first node in the path
     # Since newer versions of NetworkX don't support 'source' parameter, we will handle this differently
-    tsp_path = nx.approximation.traveling_salesman_problem(G, cycle=False)
+    with stage('solve'):
+        tsp_path = nx.approximation.traveling_salesman_problem(G, cycle=False)
 
     # If the first element is not 0 (our start point), we need to reorder the path
     if tsp_path[0] != 0:
@@ -48,7 +219,4 @@ def optimize_route(start_point, waypoints):
         # Reorder the path to start from position 0
         tsp_path = tsp_path[start_pos:] + tsp_path[:start_pos]
 
-    # Convert node indices back to waypoints
-    optimized_route = [all_points[i] for i in tsp_path]
-
-    return optimized_route
+    return tsp_path
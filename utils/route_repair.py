@@ -0,0 +1,95 @@
+import numpy as np
+
+from utils.local_search import improve_path, path_length, sweep_windows
+
+# Bounds of the optional local search on a user-supplied order
+DEFAULT_PASSES = 3
+MAX_PASSES = 10
+DEFAULT_TIME_LIMIT = 2.0
+MAX_TIME_LIMIT = 10.0
+
+# Window of the search on matrices that are not held in memory (TiledDistanceMatrix)
+TILED_SEARCH_WINDOW = 30
+
+
+def order_legs(order, matrix):
+    """
+    Leg distances of a visiting order, read from a distance matrix.
+
+    Args:
+        order (list): Point indices in visiting order
+        matrix: (n, n) distances, possibly asymmetric, ndarray or TiledDistanceMatrix
+
+    Returns:
+        list: order[k] -> order[k + 1] distance for each leg
+    """
+    if not isinstance(matrix, np.ndarray):
+        return [matrix[a, b] for a, b in zip(order, order[1:])]
+    order = np.asarray(order)
+    return matrix[order[:-1], order[1:]].tolist()
+
+
+def moved_stops(points, original, repaired):
+    """
+    Stops whose position changed, as 1-based positions among the waypoints.
+
+    Args:
+        points (list): Start point followed by the waypoints in the supplied order
+        original (list): Supplied order (point indices, starting with 0)
+        repaired (list): Improved order
+
+    Returns:
+        list: Dictionaries with 'name', 'from' and 'to'
+    """
+    new_positions = {index: position for position, index in enumerate(repaired)}
+    return [
+        {'name': points[index]['name'], 'from': position, 'to': new_positions[index]}
+        for position, index in enumerate(original)
+        if position and new_positions[index] != position
+    ]
+
+
+def repair_order(points, matrix, max_passes=DEFAULT_PASSES, time_limit=DEFAULT_TIME_LIMIT):
+    """
+    Polishes a supplied order with a bounded 2-opt / relocate search.
+
+    The search starts from the supplied order (point 0 stays first) and
+    evaluates each move in O(1) on the symmetrised matrix, like the
+    optimizer; the result is kept only if it is also shorter on the
+    directed distances. A tiled matrix (great-circle, symmetric) is read
+    pair by pair and searched window by window along the path, like the
+    large-instance solver.
+
+    Args:
+        points (list): Start point followed by the waypoints in the supplied order
+        matrix: (n, n) distance matrix of `points`, ndarray or TiledDistanceMatrix
+        max_passes (int): Maximum number of improvement passes
+        time_limit (float): Search budget in seconds
+
+    Returns:
+        dict: 'order' (point indices), 'leg_distances', 'total_distance',
+            'gain' (km) and 'moved' (see moved_stops)
+    """
+    original = list(range(len(points)))
+    order = list(original)
+    if isinstance(matrix, np.ndarray):
+        symmetric = ((matrix + matrix.T) / 2.0).tolist()
+        improve_path(order, lambda a, b: symmetric[a][b], max_passes=max_passes, time_limit=time_limit)
+        rows = matrix.tolist()
+        directed = lambda a, b: rows[a][b]
+    else:
+        directed = lambda a, b: matrix[a, b]
+        sweep_windows(order, directed, TILED_SEARCH_WINDOW, time_limit, max_passes=max_passes)
+
+    before = path_length(original, directed)
+    after = path_length(order, directed)
+    if after >= before:
+        order, after = original, before
+
+    return {
+        'order': order,
+        'leg_distances': order_legs(order, matrix),
+        'total_distance': after,
+        'gain': before - after,
+        'moved': moved_stops(points, original, order),
+    }
@@ -0,0 +1,237 @@
+import fcntl
+import json
+import math
+import os
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+
+from utils.route_optimizer import LARGE_INSTANCE_TIME_LIMIT, TIME_WINDOWS_TIME_LIMIT
+from utils.route_repair import MAX_TIME_LIMIT as REPAIR_TIME_LIMIT
+
+# Jobs estimated to finish within this many seconds go to the fast lane, reserved for interactive
+# requests (a 60-stop solve, 50 stops on the road graph, a 1 000-stop edit)
+FAST_LANE_MAX_SECONDS = 0.25
+
+# Per-user slots are hashed into this many buckets, so the slot files stay bounded whatever
+# the number of users; users sharing a bucket share its slots
+USER_BUCKETS = 1024
+
+# Rough solver cost model (seconds), measured on random city-sized instances: the networkx
+# solver grows about cubically with the number of stops (200 stops: ~6 s)
+SECONDS_PER_STOP_CUBED = {'networkx': 8e-7}
+# The large-instance heuristic fills the matrix and scans one row per stop (quadratic), then runs
+# its local search for a fixed budget (20 000 stops: ~6 s of matrix, ~2 s of construction)
+# Repairing a supplied order (/evaluate_route) builds the matrix and its symmetrised
+# copy as Python lists (5 000 stops: ~5 s), then searches for a bounded time
+# The time-window solver inserts stops in quadratic time (1 000 stops: ~2.7 s, 2 000: ~13 s),
+# then runs its windowed local search for a bounded time
+SECONDS_PER_STOP_SQUARED = {'large': 2e-8, 'repair': 2e-7, 'time_windows': 3.3e-6}
+SEARCH_TIME_LIMITS = {'large': LARGE_INSTANCE_TIME_LIMIT, 'repair': REPAIR_TIME_LIMIT,
+                      'time_windows': TIME_WINDOWS_TIME_LIMIT}
+# Editing a saved route computes each added stop's distances to the route in one vectorised batch,
+# then searches a fixed-size neighbourhood (20 000 stops, 10 additions: ~0.8 s)
+SECONDS_PER_STOP = {'edit': 4e-5}
+SECONDS_PER_ROAD_STOP = 2e-3
+
+POLL_INTERVAL = 0.02
+
+
+class SchedulerBusy(Exception):
+    """
+    The job cannot be admitted now.
+
+    Attributes:
+        reason (str): 'user' (per-user cap reached), 'capacity' (lane full) or 'too_large'
+        retry_after (int): Seconds after which retrying makes sense, None for 'too_large'
+    """
+
+    def __init__(self, reason, retry_after=None):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def _setting(name, default):
+    try:
+        return type(default)(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def settings():
+    """
+    Scheduler limits, read from the environment.
+
+    SCHEDULER_FAST_SLOTS / SCHEDULER_BULK_SLOTS: concurrent jobs per lane
+    across all workers; SCHEDULER_USER_SLOTS: concurrent jobs per user;
+    SCHEDULER_USER_BUCKETS: number of per-user slot buckets;
+    SCHEDULER_FAST_MAX_SECONDS: longest estimated job admitted to the fast
+    lane; SCHEDULER_FAST_WAIT / SCHEDULER_BULK_WAIT: seconds a job may
+    queue for a slot; SCHEDULER_DEADLINE: jobs estimated to take longer
+    are refused.
+
+    Returns:
+        dict: Current settings
+    """
+    cpus = os.cpu_count() or 2
+    return {
+        'fast_slots': _setting('SCHEDULER_FAST_SLOTS', cpus),
+        'bulk_slots': _setting('SCHEDULER_BULK_SLOTS', max(1, cpus // 2)),
+        'user_slots': _setting('SCHEDULER_USER_SLOTS', 2),
+        'user_buckets': max(1, _setting('SCHEDULER_USER_BUCKETS', USER_BUCKETS)),
+        'fast_max_seconds': _setting('SCHEDULER_FAST_MAX_SECONDS', FAST_LANE_MAX_SECONDS),
+        'fast_wait': _setting('SCHEDULER_FAST_WAIT', 2.0),
+        'bulk_wait': _setting('SCHEDULER_BULK_WAIT', 0.5),
+        'deadline': _setting('SCHEDULER_DEADLINE', 120.0),
+    }
+
+
+def _directory():
+    path = os.environ.get('SCHEDULER_DIR', os.path.join(tempfile.gettempdir(), 'gpspathfinder_scheduler'))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def estimate_seconds(stops, engine='networkx', road_network=False):
+    """
+    Estimated solve time of a job, used for lane choice, admission and Retry-After.
+
+    Args:
+        stops (int): Number of points including the start
+        engine (str): 'networkx', 'time_windows' or 'large' (see route_optimizer.solver_engine),
+            'repair' for the local search on a supplied order, 'edit' for a saved route edit
+        road_network (bool): True if distances come from the road graph
+
+    Returns:
+        float: Seconds
+    """
+    if engine in SECONDS_PER_STOP:
+        seconds = stops * SECONDS_PER_STOP[engine]
+    elif engine in SECONDS_PER_STOP_SQUARED:
+        seconds = stops ** 2 * SECONDS_PER_STOP_SQUARED[engine] + SEARCH_TIME_LIMITS[engine]
+    else:
+        seconds = stops ** 3 * SECONDS_PER_STOP_CUBED.get(engine, SECONDS_PER_STOP_CUBED['networkx'])
+    if road_network:
+        seconds += stops * SECONDS_PER_ROAD_STOP
+    return seconds
+
+
+def _try_lock(path):
+    """Opens and locks a slot file without blocking; returns the descriptor or None"""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _acquire(paths, job):
+    """Locks the first free slot among `paths` and records the job in it"""
+    for path in paths:
+        fd = _try_lock(path)
+        if fd is not None:
+            os.ftruncate(fd, 0)
+            os.pwrite(fd, json.dumps(job).encode(), 0)
+            return fd
+    return None
+
+
+def _release(fd):
+    os.ftruncate(fd, 0)
+    fcntl.flock(fd, fcntl.LOCK_UN)
+    os.close(fd)
+
+
+def _retry_after(paths, now):
+    """Seconds until the earliest running job among `paths` is expected to finish"""
+    remaining = []
+    for path in paths:
+        try:
+            with open(path) as handle:
+                job = json.loads(handle.read() or 'null')
+        except (OSError, ValueError):
+            continue
+        if job:
+            remaining.append(job['started'] + job['estimate'] - now)
+    return max(1, math.ceil(min(remaining, default=1)))
+
+
+def _slots(prefix, count):
+    directory = _directory()
+    return [os.path.join(directory, f'{prefix}-{index}.slot') for index in range(count)]
+
+
+def _user_bucket(user_id, buckets):
+    """Bucket of a user's slots, stable across worker processes (unlike hash())"""
+    return zlib.crc32(str(user_id).encode()) % buckets
+
+
+@contextmanager
+def solver_slot(user_id, stops, engine='networkx', road_network=False):
+    """
+    Admits a solver job, holding a per-user slot and a lane slot while it runs.
+
+    Slots are lock files shared by every worker process, so the limits hold
+    for the whole deployment on one host; a crashed worker releases its
+    slots with its file descriptors. Jobs with a short estimated duration
+    use the fast lane and may overflow to the bulk lane; long jobs only
+    ever use the bulk lane, so they cannot starve interactive requests. A job waits for a lane slot at
+    most the lane's queue time, bounded by the deadline left after its
+    estimated duration.
+
+    Args:
+        user_id: Owner of the job
+        stops (int): Number of points including the start
+        engine (str): Expected solver engine
+        road_network (bool): True if distances come from the road graph
+
+    Yields:
+        str: The lane the job runs in ('fast' or 'bulk')
+
+    Raises:
+        SchedulerBusy: If the job is refused
+    """
+    config = settings()
+    estimate = estimate_seconds(stops, engine, road_network)
+    if estimate > config['deadline']:
+        raise SchedulerBusy('too_large')
+
+    fast = estimate <= config['fast_max_seconds']
+    lanes = ([('fast', _slots('fast', config['fast_slots']))] if fast else []) + \
+        [('bulk', _slots('bulk', config['bulk_slots']))]
+    wait = min(config['fast_wait'] if fast else config['bulk_wait'], config['deadline'] - estimate)
+    job = {'user_id': user_id, 'stops': stops, 'engine': engine, 'started': time.time(), 'estimate': estimate}
+
+    bucket = _user_bucket(user_id, config['user_buckets'])
+    user_paths = _slots(f'user-{bucket}', config['user_slots'])
+    user_fd = _acquire(user_paths, job)
+    if user_fd is None:
+        raise SchedulerBusy('user', _retry_after(user_paths, time.time()))
+
+    lane_fd = None
+    try:
+        give_up = time.monotonic() + max(wait, 0.0)
+        while True:
+            for lane, paths in lanes:
+                job['started'] = time.time()
+                lane_fd = _acquire(paths, job)
+                if lane_fd is not None:
+                    break
+            if lane_fd is not None or time.monotonic() >= give_up:
+                break
+            time.sleep(POLL_INTERVAL)
+        if lane_fd is None:
+            raise SchedulerBusy('capacity', _retry_after([path for _, paths in lanes for path in paths], time.time()))
+
+        # Record the actual start time on the user slot too, for Retry-After
+        os.ftruncate(user_fd, 0)
+        os.pwrite(user_fd, json.dumps(job).encode(), 0)
+        yield lane
+    finally:
+        if lane_fd is not None:
+            _release(lane_fd)
+        _release(user_fd)
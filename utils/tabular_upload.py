@@ -0,0 +1,48 @@
+import os
+import tempfile
+
+from werkzeug.utils import secure_filename
+
+# File extensions accepted for spreadsheet uploads
+ALLOWED_EXTENSIONS = {'xlsx', 'xls', 'csv'}
+
+
+def allowed_file(filename):
+    """
+    Checks whether the uploaded file has a supported extension.
+
+    Args:
+        filename (str): Uploaded file name
+
+    Returns:
+        bool: True if the extension is .xlsx, .xls or .csv
+    """
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+def read_uploaded_table(file):
+    """
+    Reads an uploaded CSV or Excel file into a DataFrame.
+
+    The upload is written to a temporary file, parsed with pandas and removed.
+
+    Args:
+        file (FileStorage): Uploaded file from request.files
+
+    Returns:
+        DataFrame: File contents, one row per record
+    """
+    # Imported lazily so that worker startup does not pay for pandas
+    import pandas as pd
+
+    filename = secure_filename(file.filename)
+    fd, filepath = tempfile.mkstemp(suffix='_' + filename)
+    os.close(fd)
+    try:
+        file.save(filepath)
+        if filename.lower().endswith('.csv'):
+            return pd.read_csv(filepath)
+        return pd.read_excel(filepath)
+    finally:
+        if os.path.exists(filepath):
+            os.remove(filepath)
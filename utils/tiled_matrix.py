@@ -0,0 +1,164 @@
+import os
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.geo_utils import EARTH_RADIUS_KM, distances_km
+from utils.waypoints import coordinate_arrays
+
+# Distances computed per vectorised call while filling a tile, to bound float64 temporaries
+FILL_CHUNK = 1 << 20
+
+
+def _setting(name, default):
+    try:
+        return type(default)(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def matrix_settings():
+    """
+    Distance matrix storage limits, read from the environment.
+
+    DISTANCE_MATRIX_MEMORY_MB: largest matrix kept dense in memory, larger
+    ones are tiled on disk; DISTANCE_MATRIX_DTYPE: 'float64' or 'float32'
+    for dense matrices (tiles are always float32); DISTANCE_TILE_MB: size
+    of a row block; DISTANCE_TILE_CACHE: tiles kept in memory;
+    DISTANCE_SCRATCH_DIR: directory of the scratch files.
+
+    Returns:
+        dict: Current settings
+    """
+    dtype = os.environ.get('DISTANCE_MATRIX_DTYPE', 'float64')
+    return {
+        'memory_mb': _setting('DISTANCE_MATRIX_MEMORY_MB', 256.0),
+        'dtype': np.dtype(dtype if dtype in ('float32', 'float64') else 'float64'),
+        'tile_mb': _setting('DISTANCE_TILE_MB', 16.0),
+        'cache_tiles': _setting('DISTANCE_TILE_CACHE', 8),
+        'scratch_dir': os.environ.get('DISTANCE_SCRATCH_DIR') or tempfile.gettempdir(),
+    }
+
+
+class TiledDistanceMatrix:
+    """
+    (n, n) great-circle distance matrix stored as float32 row blocks in a scratch file.
+
+    A tile (block of consecutive rows) is computed on first access and
+    written to a memory-mapped file, so the matrix can exceed RAM; at most
+    `cache_tiles` tiles are kept in memory, least recently used first out.
+    The scratch file is unlinked as soon as it is mapped, so it disappears
+    with the object even if the process dies.
+
+    Tiles use the haversine tier by default (0.56 % worst case, within
+    geo_utils.SEARCH_TOLERANCE), computed as chords between unit vectors:
+    a row block is then one matrix product instead of several
+    trigonometric functions per pair.
+
+    Supports matrix[i] (row i), matrix[i, j] and len(matrix).
+    """
+
+    dtype = np.dtype(np.float32)
+
+    def __init__(self, points, precision=None, tile_rows=None, cache_tiles=None, scratch_dir=None):
+        config = matrix_settings()
+        self.lats, self.lngs = (np.array(values, dtype=np.float64) for values in coordinate_arrays(points))
+        self.n = len(self.lats)
+        self.precision = precision or 'haversine'
+        lat, lng = np.radians(self.lats), np.radians(self.lngs)
+        self._vectors = np.column_stack([np.cos(lat) * np.cos(lng), np.cos(lat) * np.sin(lng), np.sin(lat)])
+        row_bytes = max(1, self.n) * self.dtype.itemsize
+        self.tile_rows = tile_rows or max(1, int(config['tile_mb'] * 1024 * 1024 // row_bytes))
+        self.tile_count = -(-self.n // self.tile_rows)
+        self.cache_tiles = max(1, cache_tiles or config['cache_tiles'])
+        self.computed = np.zeros(self.tile_count, dtype=bool)
+        self.tiles_computed = 0
+        self._cache = OrderedDict()
+
+        with tempfile.NamedTemporaryFile(dir=scratch_dir or config['scratch_dir'], prefix='gpspathfinder_matrix_',
+                                         suffix='.bin', delete=False) as scratch:
+            path = scratch.name
+        try:
+            self._storage = np.memmap(path, dtype=self.dtype, mode='w+', shape=(max(1, self.n), max(1, self.n)))
+        finally:
+            os.unlink(path)
+
+    @property
+    def shape(self):
+        return self.n, self.n
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            i, j = int(key[0]), int(key[1])
+            if self.computed[i // self.tile_rows]:
+                # Already computed: read through the mapping without loading the whole tile
+                return float(self._storage[i, j])
+            return float(self.row(i)[j])
+        return self.row(key)
+
+    def row(self, i):
+        """Row i (distances from point i, km), read-only"""
+        tile, offset = divmod(int(i), self.tile_rows)
+        block = self._cache.get(tile)
+        if block is None and self.computed[tile]:
+            # Random row access: read the row through the mapping rather than reloading the whole tile
+            return np.array(self._storage[int(i)])
+        return self.tile(tile)[offset]
+
+    def tile(self, tile):
+        """
+        Rows tile * tile_rows onwards, computed and stored on first access.
+
+        Args:
+            tile (int): Tile number
+
+        Returns:
+            ndarray: (rows, n) float32 block, read-only
+        """
+        block = self._cache.get(tile)
+        if block is not None:
+            self._cache.move_to_end(tile)
+            return block
+
+        first = tile * self.tile_rows
+        last = min(first + self.tile_rows, self.n)
+        if not self.computed[tile]:
+            self._fill(first, last)
+            self.computed[tile] = True
+            self.tiles_computed += 1
+        block = np.array(self._storage[first:last])
+        block.flags.writeable = False
+
+        self._cache[tile] = block
+        if len(self._cache) > self.cache_tiles:
+            self._cache.popitem(last=False)
+        return block
+
+    def _fill(self, first, last):
+        rows_per_chunk = max(1, FILL_CHUNK // max(1, self.n))
+        for start in range(first, last, rows_per_chunk):
+            stop = min(start + rows_per_chunk, last)
+            if self.precision == 'haversine':
+                # Great-circle distance from the chord: |u - v| = sqrt(2 - 2 u.v)
+                chords = np.sqrt(np.maximum(2.0 - 2.0 * (self._vectors[start:stop] @ self._vectors.T), 0.0))
+                block = 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(chords / 2, 1.0))
+            else:
+                block = distances_km(self.lats[start:stop, None], self.lngs[start:stop, None],
+                                     self.lats[None, :], self.lngs[None, :], self.precision)
+            block[np.arange(stop - start), np.arange(start, stop)] = 0.0
+            self._storage[start:stop] = block
+
+    def close(self):
+        """Releases the mapping and the cached tiles"""
+        self._cache.clear()
+        self._storage = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,360 @@
+import math
+from datetime import datetime, time
+from time import monotonic
+
+from utils.local_search import relocate_move_delta, two_opt_move_delta
+
+# Average speed used to derive travel times from distances when no travel-time matrix is available
+DEFAULT_SPEED_KMH = 40.0
+
+# Bounds of a stop without a time window (minutes since midnight)
+OPEN_WINDOW = (-1e9, 1e9)
+
+EPSILON = 1e-6
+
+# Local search bounds: moves span at most SEARCH_WINDOW positions, and the search stops
+# after SEARCH_PASSES passes without reaching a local optimum or after its time budget
+SEARCH_WINDOW = 100
+SEARCH_PASSES = 10
+SEARCH_TIME_LIMIT = 5.0
+
+
+def parse_clock(value):
+    """
+    Converts a time of day to minutes since midnight.
+
+    Accepts "HH:MM" strings, datetime/time objects (e.g. Excel time cells)
+    and plain numbers of minutes.
+
+    Args:
+        value: Time of day, or None / empty / NaN
+
+    Returns:
+        float: Minutes since midnight, or None
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        value = value.time()
+    if isinstance(value, time):
+        return value.hour * 60 + value.minute + value.second / 60
+    if isinstance(value, (int, float)):
+        return None if math.isnan(value) else float(value)
+    text = str(value).strip()
+    try:
+        if ':' in text:
+            hours, minutes = text.split(':')[:2]
+            return int(hours) * 60 + float(minutes)
+        return float(text)
+    except ValueError:
+        return None
+
+
+def format_clock(minutes):
+    """
+    Formats minutes since midnight as "HH:MM".
+
+    Args:
+        minutes (float): Minutes since midnight
+
+    Returns:
+        str: Time of day (hours may exceed 23 for the next day)
+    """
+    total = int(round(minutes))
+    return f'{total // 60:02d}:{total % 60:02d}'
+
+
+def parse_duration(value):
+    """Service duration in minutes, or None if missing or invalid"""
+    try:
+        duration = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(duration) or duration < 0 else duration
+
+
+def has_time_windows(points):
+    """True if any point carries a window bound or a service duration"""
+    if hasattr(points, 'has_attributes'):
+        return points.has_attributes('tw_start', 'tw_end', 'service_min')
+    return any(point.get(key) not in (None, '') for point in points for key in ('tw_start', 'tw_end', 'service_min'))
+
+
+def window_columns(points):
+    """
+    (tw_start, tw_end, service_min) of each point, None when missing.
+
+    A WaypointSet is read from its attribute arrays (minutes, NaN when
+    missing) rather than through point dicts.
+    """
+    keys = ('tw_start', 'tw_end', 'service_min')
+    if hasattr(points, 'attributes'):
+        columns = [points.attributes[key].tolist() if key in points.attributes else [None] * len(points)
+                   for key in keys]
+        return zip(*columns)
+    return ((point.get('tw_start'), point.get('tw_end'), point.get('service_min')) for point in points)
+
+
+def merge(a, b, travel):
+    """
+    Concatenates two route segments in O(1).
+
+    A segment is (first node, last node, duration, time warp, earliest
+    start, latest start): the minimal duration of the segment including
+    waiting, the unavoidable lateness, and the window of service start
+    times at its first node that achieve them. Prefix segments carry the
+    forward slack of a route, suffix segments its backward slack.
+
+    Args:
+        a (tuple): Segment visited first
+        b (tuple): Segment visited next
+        travel (list): Travel time rows, travel[i][j] in minutes
+
+    Returns:
+        tuple: The concatenated segment
+    """
+    first_a, last_a, duration_a, warp_a, earliest_a, latest_a = a
+    first_b, last_b, duration_b, warp_b, earliest_b, latest_b = b
+    link = travel[last_a][first_b]
+    delta = duration_a - warp_a + link
+    wait = max(earliest_b - delta - latest_a, 0.0)
+    warp = max(earliest_a + delta - latest_b, 0.0)
+    return (first_a, last_b, duration_a + duration_b + link + wait, warp_a + warp_b + warp,
+            max(earliest_b - delta, earliest_a) - wait, min(latest_b - delta, latest_a) + warp)
+
+
+class TimeWindowProblem:
+    """
+    Open route from a fixed start with time windows and service durations.
+
+    Index 0 is the start point, left at `departure`. Distances are the
+    objective; windows are hard constraints measured as time warp (total
+    lateness), which is zero for feasible routes.
+    """
+
+    def __init__(self, points, distances, travel_minutes, departure):
+        self.points = points
+        self.distances = distances.tolist() if hasattr(distances, 'tolist') else distances
+        self.travel = travel_minutes.tolist() if hasattr(travel_minutes, 'tolist') else travel_minutes
+        self.departure = departure
+
+        self.windows = []
+        self.services = []
+        for index, (start, end, service) in enumerate(window_columns(points)):
+            if index == 0:
+                self.windows.append((departure, departure))
+                self.services.append(0.0)
+                continue
+            start = parse_clock(start)
+            end = parse_clock(end)
+            self.windows.append((OPEN_WINDOW[0] if start is None else start, OPEN_WINDOW[1] if end is None else end))
+            self.services.append(parse_duration(service) or 0.0)
+        self.singles = [
+            (i, i, self.services[i], 0.0, self.windows[i][0], self.windows[i][1]) for i in range(len(points))
+        ]
+
+    def dist(self, a, b):
+        return self.distances[a][b]
+
+    def prefixes(self, order):
+        segments = [self.singles[order[0]]]
+        for node in order[1:]:
+            segments.append(merge(segments[-1], self.singles[node], self.travel))
+        return segments
+
+    def suffixes(self, order):
+        segments = [self.singles[order[-1]]]
+        for node in reversed(order[:-1]):
+            segments.append(merge(self.singles[node], segments[-1], self.travel))
+        segments.reverse()
+        return segments
+
+    def update_segments(self, order, prefixes, suffixes, first, last):
+        """Re-merges, in place, the prefixes from position `first` and the suffixes up to `last` after a move"""
+        n = len(order)
+        for k in range(max(first, 1), n):
+            prefixes[k] = merge(prefixes[k - 1], self.singles[order[k]], self.travel)
+        if last >= n - 1:
+            suffixes[n - 1] = self.singles[order[n - 1]]
+            last = n - 2
+        for k in range(last, -1, -1):
+            suffixes[k] = merge(self.singles[order[k]], suffixes[k + 1], self.travel)
+
+    def join(self, *segments):
+        result = segments[0]
+        for segment in segments[1:]:
+            result = merge(result, segment, self.travel)
+        return result
+
+    def schedule(self, order):
+        """
+        Simulates the route: arrival, service start and lateness at each stop.
+
+        Args:
+            order (list): Point indices in visiting order (starting with 0)
+
+        Returns:
+            list: Dictionaries with 'arrival', 'start', 'departure' (minutes) and 'late' (bool)
+        """
+        stops = []
+        clock = self.departure
+        previous = None
+        for node in order:
+            arrival = clock if previous is None else clock + self.travel[previous][node]
+            earliest, latest = self.windows[node]
+            start = max(arrival, earliest)
+            clock = start + self.services[node]
+            stops.append({'arrival': arrival, 'start': start, 'departure': clock, 'late': start > latest + EPSILON})
+            previous = node
+        return stops
+
+
+def _accept(new_warp, current_warp, delta):
+    """Moves must reduce lateness, or keep it and shorten the route"""
+    if new_warp < current_warp - EPSILON:
+        return True
+    return new_warp <= current_warp + EPSILON and delta < -EPSILON
+
+
+def insert_stops(problem):
+    """
+    Builds an initial route by cheapest feasible insertion, most urgent stops first.
+
+    Each candidate position is checked in O(1) by joining the prefix before
+    it, the stop and the suffix after it. When no position is feasible the
+    stop goes where it causes the least lateness.
+
+    Returns:
+        list: Point indices in visiting order
+    """
+    order = [0]
+    pending = sorted(range(1, len(problem.points)), key=lambda i: (problem.windows[i][1], problem.windows[i][0]))
+    for node in pending:
+        prefixes, suffixes = problem.prefixes(order), problem.suffixes(order)
+        best_key, best_position = None, len(order)
+        for position in range(1, len(order) + 1):
+            before = order[position - 1]
+            if position < len(order):
+                after = order[position]
+                segment = problem.join(prefixes[position - 1], problem.singles[node], suffixes[position])
+                added = problem.dist(before, node) + problem.dist(node, after) - problem.dist(before, after)
+            else:
+                segment = problem.join(prefixes[position - 1], problem.singles[node])
+                added = problem.dist(before, node)
+            key = (segment[3] if segment[3] > EPSILON else 0.0, added)
+            if best_key is None or key < best_key:
+                best_key, best_position = key, position
+        order.insert(best_position, node)
+    return order
+
+
+def _first_move(order, problem, prefixes, suffixes, i, window):
+    """First improving 2-opt or relocate move starting at position i, spanning at most `window` positions"""
+    n = len(order)
+    singles, travel, dist = problem.singles, problem.travel, problem.dist
+    current_warp = prefixes[-1][3]
+
+    # 2-opt: reversed(order[i..j]) = order[j] followed by reversed(order[i..j-1])
+    reversed_segment = singles[order[i]]
+    reversal = 0.0
+    for j in range(i + 1, min(n, i + window + 1)):
+        reversed_segment = merge(singles[order[j]], reversed_segment, travel)
+        # Inner legs are travelled the other way round
+        reversal += dist(order[j], order[j - 1]) - dist(order[j - 1], order[j])
+        delta = two_opt_move_delta(order, i, j, dist) + reversal
+        segment = merge(prefixes[i - 1], reversed_segment, travel)
+        if j + 1 < n:
+            segment = merge(segment, suffixes[j + 1], travel)
+        if _accept(segment[3], current_warp, delta):
+            return '2opt', i, j
+
+    # Relocate: the moved stop is joined with the stops it jumps over
+    moved = singles[order[i]]
+    after = suffixes[i + 1] if i + 1 < n else None
+    middle = None
+    for j in range(i - 1, max(0, i - window - 1), -1):
+        middle = singles[order[j]] if middle is None else merge(singles[order[j]], middle, travel)
+        segment = problem.join(prefixes[j - 1], moved, middle, *([after] if after else []))
+        if _accept(segment[3], current_warp, relocate_move_delta(order, i, j, dist)):
+            return 'relocate', i, j
+    middle = None
+    for j in range(i + 1, min(n, i + window + 1)):
+        middle = singles[order[j]] if middle is None else merge(middle, singles[order[j]], travel)
+        segment = problem.join(prefixes[i - 1], middle, moved, *([suffixes[j + 1]] if j + 1 < n else []))
+        if _accept(segment[3], current_warp, relocate_move_delta(order, i, j, dist)):
+            return 'relocate', i, j
+    return None
+
+
+def improve_with_time_windows(order, problem, window=SEARCH_WINDOW, max_passes=SEARCH_PASSES,
+                              time_limit=SEARCH_TIME_LIMIT):
+    """
+    2-opt and relocate local search under time windows.
+
+    Distance deltas come from utils.local_search; a 2-opt move also pays
+    for reversing the direction of its inner legs, accumulated as the move
+    widens, since road distances are asymmetric. Feasibility is checked in
+    O(1) per move by joining precomputed prefix/suffix segments with the
+    middle segment, which is grown one stop at a time as the move widens.
+
+    Like local_search.improve_path, each pass walks the route once and
+    tries moves spanning at most `window` positions from each stop; an
+    improving move is applied at once, only the segments it changes are
+    merged again, and the pass goes on from there. A pass thus costs
+    O(n * window) checks.
+
+    Args:
+        order (list): Point indices in visiting order, modified in place
+        problem (TimeWindowProblem): Problem data
+        window (int): Largest span of a move, in positions
+        max_passes (int): Maximum number of improvement passes
+        time_limit (float): Search budget in seconds, None for no limit
+
+    Returns:
+        list: The improved order
+    """
+    n = len(order)
+    if n < 3:
+        return order
+    prefixes, suffixes = problem.prefixes(order), problem.suffixes(order)
+    deadline = None if time_limit is None else monotonic() + time_limit
+
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n):
+            if deadline is not None and monotonic() > deadline:
+                return order
+            move = _first_move(order, problem, prefixes, suffixes, i, window)
+            if move is None:
+                continue
+            kind, _, j = move
+            if kind == '2opt':
+                order[i:j + 1] = reversed(order[i:j + 1])
+            else:
+                order.insert(j, order.pop(i))
+            problem.update_segments(order, prefixes, suffixes, min(i, j), max(i, j))
+            improved = True
+        if not improved:
+            break
+    return order
+
+
+def solve_time_windows(points, distances, travel_minutes, departure, time_limit=SEARCH_TIME_LIMIT):
+    """
+    Orders stops to respect their time windows while keeping the route short.
+
+    Args:
+        points (list): Start point followed by the stops; stops may carry
+            'tw_start', 'tw_end' ("HH:MM") and 'service_min'
+        distances (ndarray): (n, n) distances in km
+        travel_minutes (ndarray): (n, n) travel times in minutes
+        departure (float): Departure time from the start point (minutes since midnight)
+        time_limit (float): Local search budget in seconds
+
+    Returns:
+        tuple: (order, schedule) as returned by TimeWindowProblem.schedule
+    """
+    problem = TimeWindowProblem(points, distances, travel_minutes, departure)
+    order = insert_stops(problem)
+    improve_with_time_windows(order, problem, time_limit=time_limit)
+    return order, problem.schedule(order)
@@ -0,0 +1,111 @@
+import heapq
+import math
+
+
+def split_tour(legs, depot_km=None, max_km=None, max_stops=None):
+    """
+    Optimal cut points of an ordered tour into days (Prins / Vidal "split").
+
+    Stops 1..n are visited in the given order. With `depot_km`, every day
+    starts again from the start point (index 0); without it, a day starts
+    where the previous one ended. The split minimises the number of days,
+    then the total distance (with a common start, an extra day can be
+    shorter than driving on), subject to at most `max_km` and `max_stops`
+    per day.
+
+    The DP is V[j] = P[j] + min over feasible i of (V[i] + g(i)), where P
+    holds the cumulative tour distance and g(i) the cost of starting a day
+    after stop i, labels being compared on (days, distance). Feasibility
+    is g(i) <= max_km - P[j]; the right-hand side only decreases with j and
+    the stop window only slides forward, so a predecessor that becomes
+    infeasible never comes back. Candidates are
+    kept in a heap with lazy deletion: O(n log n) overall.
+
+    Args:
+        legs (list): legs[k] is the distance (km) from point k to point k + 1,
+            point 0 being the start
+        depot_km (list): Optional distance from the start point to each point
+            (depot_km[0] = 0); days then all leave from the start point
+        max_km (float): Maximum distance per day, None for no limit
+        max_stops (int): Maximum number of stops per day, None for no limit
+
+    Returns:
+        list: (first stop, last stop) index pairs, one per day
+
+    Raises:
+        ValueError: If a single stop cannot fit in one day
+    """
+    n = len(legs)
+    if n == 0:
+        return []
+    max_km = math.inf if max_km is None else max_km
+    max_stops = n if max_stops is None else max_stops
+    if max_stops < 1:
+        raise ValueError('Le nombre maximal de points par jour doit être au moins 1')
+
+    prefix = [0.0]
+    for leg in legs:
+        prefix.append(prefix[-1] + leg)
+
+    def start_cost(i):
+        # Cost of a day that starts after stop i, relative to prefix
+        if depot_km is None:
+            return -prefix[i]
+        return depot_km[i + 1] - prefix[i + 1]
+
+    labels = [(0.0, 0)] + [None] * n
+    predecessors = [0] * (n + 1)
+    heap = []
+    for j in range(1, n + 1):
+        i = j - 1
+        if labels[i] is not None:
+            cost = start_cost(i)
+            heapq.heappush(heap, (labels[i][1], labels[i][0] + cost, cost, i))
+
+        limit = max_km - prefix[j]
+        while heap and (heap[0][3] < j - max_stops or heap[0][2] > limit + 1e-9):
+            heapq.heappop(heap)
+        if heap:
+            days, value, _, i = heap[0]
+            labels[j] = (prefix[j] + value, days + 1)
+            predecessors[j] = i
+
+    if labels[n] is None:
+        raise ValueError('Impossible de respecter ces limites : un point seul dépasse la distance maximale par jour')
+
+    days = []
+    j = n
+    while j > 0:
+        i = predecessors[j]
+        days.append((i + 1, j))
+        j = i
+    days.reverse()
+    return days
+
+
+def split_route(route, legs, depot_km=None, max_km=None, max_stops=None):
+    """
+    Splits an optimized route into one sub-route per day.
+
+    Args:
+        route (list): Start point followed by the stops, in visiting order
+        legs (list): Distance (km) of each leg of the route
+        depot_km (list): Distance from the start point to each point of the
+            route; when given, each day leaves from the start point
+        max_km (float): Maximum distance per day
+        max_stops (int): Maximum number of stops per day
+
+    Returns:
+        list: Dictionaries with 'points' (first point is where the day starts),
+            'legs' and 'total_distance'
+    """
+    sub_routes = []
+    for first, last in split_tour(legs, depot_km, max_km, max_stops):
+        if depot_km is not None:
+            points = [route[0]] + route[first:last + 1]
+            day_legs = [depot_km[first]] + list(legs[first:last])
+        else:
+            points = route[first - 1:last + 1]
+            day_legs = list(legs[first - 1:last])
+        sub_routes.append({'points': points, 'legs': day_legs, 'total_distance': sum(day_legs)})
+    return sub_routes
@@ -0,0 +1,322 @@
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.time_windows import DEFAULT_SPEED_KMH, parse_clock
+from utils.waypoints import coordinate_arrays
+
+MINUTES_PER_DAY = 24 * 60
+DEFAULT_BUCKET_MINUTES = 30
+
+# Travel-time matrices kept per problem, one per time bucket
+MATRIX_CACHE_BUCKETS = 16
+
+# Local search minimising the route duration: moves span at most DURATION_SEARCH_WINDOW positions
+DURATION_SEARCH_WINDOW = 20
+DURATION_SEARCH_PASSES = 3
+DURATION_SEARCH_TIME_LIMIT = 2.0
+
+EPSILON = 1e-6
+
+
+def parse_profile(profile):
+    """
+    Reads a speed profile: {"HH:MM": factor, ...}, each factor applying until the next time.
+
+    Before the first time of the day, the last factor of the previous day applies.
+
+    Args:
+        profile (dict): Time of day -> speed factor (1.0 = free-flow speed)
+
+    Returns:
+        tuple: (start minutes, factors) as sorted arrays
+
+    Raises:
+        ValueError: If a time or a factor is invalid
+    """
+    steps = []
+    for clock, factor in profile.items():
+        start = parse_clock(clock)
+        if start is None or not 0 <= start < MINUTES_PER_DAY:
+            raise ValueError(f'Heure invalide dans un profil de vitesse : {clock}')
+        if not isinstance(factor, (int, float)) or factor <= 0:
+            raise ValueError(f'Facteur de vitesse invalide à {clock} : {factor}')
+        steps.append((start, float(factor)))
+    if not steps:
+        raise ValueError('Profil de vitesse vide')
+    steps.sort()
+    return np.array([start for start, _ in steps]), np.array([factor for _, factor in steps])
+
+
+def profile_factor(profile, minutes):
+    """Speed factor of a parsed profile at a time (minutes since midnight, any day)"""
+    starts, factors = profile
+    # Index -1 (before the first step) wraps to the last factor of the previous day
+    return factors[np.searchsorted(starts, minutes % MINUTES_PER_DAY, side='right') - 1]
+
+
+class SpeedProfiles:
+    """
+    Time-of-day speed factors per road class and per zone.
+
+    The road graph keeps travel times, not road classes, so the class of a
+    pair of points is read from its free-flow average speed: a pair belongs
+    to the first class (fastest first) whose `min_speed_kmh` it reaches.
+    Zones are bounding boxes with their own profile; the zone factor of a
+    pair is the mean of its two points' factors (1.0 outside every zone).
+    Travel time in a bucket is the free-flow time divided by the product of
+    the class and zone factors at the middle of the bucket.
+
+    Config file (JSON):
+        {"bucket_minutes": 30,
+         "classes": [{"name": "rapide", "min_speed_kmh": 60, "profile": {"00:00": 1.0, "07:00": 0.7}},
+                     {"name": "urbain", "min_speed_kmh": 0, "profile": {...}}],
+         "zones": [{"name": "centre", "bbox": [lat_min, lng_min, lat_max, lng_max], "profile": {...}}]}
+    """
+
+    def __init__(self, classes, zones=(), bucket_minutes=DEFAULT_BUCKET_MINUTES):
+        if bucket_minutes <= 0:
+            raise ValueError('La durée des tranches horaires doit être positive')
+        # Sorted by threshold, so that searchsorted finds the fastest class a pair reaches
+        self.classes = sorted(classes, key=lambda item: item[1])
+        self.zones = list(zones)
+        self.bucket_minutes = float(bucket_minutes)
+
+    @classmethod
+    def from_dict(cls, config):
+        """
+        Builds profiles from a parsed config (see the class docstring).
+
+        Raises:
+            ValueError: If the config is invalid
+        """
+        try:
+            classes = [
+                (item.get('name', ''), float(item.get('min_speed_kmh', 0)), parse_profile(item['profile']))
+                for item in config.get('classes') or []
+            ]
+            zones = []
+            for item in config.get('zones') or []:
+                lat_min, lng_min, lat_max, lng_max = (float(value) for value in item['bbox'])
+                zones.append((item.get('name', ''), (lat_min, lng_min, lat_max, lng_max), parse_profile(item['profile'])))
+            bucket_minutes = float(config.get('bucket_minutes', DEFAULT_BUCKET_MINUTES))
+        except (AttributeError, KeyError, TypeError) as e:
+            raise ValueError(f'Configuration des profils de vitesse invalide : {e}')
+        if not classes:
+            classes = [('', 0.0, parse_profile({'00:00': 1.0}))]
+        return cls(classes, zones, bucket_minutes)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def bucket(self, minutes):
+        """Time bucket of a time (minutes since midnight of the departure day)"""
+        return int(minutes // self.bucket_minutes)
+
+    def factors(self, bucket, lats, lngs, free_speed_kmh):
+        """
+        Speed factor of each pair of points during a bucket.
+
+        Args:
+            bucket (int): Time bucket
+            lats, lngs (array): Coordinates of the points
+            free_speed_kmh (ndarray): (n, n) free-flow average speeds
+
+        Returns:
+            ndarray: (n, n) factors
+        """
+        middle = (bucket + 0.5) * self.bucket_minutes
+        thresholds = np.array([min_speed for _, min_speed, _ in self.classes])
+        class_factors = np.array([profile_factor(profile, middle) for _, _, profile in self.classes])
+        classes = np.maximum(np.searchsorted(thresholds, free_speed_kmh, side='right') - 1, 0)
+        pair_factors = class_factors[classes]
+
+        if self.zones:
+            point_factors = np.ones(len(lats))
+            assigned = np.zeros(len(lats), dtype=bool)
+            for _, (lat_min, lng_min, lat_max, lng_max), profile in self.zones:
+                inside = ~assigned & (lats >= lat_min) & (lats <= lat_max) & (lngs >= lng_min) & (lngs <= lng_max)
+                point_factors[inside] = profile_factor(profile, middle)
+                assigned |= inside
+            pair_factors = pair_factors * (point_factors[:, None] + point_factors[None, :]) / 2
+        return pair_factors
+
+
+class TravelTimeModel:
+    """
+    Time-dependent travel times (minutes) between a fixed set of points.
+
+    The matrix of a time bucket is computed on first use and cached, at
+    most MATRIX_CACHE_BUCKETS of them; a leg takes the travel time of the
+    bucket in which it starts.
+    """
+
+    def __init__(self, profiles, points, free_minutes, distances):
+        self.profiles = profiles
+        self.lats, self.lngs = coordinate_arrays(points)
+        self.free_minutes = np.asarray(free_minutes, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            speeds = np.asarray(distances, dtype=np.float64) / (self.free_minutes / 60.0)
+        self.free_speed_kmh = np.where(np.isfinite(speeds), speeds, 0.0)
+        self._matrices = OrderedDict()
+
+    @classmethod
+    def for_points(cls, profiles, points, distances, time_matrix_provider=None):
+        """
+        Model over points, with free-flow times from a travel-time provider (seconds),
+        or from the distances at DEFAULT_SPEED_KMH.
+        """
+        if time_matrix_provider is not None:
+            free_minutes = time_matrix_provider(points) / 60.0
+        else:
+            free_minutes = np.asarray(distances, dtype=np.float64) / DEFAULT_SPEED_KMH * 60.0
+        return cls(profiles, points, free_minutes, distances)
+
+    def matrix(self, bucket):
+        """
+        Travel times of a bucket, as nested lists for fast scalar access.
+
+        Args:
+            bucket (int): Time bucket (see SpeedProfiles.bucket)
+
+        Returns:
+            list: (n, n) travel times in minutes
+        """
+        rows = self._matrices.get(bucket)
+        if rows is not None:
+            self._matrices.move_to_end(bucket)
+            return rows
+        factors = self.profiles.factors(bucket, self.lats, self.lngs, self.free_speed_kmh)
+        rows = (self.free_minutes / factors).tolist()
+        self._matrices[bucket] = rows
+        if len(self._matrices) > MATRIX_CACHE_BUCKETS:
+            self._matrices.popitem(last=False)
+        return rows
+
+    def travel(self, a, b, minutes):
+        """Travel time (minutes) from point a to point b when leaving at `minutes`"""
+        return self.matrix(self.profiles.bucket(minutes))[a][b]
+
+    def arrivals(self, order, departure):
+        """
+        Arrival time at each position of a visiting order.
+
+        Args:
+            order (list): Point indices in visiting order
+            departure (float): Departure time from order[0] (minutes since midnight)
+
+        Returns:
+            list: Arrival times, departure first
+        """
+        times = [departure]
+        for a, b in zip(order, order[1:]):
+            times.append(times[-1] + self.travel(a, b, times[-1]))
+        return times
+
+
+def _segment_arrival(model, order, arrivals, first, segment, last):
+    # Arrival at position last + 1 (or at the end of the segment on the last leg) when
+    # positions first..last are replaced by `segment`
+    t = arrivals[first - 1]
+    previous = order[first - 1]
+    for node in segment:
+        t += model.travel(previous, node, t)
+        previous = node
+    if last + 1 < len(order):
+        t += model.travel(previous, order[last + 1], t)
+    return t
+
+
+def improve_duration(order, model, departure, window=DURATION_SEARCH_WINDOW, max_passes=DURATION_SEARCH_PASSES,
+                     time_limit=DURATION_SEARCH_TIME_LIMIT):
+    """
+    Shortens the duration of an open path under time-dependent travel times.
+
+    2-opt (segment reversal) and relocate moves spanning at most `window`
+    positions are tried from the fixed start. A move is first screened in
+    O(window): it must reach the first unchanged stop earlier. Bucketed
+    speed factors are step functions, so leaving later can arrive earlier
+    (at a slow-to-fast change) and an earlier arrival there does not imply
+    an earlier end; a screened move is therefore kept only if the whole
+    route, recomputed from the move onwards, finishes earlier. The result
+    is never longer than the initial order.
+
+    Args:
+        order (list): Point indices in visiting order, modified in place
+        model (TravelTimeModel): Travel times
+        departure (float): Departure time (minutes since midnight)
+        window (int): Largest span of a move, in positions
+        max_passes (int): Maximum number of improvement passes
+        time_limit (float): Search budget in seconds
+
+    Returns:
+        float: Duration saved (minutes)
+    """
+    n = len(order)
+    arrivals = model.arrivals(order, departure)
+    initial = arrivals[-1]
+    if n < 3:
+        return 0.0
+
+    deadline = time.monotonic() + time_limit
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n):
+            if time.monotonic() > deadline:
+                return initial - arrivals[-1]
+            for j in range(i + 1, min(n, i + window + 1)):
+                reference = arrivals[j + 1] if j + 1 < n else arrivals[j]
+                candidates = (
+                    order[i:j + 1][::-1],                       # 2-opt: reverse positions i..j
+                    order[i + 1:j + 1] + [order[i]],            # relocate stop i after stop j
+                    [order[j]] + order[i:j],                    # relocate stop j before stop i
+                )
+                for segment in candidates:
+                    if _segment_arrival(model, order, arrivals, i, segment, j) >= reference - EPSILON:
+                        continue
+                    suffix = model.arrivals([order[i - 1]] + segment + order[j + 1:], arrivals[i - 1])
+                    if suffix[-1] < arrivals[-1] - EPSILON:
+                        order[i:j + 1] = segment
+                        arrivals[i:] = suffix[1:]
+                        improved = True
+                        break
+        if not improved:
+            break
+    return initial - arrivals[-1]
+
+
+_profiles = None
+
+
+def get_speed_profiles():
+    """
+    Returns the process-wide speed profiles, or None if none are configured.
+
+    SPEED_PROFILES_PATH points to a local JSON file (see SpeedProfiles);
+    it is read again when its modification time changes.
+
+    Returns:
+        SpeedProfiles: Shared profiles, or None
+    """
+    global _profiles
+    path = os.environ.get('SPEED_PROFILES_PATH', '')
+    if not path:
+        return None
+    try:
+        stamp = os.path.getmtime(path)
+    except OSError as e:
+        logging.error(f"Profils de vitesse indisponibles ({path}) : {e}")
+        return None
+    if _profiles is None or _profiles[:2] != (path, stamp):
+        try:
+            _profiles = (path, stamp, SpeedProfiles.from_file(path))
+        except (OSError, ValueError) as e:
+            logging.error(f"Profils de vitesse indisponibles ({path}) : {e}")
+            _profiles = (path, stamp, None)
+    return _profiles[2]
@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+
+
+class CachedUser:
+    """
+    Detached, read-only snapshot of a User row, used as current_user.
+
+    It carries only what the request hot path reads (access checks, profile
+    fields). Code that modifies the account must load the ORM User instead.
+    """
+
+    FIELDS = ('id', 'username', 'email', '_role', 'is_active', 'is_verified', 'access_until', 'last_login')
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, user):
+        for field in self.FIELDS:
+            object.__setattr__(self, field, getattr(user, field))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only; load the User row to modify '{name}'")
+
+    def get_id(self):
+        return str(self.id)
+
+    @property
+    def role(self):
+        return self._role
+
+    def is_admin(self):
+        from models import UserRole
+        return self._role == UserRole.ADMIN
+
+    def has_valid_access(self):
+        from models import User
+        # Same rules as the model, evaluated against the snapshot
+        return User.has_valid_access(self)
+
+
+class UserCache:
+    """
+    Per-worker LRU of CachedUser snapshots with a time-to-live.
+
+    Changes made in this worker invalidate entries immediately (see
+    register_invalidation); changes made by other workers are picked up
+    once the TTL expires.
+    """
+
+    def __init__(self, maxsize=1024, ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, loader):
+        """
+        Returns the cached snapshot for user_id, calling loader on a miss.
+
+        Args:
+            user_id (int): User primary key
+            loader (callable): Returns the User row for user_id, or None
+
+        Returns:
+            CachedUser: Snapshot of the user, or None if it does not exist
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                return entry[1]
+
+        user = loader(user_id)
+        if user is None:
+            self.invalidate(user_id)
+            return None
+
+        snapshot = CachedUser(user)
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl, snapshot)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def register_invalidation(self, model):
+        """
+        Drops a user's snapshot whenever its row is updated or deleted
+        through the ORM (edit, deletion, password change, activation, login).
+
+        Args:
+            model: The User model class
+        """
+        if event.contains(model, 'after_update', self._invalidate_target):
+            return
+        event.listen(model, 'after_update', self._invalidate_target)
+        event.listen(model, 'after_delete', self._invalidate_target)
+
+    def _invalidate_target(self, mapper, connection, target):
+        self.invalidate(target.id)
+
+
+user_cache = UserCache(
+    maxsize=int(os.environ.get('USER_CACHE_SIZE', 1024)),
+    ttl=float(os.environ.get('USER_CACHE_TTL', 30)),
+)
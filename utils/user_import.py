@@ -0,0 +1,147 @@
+import math
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import or_, select
+
+from utils.password_policy import hash_password
+
+REQUIRED_COLUMNS = ['username', 'email', 'password']
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+TRUE_VALUES = {'1', 'true', 'yes', 'oui', 'x', 'vrai'}
+
+# Maximum number of values per IN (...) clause when looking up existing accounts
+LOOKUP_CHUNK_SIZE = 500
+
+
+def _cell(record, column):
+    value = record.get(column)
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _flag(record, column, default):
+    value = _cell(record, column)
+    if not value:
+        return default
+    return value.lower() in TRUE_VALUES
+
+
+def _existing_accounts(session, model, usernames, emails):
+    """Returns the usernames and emails already taken, using one IN query per chunk"""
+    taken_usernames, taken_emails = set(), set()
+    usernames, emails = list(usernames), list(emails)
+    for start in range(0, max(len(usernames), len(emails)), LOOKUP_CHUNK_SIZE):
+        username_chunk = usernames[start:start + LOOKUP_CHUNK_SIZE]
+        email_chunk = emails[start:start + LOOKUP_CHUNK_SIZE]
+        rows = session.execute(
+            select(model.username, model.email).where(
+                or_(model.username.in_(username_chunk), model.email.in_(email_chunk))
+            )
+        ).all()
+        for username, email in rows:
+            taken_usernames.add(username)
+            taken_emails.add(email)
+    return taken_usernames, taken_emails
+
+
+def provision_users(session, model, role_enum, records):
+    """
+    Creates user accounts in bulk from spreadsheet records.
+
+    Rows are validated, checked against existing accounts with set-based
+    queries, their passwords hashed in parallel, and all valid rows are
+    inserted in a single transaction.
+
+    Args:
+        session: SQLAlchemy session
+        model: The User model class
+        role_enum: The UserRole enum
+        records (list): Row dictionaries with 'username', 'email', 'password'
+            and optional 'role', 'is_active', 'is_verified', 'access_days'
+
+    Returns:
+        list: One report dictionary per row with 'line', 'username',
+            'status' ('created' or 'skipped') and 'message'
+    """
+    report = []
+    candidates = []
+    seen_usernames, seen_emails = set(), set()
+
+    for index, record in enumerate(records):
+        # Line numbers as seen in the spreadsheet (header is line 1)
+        line = index + 2
+        username = _cell(record, 'username')
+        email = _cell(record, 'email')
+        password = _cell(record, 'password')
+        entry = {'line': line, 'username': username, 'status': 'skipped', 'message': ''}
+        report.append(entry)
+
+        if not username or not email or not password:
+            entry['message'] = 'Champs username, email et password requis'
+        elif not EMAIL_PATTERN.match(email):
+            entry['message'] = 'Adresse e-mail invalide'
+        elif len(password) < 6:
+            entry['message'] = 'Mot de passe trop court (6 caractères minimum)'
+        elif username in seen_usernames or email in seen_emails:
+            entry['message'] = 'Doublon dans le fichier'
+        else:
+            try:
+                access_days = int(float(_cell(record, 'access_days') or 0))
+            except ValueError:
+                entry['message'] = "Durée d'accès invalide"
+                continue
+            seen_usernames.add(username)
+            seen_emails.add(email)
+            candidates.append((entry, record, username, email, password, access_days))
+
+    taken_usernames, taken_emails = _existing_accounts(
+        session, model, [c[2] for c in candidates], [c[3] for c in candidates]
+    )
+    accepted = []
+    for candidate in candidates:
+        entry, _, username, email = candidate[:4]
+        if username in taken_usernames:
+            entry['message'] = "Nom d'utilisateur déjà utilisé"
+        elif email in taken_emails:
+            entry['message'] = 'Adresse e-mail déjà utilisée'
+        else:
+            accepted.append(candidate)
+
+    if not accepted:
+        return report
+
+    # Password hashing dominates the cost; hashlib releases the GIL while hashing
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+        hashes = list(executor.map(hash_password, [c[4] for c in accepted]))
+
+    now = datetime.utcnow()
+    rows = []
+    for (entry, record, username, email, _, access_days), password_hash in zip(accepted, hashes):
+        role = role_enum.ADMIN if _cell(record, 'role').lower() == 'admin' else role_enum.USER
+        is_admin = role == role_enum.ADMIN
+        rows.append({
+            'username': username,
+            'email': email,
+            'password_hash': password_hash,
+            'role': role,
+            # Administrators are always active and verified, as in the model
+            'is_active': is_admin or _flag(record, 'is_active', True),
+            'is_verified': is_admin or _flag(record, 'is_verified', True),
+            'access_until': now + timedelta(days=access_days) if access_days > 0 else None,
+            'created_at': now,
+            'updated_at': now,
+        })
+
+    session.execute(model.__table__.insert(), rows)
+    session.commit()
+
+    for entry, *_ in accepted:
+        entry['status'] = 'created'
+        entry['message'] = 'Compte créé'
+    return report
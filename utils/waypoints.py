@@ -0,0 +1,210 @@
+import numpy as np
+
+from utils.time_windows import format_clock, parse_clock, parse_duration
+
+# Optional per-point attributes, stored as float arrays (NaN when missing).
+# Clock attributes hold minutes since midnight and are exposed as "HH:MM".
+CLOCK_ATTRIBUTES = ('tw_start', 'tw_end', 'arrival', 'service_start')
+BOOLEAN_ATTRIBUTES = ('late',)
+ATTRIBUTES = CLOCK_ATTRIBUTES + ('service_min',) + BOOLEAN_ATTRIBUTES
+
+
+def _attribute_value(key, value):
+    if key in CLOCK_ATTRIBUTES:
+        minutes = parse_clock(value)
+        return np.nan if minutes is None else minutes
+    if key in BOOLEAN_ATTRIBUTES:
+        return np.nan if value is None else float(bool(value))
+    duration = parse_duration(value)
+    return np.nan if duration is None else duration
+
+
+def coordinate_arrays(points):
+    """
+    Latitudes and longitudes of a WaypointSet or a list of point dicts.
+
+    Args:
+        points: WaypointSet, or list of dictionaries with 'lat', 'lng'
+
+    Returns:
+        tuple: (lats, lngs) float64 arrays (views for a WaypointSet)
+    """
+    if isinstance(points, WaypointSet):
+        return points.lat, points.lng
+    lats = np.array([point['lat'] for point in points], dtype=np.float64)
+    lngs = np.array([point['lng'] for point in points], dtype=np.float64)
+    return lats, lngs
+
+
+class WaypointSet:
+    """
+    Ordered points stored as contiguous arrays instead of one dict per point.
+
+    `lat` and `lng` are float64 arrays. Names are stored once in `names` and
+    referenced through the int32 `name_index`, so a point costs a few dozen
+    bytes whatever its name. Optional attributes (see ATTRIBUTES) are float
+    arrays. Slicing returns views, and reordering (`take`) permutes the
+    arrays; point dicts are only built at the edges (JSON, templates) by
+    iteration, indexing or `to_points`.
+    """
+
+    __slots__ = ('lat', 'lng', 'names', 'name_index', 'attributes')
+
+    def __init__(self, lat, lng, names, name_index=None, attributes=None):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lng = np.asarray(lng, dtype=np.float64)
+        self.names = names
+        self.name_index = (np.arange(len(self.lat), dtype=np.int32) if name_index is None
+                           else np.asarray(name_index, dtype=np.int32))
+        self.attributes = {key: np.asarray(values, dtype=np.float64) for key, values in (attributes or {}).items()}
+
+    @classmethod
+    def from_points(cls, points):
+        """
+        Builds a set from point dicts; a WaypointSet is returned unchanged.
+
+        Args:
+            points (list): Dictionaries with 'name', 'lat', 'lng' and optional ATTRIBUTES
+
+        Returns:
+            WaypointSet: The points
+        """
+        if isinstance(points, WaypointSet):
+            return points
+        lats, lngs = coordinate_arrays(points)
+        names, name_index = cls._index_names(str(point.get('name', '')) for point in points)
+        attributes = {}
+        for key in ATTRIBUTES:
+            if any(point.get(key) not in (None, '') for point in points):
+                attributes[key] = [_attribute_value(key, point.get(key)) for point in points]
+        return cls(lats, lngs, names, name_index, attributes)
+
+    @classmethod
+    def from_columns(cls, lat, lng, names, **attributes):
+        """
+        Builds a set from column arrays, e.g. form fields or table columns.
+
+        Window bounds with a start after the end are dropped (the stop is
+        then unconstrained) and zero service durations count as missing.
+
+        Args:
+            lat, lng (array): Coordinates
+            names (iterable): Point names
+            **attributes: ATTRIBUTES columns, raw values ("HH:MM", minutes, None...)
+
+        Returns:
+            WaypointSet: The points
+        """
+        names, name_index = cls._index_names(str(name) for name in names)
+        columns = {
+            key: np.array([_attribute_value(key, value) for value in values], dtype=np.float64)
+            for key, values in attributes.items()
+        }
+        if 'tw_start' in columns and 'tw_end' in columns:
+            inconsistent = columns['tw_start'] > columns['tw_end']
+            columns['tw_start'][inconsistent] = np.nan
+            columns['tw_end'][inconsistent] = np.nan
+        if 'service_min' in columns:
+            columns['service_min'][columns['service_min'] == 0] = np.nan
+        columns = {key: values for key, values in columns.items() if not np.isnan(values).all()}
+        return cls(lat, lng, names, name_index, columns)
+
+    @classmethod
+    def from_frame(cls, frame):
+        """
+        Builds a set from an uploaded table, skipping rows without valid coordinates.
+
+        Args:
+            frame (DataFrame): 'name', 'lat', 'lng' columns and optional
+                'tw_start', 'tw_end' (HH:MM) and 'service_min' (minutes)
+
+        Returns:
+            WaypointSet: The valid rows, in table order
+        """
+        import pandas as pd
+
+        lat = pd.to_numeric(frame['lat'], errors='coerce').to_numpy(dtype=np.float64)
+        lng = pd.to_numeric(frame['lng'], errors='coerce').to_numpy(dtype=np.float64)
+        # NaN compares False, so rows with missing coordinates are dropped too
+        rows = np.flatnonzero((np.abs(lat) <= 90) & (np.abs(lng) <= 180))
+        attributes = {
+            key: frame[key].to_numpy(dtype=object)[rows]
+            for key in ('tw_start', 'tw_end', 'service_min') if key in frame.columns
+        }
+        return cls.from_columns(lat[rows], lng[rows], frame['name'].to_numpy(dtype=object)[rows], **attributes)
+
+    @staticmethod
+    def _index_names(names):
+        positions = {}
+        index = [positions.setdefault(name, len(positions)) for name in names]
+        return list(positions), np.array(index, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.lat)
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, np.integer)):
+            return self.point(int(key))
+        return self._subset(key)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.point(i)
+
+    def _subset(self, key):
+        return WaypointSet(self.lat[key], self.lng[key], self.names, self.name_index[key],
+                           {name: values[key] for name, values in self.attributes.items()})
+
+    def take(self, order):
+        """Points reordered (or selected) by an index array"""
+        return self._subset(np.asarray(order, dtype=np.intp))
+
+    def name(self, i):
+        return self.names[self.name_index[i]]
+
+    def point(self, i):
+        """Point i as a dict, with its non-missing attributes"""
+        point = {'name': self.name(i), 'lat': float(self.lat[i]), 'lng': float(self.lng[i])}
+        for key, values in self.attributes.items():
+            value = values[i]
+            if value != value:
+                continue
+            if key in CLOCK_ATTRIBUTES:
+                point[key] = format_clock(value)
+            elif key in BOOLEAN_ATTRIBUTES:
+                point[key] = bool(value)
+            else:
+                point[key] = float(value)
+        return point
+
+    def to_points(self):
+        """List of point dicts, for JSON responses, the session and templates"""
+        return list(self)
+
+    def concat(self, other):
+        """
+        Points of this set followed by those of `other` (set or list of dicts).
+
+        Attributes missing on one side are NaN for its points.
+        """
+        other = WaypointSet.from_points(other)
+        names = list(self.names) + list(other.names)
+        name_index = np.concatenate([self.name_index, other.name_index + len(self.names)])
+        attributes = {}
+        for key in set(self.attributes) | set(other.attributes):
+            attributes[key] = np.concatenate([
+                self.attributes.get(key, np.full(len(self), np.nan)),
+                other.attributes.get(key, np.full(len(other), np.nan)),
+            ])
+        return WaypointSet(np.concatenate([self.lat, other.lat]), np.concatenate([self.lng, other.lng]),
+                           names, name_index, attributes)
+
+    def with_attributes(self, **attributes):
+        """Copy sharing the coordinate arrays, with attributes added or replaced"""
+        merged = dict(self.attributes)
+        merged.update(attributes)
+        return WaypointSet(self.lat, self.lng, self.names, self.name_index, merged)
+
+    def has_attributes(self, *keys):
+        """True if any point has a value for one of `keys`"""
+        return any(key in self.attributes and not np.isnan(self.attributes[key]).all() for key in keys)